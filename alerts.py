@@ -0,0 +1,178 @@
+"""Incremental threshold alerts for meter samples
+
+Rules are evaluated as each sample is ingested, using only per-rule running
+state (active flag, reference value and timestamp), so the cost per sample
+is O(number of rules for that device) and history is never rescanned.
+
+Rate rules compare a sample with a reference at least ``min_rate_interval``
+seconds older; readings that arrive sooner (pushed webhook/BLE values) are
+checked against the same reference, so sensor noise over a few seconds is
+not extrapolated to a rate per hour. Alerts that start or end during quiet
+hours are held and returned once by ``release_held`` after they end.
+
+Rule fields:
+    name (str): Label shown in banners and notifications
+    device (str): Display name of the meter (see DEVICE_NAMES)
+    field (str): 'temperature', 'humidity' or 'co2'
+    above / below (float): Threshold; fires when crossed
+    rate_above / rate_below (float): Fires when the change per hour crosses it
+    hysteresis (float): How far back the value must go before the alert clears
+"""
+
+import time
+
+
+class AlertEngine:
+    def __init__(self, rules, quiet_hours=None, on_fire=None, on_clear=None, utc_offset=0,
+                 min_rate_interval=300, max_held=20):
+        """
+        Args:
+            rules (list): Rule dictionaries (see module docstring)
+            quiet_hours (tuple): (start_hour, end_hour) in local time, or None
+            on_fire (callable): on_fire(rule, value, quiet) when an alert starts
+            on_clear (callable): on_clear(rule, value, quiet) when it ends
+            utc_offset (int): Seconds from UTC to local time (the RTC is kept in UTC)
+            min_rate_interval (int): Shortest time in seconds a rate is computed over
+            max_held (int): Quiet-hour changes kept for ``release_held``
+        """
+        self.quiet_hours = quiet_hours
+        self.utc_offset = utc_offset
+        self.on_fire = on_fire
+        self.on_clear = on_clear
+        self.min_rate_interval = min_rate_interval
+        self.max_held = max_held
+        self.held = []  # [(fired, rule, value), ...] changes during quiet hours
+        self.rules_by_device = {}
+        self.states = []
+        for index, rule in enumerate(rules):
+            self.rules_by_device.setdefault(rule['device'], []).append(index)
+            # [active, reference value, reference timestamp, value when fired]
+            self.states.append([False, None, None, None])
+        self.rules = rules
+
+    def is_quiet(self, timestamp):
+        if not self.quiet_hours:
+            return False
+        start, end = self.quiet_hours
+        hour = time.localtime(int(timestamp) + self.utc_offset)[3]
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def ingest(self, device_name, data_point):
+        """Evaluate the rules of one device against a new sample"""
+        indexes = self.rules_by_device.get(device_name)
+        if not indexes:
+            return
+        timestamp = data_point['timestamp']
+        quiet = None
+        for index in indexes:
+            rule = self.rules[index]
+            value = data_point.get(rule['field'])
+            if value is None:
+                continue
+            state = self.states[index]
+            checked = value
+            if 'rate_above' in rule or 'rate_below' in rule:
+                previous, previous_time = state[1], state[2]
+                if previous is None or timestamp < previous_time:
+                    state[1] = value
+                    state[2] = timestamp
+                    continue
+                if timestamp - previous_time < self.min_rate_interval:
+                    continue  # Too close to the reference to tell a trend from noise
+                checked = (value - previous) * 3600 / (timestamp - previous_time)
+            state[1] = value
+            state[2] = timestamp
+            if quiet is None:
+                quiet = self.is_quiet(timestamp)
+            self.update(index, rule, state, checked, value, quiet)
+
+    def update(self, index, rule, state, checked, value, quiet):
+        hysteresis = rule.get('hysteresis', 0)
+        above = rule.get('above', rule.get('rate_above'))
+        below = rule.get('below', rule.get('rate_below'))
+        if not state[0]:
+            if (above is not None and checked > above) or (below is not None and checked < below):
+                state[0] = True
+                state[3] = value
+                if quiet:
+                    self.hold(True, rule, value)
+                if self.on_fire:
+                    self.on_fire(rule, value, quiet)
+        else:
+            cleared = True
+            if above is not None and checked > above - hysteresis:
+                cleared = False
+            if below is not None and checked < below + hysteresis:
+                cleared = False
+            if cleared:
+                state[0] = False
+                if quiet:
+                    self.hold(False, rule, value)
+                if self.on_clear:
+                    self.on_clear(rule, value, quiet)
+
+    def hold(self, fired, rule, value):
+        self.held.append((fired, rule, value))
+        if len(self.held) > self.max_held:
+            del self.held[0]
+
+    def release_held(self, timestamp):
+        """Return the changes held during quiet hours once they are over, else []
+
+        Returns:
+            list: [(fired, rule, value), ...] oldest first; each is returned once
+        """
+        if not self.held or self.is_quiet(timestamp):
+            return []
+        held = self.held
+        self.held = []
+        return held
+
+    def active(self):
+        """Return [(rule, value_when_fired), ...] for alerts that are active"""
+        return [
+            (self.rules[i], state[3])
+            for i, state in enumerate(self.states)
+            if state[0]
+        ]
+
+
+class LedPattern:
+    """Non-blocking LED blinker driven from the main loop"""
+
+    def __init__(self, led, on_ms=100, off_ms=900):
+        self.led = led
+        self.on_ms = on_ms
+        self.off_ms = off_ms
+        self.running = False
+        self.lit = False
+        self.next_change = 0
+
+    def start(self, on_ms=None, off_ms=None):
+        if on_ms is not None:
+            self.on_ms = on_ms
+        if off_ms is not None:
+            self.off_ms = off_ms
+        self.running = True
+        self.next_change = time.ticks_ms()
+
+    def stop(self):
+        self.running = False
+        self.lit = False
+        self.led.off()
+
+    def poll(self):
+        if not self.running:
+            return
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.next_change) < 0:
+            return
+        self.lit = not self.lit
+        if self.lit:
+            self.led.on()
+            self.next_change = time.ticks_add(now, self.on_ms)
+        else:
+            self.led.off()
+            self.next_change = time.ticks_add(now, self.off_ms)
@@ -0,0 +1,370 @@
+"""Convert images into compressed RGB565 asset files for lcd_st7796.blit_asset.
+
+This script runs on the host (CPython), not on the Pico. Copy the output to
+the Pico's flash (e.g. ``mpremote cp kitchen.r565 :icons/``); the display
+streams it from there without loading it into RAM.
+
+Examples:
+    # Room icon; fully transparent pixels become the key color
+    python asset_tool.py convert kitchen.png icons/kitchen.r565 --size 16x16
+
+    # Force an encoding and a key color
+    python asset_tool.py convert sun.ppm sun.r565 --format palette --key "#FF00FF"
+
+    # Show the header of an asset / decode it back to a PPM for checking
+    python asset_tool.py info icons/kitchen.r565
+    python asset_tool.py decode icons/kitchen.r565 check.ppm
+
+    # Bitmap font for fonts.BitmapFont.load: large digits from a TrueType font
+    python asset_tool.py font DejaVuSansMono-Bold.ttf digits24.fnt --size 24 --chars "0123456789.-C% "
+
+File format (little endian):
+    header   "<4sBBHHBH": magic b"R565", version 1, encoding, width, height,
+             flags (bit 0: key color is transparent), key color
+    palette  encoding 2 only: count (uint16), then count colors
+    rows     one after another; in encodings 1 and 2 each row is a sequence
+             of runs that never crosses the row end:
+             control byte with bit 7 set: (low 7 bits + 1) copies of the next
+             pixel, bit 7 clear: (low 7 bits + 1) literal pixels follow
+
+Font files (fonts.py) are "<4sBBBH": magic b"BFNT", version 1, cell width,
+cell height, glyph count; then one byte per character and the glyphs as
+1-bit rows, most significant bit first, each row padded to whole bytes.
+
+Pixels are RGB565 stored high byte first, the order the panel expects on the
+SPI bus (the same value as lcd_lib's byte-swapped color ints read as "<H").
+Encoding 0 stores raw pixels, 1 run-length encodes pixels and 2 run-length
+encodes 1-byte palette indices. Key-colored pixels are always stored as
+repeat runs so the display can skip them without comparing every pixel.
+"""
+
+import argparse
+import struct
+
+MAGIC = b"R565"
+VERSION = 1
+HEADER = "<4sBBHHBH"
+RAW = 0
+RLE = 1
+PALETTE = 2
+KEYED = 0x01
+FONT_MAGIC = b"BFNT"
+FONT_HEADER = "<4sBBBH"
+ENCODINGS = {"raw": RAW, "rle": RLE, "palette": PALETTE}
+MAX_RUN = 128
+
+
+def rgb565(r, g, b):
+    """Return the stored pixel value ("<H" of the panel's byte order)"""
+    value = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+    return ((value & 0xFF) << 8) | (value >> 8)
+
+
+def to_rgb888(pixel):
+    value = ((pixel & 0xFF) << 8) | (pixel >> 8)
+    r = (value >> 11) & 0x1F
+    g = (value >> 5) & 0x3F
+    b = value & 0x1F
+    return (r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)
+
+
+def parse_color(text):
+    text = text.lstrip("#")
+    return rgb565(int(text[0:2], 16), int(text[2:4], 16), int(text[4:6], 16))
+
+
+def read_ppm(path):
+    """Read a binary PPM (P6) without Pillow; returns (width, height, [(r, g, b, a)])"""
+    with open(path, "rb") as f:
+        data = f.read()
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b"#":
+            pos = data.index(b"\n", pos)
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    if fields[0] != b"P6" or int(fields[3]) > 255:
+        raise ValueError(f"{path}: only 8-bit binary PPM (P6) is supported without Pillow")
+    width, height = int(fields[1]), int(fields[2])
+    pixels = data[pos + 1:pos + 1 + width * height * 3]
+    return width, height, [
+        (pixels[i], pixels[i + 1], pixels[i + 2], 255) for i in range(0, len(pixels), 3)
+    ]
+
+
+def load_image(path, size=None):
+    """Load an image as (width, height, [(r, g, b, a), ...])
+
+    PPM files are read directly; other formats need Pillow.
+    """
+    if path.lower().endswith((".ppm", ".pnm")) and size is None:
+        return read_ppm(path)
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit("Pillow is required for this image (pip install pillow); PPM works without it")
+    image = Image.open(path).convert("RGBA")
+    if size is not None:
+        image = image.resize(size, Image.LANCZOS)
+    return image.width, image.height, list(image.getdata())
+
+
+def to_pixels(rgba, key=None):
+    """Convert RGBA tuples to stored pixels; transparent ones (alpha < 128) become the key
+
+    Returns:
+        tuple: (pixels, key) with key None if nothing is transparent
+    """
+    opaque = [rgb565(r, g, b) if a >= 128 else None for r, g, b, a in rgba]
+    if key is None and None in opaque:
+        used = set(opaque)
+        # Magenta unless the image uses it; then the first unused color
+        key = parse_color("#FF00FF")
+        while key in used:
+            key = (key + 1) & 0xFFFF
+    return [key if p is None else p for p in opaque], key
+
+
+def encode_runs(values, key, pack):
+    """Run-length encode one row; ``pack`` turns a value into its stored bytes"""
+    out = bytearray()
+    literal = []
+
+    def flush():
+        if literal:
+            out.append(len(literal) - 1)
+            for value in literal:
+                out.extend(pack(value))
+            literal.clear()
+
+    i = 0
+    while i < len(values):
+        value = values[i]
+        run = 1
+        while i + run < len(values) and values[i + run] == value and run < MAX_RUN:
+            run += 1
+        if run >= 2 or value == key:
+            flush()
+            out.append(0x80 | (run - 1))
+            out.extend(pack(value))
+            i += run
+        else:
+            literal.append(value)
+            if len(literal) == MAX_RUN:
+                flush()
+            i += 1
+    flush()
+    return bytes(out)
+
+
+def encode(width, height, pixels, encoding, key=None):
+    """Return the asset file contents
+
+    Args:
+        pixels (list): Stored pixel values, row by row
+        encoding (int): RAW, RLE or PALETTE
+        key (int): Transparent pixel value, or None
+    """
+    flags = KEYED if key is not None else 0
+    data = bytearray(struct.pack(HEADER, MAGIC, VERSION, encoding, width, height, flags, key or 0))
+    rows = [pixels[y * width:(y + 1) * width] for y in range(height)]
+    if encoding == RAW:
+        for row in rows:
+            data.extend(struct.pack(f"<{width}H", *row))
+    elif encoding == RLE:
+        pack = struct.Struct("<H").pack
+        for row in rows:
+            data.extend(encode_runs(row, key, pack))
+    else:
+        colors = sorted(set(pixels))
+        if len(colors) > 256:
+            raise ValueError(f"{len(colors)} colors; the palette encoding allows 256")
+        index = {color: i for i, color in enumerate(colors)}
+        data.extend(struct.pack(f"<H{len(colors)}H", len(colors), *colors))
+        key_index = index.get(key, -1)
+        for row in rows:
+            data.extend(encode_runs([index[p] for p in row], key_index, lambda i: bytes([i])))
+    return bytes(data)
+
+
+def decode(data):
+    """Decode an asset file into (width, height, key, pixels); pixels are None where transparent"""
+    magic, version, encoding, width, height, flags, key = struct.unpack_from(HEADER, data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an asset file")
+    pos = struct.calcsize(HEADER)
+    palette = None
+    if encoding == PALETTE:
+        count = struct.unpack_from("<H", data, pos)[0]
+        palette = struct.unpack_from(f"<{count}H", data, pos + 2)
+        pos += 2 + count * 2
+    size = 1 if palette else 2
+
+    def value(at):
+        return palette[data[at]] if palette else struct.unpack_from("<H", data, at)[0]
+
+    pixels = []
+    for _ in range(height):
+        if encoding == RAW:
+            pixels.extend(struct.unpack_from(f"<{width}H", data, pos))
+            pos += width * 2
+            continue
+        x = 0
+        while x < width:
+            control = data[pos]
+            n = (control & 0x7F) + 1
+            pos += 1
+            if control & 0x80:
+                pixels.extend([value(pos)] * n)
+                pos += size
+            else:
+                pixels.extend(value(pos + i * size) for i in range(n))
+                pos += n * size
+            x += n
+        if x != width:
+            raise ValueError("Run crosses the end of a row")
+    keyed = flags & KEYED
+    return width, height, key if keyed else None, [
+        None if keyed and p == key else p for p in pixels
+    ]
+
+
+def render_font(path, size, chars, threshold=128):
+    """Rasterize ``chars`` from a TrueType font into fixed cells
+
+    Returns:
+        tuple: (width, height, [rows of 0/1 pixels per glyph])
+    """
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        raise SystemExit("Pillow is required to render fonts (pip install pillow)")
+    font = ImageFont.truetype(path, size)
+    ascent, descent = font.getmetrics()
+    width = max(int(font.getlength(c) + 0.5) for c in chars)
+    height = ascent + descent
+    glyphs = []
+    for c in chars:
+        image = Image.new("L", (width, height), 0)
+        ImageDraw.Draw(image).text((0, 0), c, font=font, fill=255)
+        data = list(image.getdata())
+        glyphs.append([[int(v >= threshold) for v in data[y * width:(y + 1) * width]]
+                       for y in range(height)])
+    return width, height, glyphs
+
+
+def encode_font(width, height, chars, glyphs):
+    """Return the font file contents; glyphs are lists of rows of 0/1 pixels"""
+    if any(ord(c) > 127 for c in chars):
+        raise ValueError("Font characters must be ASCII")
+    data = bytearray(struct.pack(FONT_HEADER, FONT_MAGIC, 1, width, height, len(chars)))
+    data.extend(chars.encode())
+    row_bytes = (width + 7) // 8
+    for rows in glyphs:
+        for row in rows:
+            bits = 0
+            for pixel in row:
+                bits = (bits << 1) | pixel
+            data.extend((bits << (row_bytes * 8 - width)).to_bytes(row_bytes, "big"))
+    return bytes(data)
+
+
+def font_command(args):
+    width, height, glyphs = render_font(args.input, args.size, args.chars)
+    data = encode_font(width, height, args.chars, glyphs)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"{args.output}: {len(args.chars)} glyphs, {width}x{height} cells, {len(data)} bytes")
+    if args.preview:
+        for c, rows in zip(args.chars, glyphs):
+            print(repr(c))
+            for row in rows:
+                print("".join("#" if p else "." for p in row))
+
+
+def convert(args):
+    size = tuple(int(v) for v in args.size.lower().split("x")) if args.size else None
+    width, height, rgba = load_image(args.input, size)
+    key = parse_color(args.key) if args.key else None
+    pixels, key = to_pixels(rgba, key)
+    if args.format == "auto":
+        candidates = [encode(width, height, pixels, RAW, key), encode(width, height, pixels, RLE, key)]
+        if len(set(pixels)) <= 256:
+            candidates.append(encode(width, height, pixels, PALETTE, key))
+        data = min(candidates, key=len)
+    else:
+        data = encode(width, height, pixels, ENCODINGS[args.format], key)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    encoding = {v: k for k, v in ENCODINGS.items()}[data[5]]
+    print(f"{args.output}: {width}x{height} {encoding}, {len(data)} bytes "
+          f"({len(data) * 100 // (width * height * 2)}% of raw)"
+          + (f", key #{key:04X}" if key is not None else ""))
+
+
+def info(args):
+    with open(args.asset, "rb") as f:
+        data = f.read()
+    width, height, key, pixels = decode(data)
+    encoding = {v: k for k, v in ENCODINGS.items()}[data[5]]
+    transparent = sum(p is None for p in pixels)
+    print(f"{args.asset}: {width}x{height} {encoding}, {len(data)} bytes, "
+          f"{len(set(pixels) - {None})} colors, {transparent} transparent pixels")
+
+
+def decode_command(args):
+    with open(args.asset, "rb") as f:
+        width, height, key, pixels = decode(f.read())
+    background = parse_color(args.background)
+    with open(args.output, "wb") as f:
+        f.write(f"P6\n{width} {height}\n255\n".encode())
+        for pixel in pixels:
+            f.write(bytes(to_rgb888(background if pixel is None else pixel)))
+    print(f"Wrote {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert", help="convert an image into an asset file")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--format", choices=["auto"] + list(ENCODINGS), default="auto",
+                   help="encoding (auto: the smallest)")
+    p.add_argument("--key", help="transparent color, e.g. #FF00FF (default: picked if the image has alpha)")
+    p.add_argument("--size", help="resize to WxH (needs Pillow)")
+    p.set_defaults(func=convert)
+
+    p = sub.add_parser("info", help="describe an asset file")
+    p.add_argument("asset")
+    p.set_defaults(func=info)
+
+    p = sub.add_parser("decode", help="decode an asset file into a PPM image")
+    p.add_argument("asset")
+    p.add_argument("output")
+    p.add_argument("--background", default="#F5F5F5", help="color of transparent pixels")
+    p.set_defaults(func=decode_command)
+
+    p = sub.add_parser("font", help="render a TrueType font into a bitmap font file")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--size", type=int, default=24, help="font size in pixels")
+    p.add_argument("--chars", default="".join(chr(c) for c in range(32, 127)),
+                   help="characters to include (default: printable ASCII)")
+    p.add_argument("--preview", action="store_true", help="print the glyphs as text")
+    p.set_defaults(func=font_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Crash-safe runtime checkpoints and a watchdog for unattended panels
+
+``Checkpoint`` keeps a small JSON file with what the application needs to
+resume after a restart (view, devices, poll schedule, latest values). Every
+write goes to a temporary file that is renamed over the old one, so a reset
+in the middle of a write leaves the previous checkpoint intact.
+
+``Watchdog`` arms the hardware watchdog (at most ~8.3 s on the RP2040) and
+feeds it from a timer interrupt for as long as the main loop has called
+``feed`` within ``timeout_s``. Slow network requests and flash writes do not
+trip it, but a loop that stops making progress resets the board.
+
+Usage:
+    checkpoint = Checkpoint("checkpoint.json")
+    state = checkpoint.load()  # None on a cold start
+    watchdog = Watchdog(timeout_s=60)
+    while True:
+        watchdog.feed()
+        ...
+        if checkpoint.due():
+            checkpoint.save(state)
+"""
+
+import json
+import os
+import time
+
+try:
+    import machine
+except ImportError:
+    machine = None
+
+CHECKPOINT_VERSION = 1
+WDT_MAX_MS = 8300  # The RP2040 watchdog cannot wait longer (8388 ms)
+WDT_FEED_MS = 1000
+
+
+def write_json(path, data):
+    """Write JSON through a temporary file and rename it into place"""
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.rename(tmp, path)
+
+
+def reset_cause():
+    """Return why the board last started: 'power', 'watchdog', 'soft' or 'unknown'"""
+    if machine is None or not hasattr(machine, 'reset_cause'):
+        return 'unknown'
+    cause = machine.reset_cause()
+    if cause == getattr(machine, 'PWRON_RESET', None):
+        return 'power'
+    if cause == getattr(machine, 'WDT_RESET', None):
+        return 'watchdog'
+    if cause == getattr(machine, 'SOFT_RESET', None):
+        return 'soft'
+    return 'unknown'
+
+
+class Checkpoint:
+    def __init__(self, path, interval_s=60):
+        """
+        Args:
+            path (str): Checkpoint file on flash
+            interval_s (int): Minimum seconds between periodic saves
+        """
+        self.path = path
+        self.interval_ms = interval_s * 1000
+        self.last_save = None
+        self.saves = 0
+
+    def load(self):
+        """Return the saved state, or None if there is no usable checkpoint"""
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or state.get('version') != CHECKPOINT_VERSION:
+            return None
+        return state
+
+    def due(self):
+        """Return True if the periodic save interval has passed"""
+        return self.last_save is None or time.ticks_diff(time.ticks_ms(), self.last_save) >= self.interval_ms
+
+    def save(self, state):
+        """Atomically replace the checkpoint; returns True on success"""
+        state['version'] = CHECKPOINT_VERSION
+        self.last_save = time.ticks_ms()
+        try:
+            write_json(self.path, state)
+        except (OSError, ValueError, MemoryError) as e:
+            print(f"Error saving checkpoint: {e}")
+            return False
+        self.saves += 1
+        return True
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class Watchdog:
+    def __init__(self, timeout_s=60):
+        """
+        Args:
+            timeout_s (int): Seconds the main loop may go without ``feed``
+                before the board is reset
+        """
+        self.timeout_ms = timeout_s * 1000
+        self.last_feed = time.ticks_ms()
+        self.wdt = None
+        self.timer = None
+        if machine is None or not hasattr(machine, 'WDT'):
+            return
+        self.wdt = machine.WDT(timeout=WDT_MAX_MS)
+        try:
+            # A hard interrupt still runs while the loop blocks in a socket call
+            self.timer = machine.Timer(period=WDT_FEED_MS, mode=machine.Timer.PERIODIC,
+                                       callback=self.tick, hard=True)
+        except TypeError:
+            self.timer = machine.Timer(period=WDT_FEED_MS, mode=machine.Timer.PERIODIC,
+                                       callback=self.tick)
+
+    def tick(self, timer):
+        # No allocation here: this may run as a hard interrupt
+        if time.ticks_diff(time.ticks_ms(), self.last_feed) < self.timeout_ms:
+            self.wdt.feed()
+
+    def feed(self):
+        """Report that the main loop is making progress"""
+        self.last_feed = time.ticks_ms()
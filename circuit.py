@@ -0,0 +1,141 @@
+"""Circuit breaker and deadlines for calls to a cloud API
+
+During an outage every request would otherwise wait for its full timeout,
+and a poll over many meters blocks the loop for minutes. ``CircuitBreaker``
+counts consecutive failures; after ``failure_threshold`` of them the circuit
+opens and calls are skipped at once. After ``reset_timeout_s`` one probe
+request is let through (half-open): success closes the circuit, failure opens
+it again for twice as long, up to ``max_reset_timeout_s``.
+
+``Deadline`` bounds a group of requests (one poll cycle) as a whole: each
+request gets the smaller of its own timeout and the time left, and the rest
+of the group is skipped once the deadline has passed.
+
+Usage:
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout_s=30)
+    deadline = Deadline(20)
+    for url in urls:
+        if deadline.expired() or not breaker.allow():
+            break
+        try:
+            response = requests.get(url, timeout=deadline.timeout(5))
+            breaker.success()
+        except OSError as e:
+            breaker.failure(e)
+"""
+
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class Deadline:
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds (float): Time allowed from now
+        """
+        self.end = time.ticks_add(time.ticks_ms(), int(seconds * 1000))
+
+    def remaining_ms(self):
+        return max(0, time.ticks_diff(self.end, time.ticks_ms()))
+
+    def expired(self):
+        return self.remaining_ms() == 0
+
+    def timeout(self, limit):
+        """Return the timeout in seconds for the next request: ``limit``, or less near the deadline"""
+        return min(limit, self.remaining_ms() / 1000)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, reset_timeout_s=30, max_reset_timeout_s=600):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout_s (int): Seconds the circuit stays open before a probe
+            max_reset_timeout_s (int): Upper limit as failed probes double the wait
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_ms = reset_timeout_s * 1000
+        self.max_reset_timeout_ms = max_reset_timeout_s * 1000
+        self.state = CLOSED
+        self.consecutive = 0
+        self.open_ms = self.reset_timeout_ms
+        self.opened_at = None  # ticks_ms when the circuit last opened
+        self.probing = False  # A half-open probe is in flight
+        # Counters for health reports
+        self.calls = 0
+        self.failures = 0
+        self.skipped = 0
+        self.opened = 0
+        self.last_error = None
+
+    def allow(self):
+        """Return True if a request may be sent now (counts skipped calls)"""
+        if self.state == OPEN:
+            if time.ticks_diff(time.ticks_ms(), self.opened_at) < self.open_ms:
+                self.skipped += 1
+                return False
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == HALF_OPEN:
+            # One probe at a time; other calls are skipped until it returns
+            if self.probing:
+                self.skipped += 1
+                return False
+            self.probing = True
+        self.calls += 1
+        return True
+
+    def success(self):
+        self.state = CLOSED
+        self.consecutive = 0
+        self.open_ms = self.reset_timeout_ms
+        self.probing = False
+
+    def failure(self, error=None):
+        self.failures += 1
+        self.consecutive += 1
+        if error is not None:
+            self.last_error = str(error)
+        if self.state == HALF_OPEN:
+            # The probe failed: stay open longer
+            self.open_ms = min(self.open_ms * 2, self.max_reset_timeout_ms)
+            self.trip()
+        elif self.state == CLOSED and self.consecutive >= self.failure_threshold:
+            self.trip()
+
+    def trip(self):
+        if self.state != OPEN:
+            print(f"API circuit open for {self.open_ms // 1000} s after {self.consecutive} failures")
+        self.state = OPEN
+        self.opened_at = time.ticks_ms()
+        self.probing = False
+        self.opened += 1
+
+    def is_open(self):
+        """Return True while calls are being skipped (open, or half-open with a probe out)"""
+        return self.state == OPEN or (self.state == HALF_OPEN and self.probing)
+
+    def retry_ms(self):
+        """Return milliseconds until a probe may be sent, or None if the circuit is closed"""
+        if self.state == CLOSED:
+            return None
+        if self.state == HALF_OPEN:
+            return 0
+        return max(0, self.open_ms - time.ticks_diff(time.ticks_ms(), self.opened_at))
+
+    def health(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive,
+            'calls': self.calls,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'opened': self.opened,
+            'retry_ms': self.retry_ms(),
+            'last_error': self.last_error,
+        }
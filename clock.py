@@ -0,0 +1,229 @@
+"""Wall clock synchronized with NTP, with drift tracking
+
+The RTC of the Pico starts at 2021-01-01 after a power cycle, or at whatever
+the host set it to (``mpremote`` uses local time), so ``time.time()`` cannot
+be trusted for request signatures or sample timestamps. ``Clock`` queries an
+NTP server at boot and every ``interval_s`` seconds and keeps time as
+``ticks_ms`` plus an offset. Between syncs the measured drift of the crystal
+is applied, and each sync also sets the RTC so ``time.time()`` users stay
+close.
+
+Timestamps taken before the first sync used the unsynchronized clock. When
+that clock steps, ``on_step(start, end, step)`` is called so the application
+can move samples stamped within [start, end] by ``step`` seconds
+(``correct`` does it for a single timestamp).
+
+Usage:
+    clock = Clock("pool.ntp.org")
+    while True:
+        clock.poll()  # Syncs when due (call while the network is up)
+        t = clock.time()
+
+``python mock_switchbot.py ntp --port 12300 --offset 3`` serves a local NTP
+stand-in with a chosen error for testing (``Clock("<host>", port=12300)``);
+``tests/test_clock.py`` syncs with it and checks the step and drift handling.
+"""
+
+import socket
+import struct
+import time
+
+try:
+    import machine
+except ImportError:
+    machine = None
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+NTP_DELTA = 2208988800  # Seconds from 1900-01-01 (NTP era 0) to 1970-01-01
+# Seconds from 1970-01-01 to the epoch of time.time() (2000-01-01 on older ports)
+EPOCH_OFFSET = 0 if time.gmtime(0)[0] == 1970 else 946684800
+REANCHOR_MS = 86_400_000  # Fold elapsed ticks into the offset daily (ticks_ms wraps)
+MIN_DRIFT_INTERVAL_MS = 600_000  # Syncs closer than this do not update the drift
+MAX_DRIFT_PPM = 500
+STEP_THRESHOLD_MS = 2000  # Smaller corrections are slewed into the drift, not reported
+RETRY_MIN_S = 30
+
+
+def parse_server(server, port=123):
+    """Split "host" or "host:port" """
+    if ':' in server:
+        host, port = server.rsplit(':', 1)
+        return host, int(port)
+    return server, port
+
+
+class Clock:
+    def __init__(self, server="pool.ntp.org", port=123, interval_s=6 * 3600,
+                 timeout_ms=1000, utc_offset=0, set_rtc=True, on_step=None):
+        """
+        Args:
+            server (str): NTP server, "host" or "host:port"
+            port (int): UDP port if not given in ``server``
+            interval_s (int): Seconds between syncs
+            timeout_ms (int): Wait this long for a reply
+            utc_offset (int): Seconds added for ``localtime`` (e.g. 9 * 3600 for JST)
+            set_rtc (bool): Set the RTC (UTC) after each sync
+            on_step (callable): on_step(start, end, step) when the unsynchronized
+                clock is corrected by more than STEP_THRESHOLD_MS
+        """
+        self.host, self.port = parse_server(server, port)
+        self.interval_ms = interval_s * 1000
+        self.timeout_ms = timeout_ms
+        self.utc_offset = utc_offset
+        self.set_rtc = set_rtc
+        self.on_step = on_step
+        # Unix time in ms at base_ticks; the RTC until the first sync
+        self.base_ticks = time.ticks_ms()
+        self.base_ms = (int(time.time()) + EPOCH_OFFSET) * 1000
+        self.boot_time = self.base_ms // 1000
+        self.drift_ppm = 0
+        self.synced = False
+        self.attempts = 0
+        self.failures = 0
+        self.last_sync = None  # ticks_ms of the last successful sync
+        self.next_sync = self.base_ticks
+        self.retry_s = RETRY_MIN_S
+        self.last_offset_ms = None  # Correction applied by the last sync
+        self.last_rtt_ms = None
+        self.step_window = None  # (start, end, step) of the first sync
+        # Both cores read the time; the anchor (base_ms, base_ticks, drift)
+        # is re-anchored by now_ms() and sync() and must change as one
+        self.lock = _thread.allocate_lock() if _thread is not None else None
+
+    def now_ms(self):
+        """Return Unix time in milliseconds"""
+        self.acquire()
+        try:
+            return self.read_ms()
+        finally:
+            self.release()
+
+    def read_ms(self):
+        now = time.ticks_ms()
+        elapsed = time.ticks_diff(now, self.base_ticks)
+        adjusted = elapsed + elapsed * self.drift_ppm // 1_000_000
+        if elapsed >= REANCHOR_MS:
+            self.base_ms += adjusted
+            self.base_ticks = now
+            return self.base_ms
+        return self.base_ms + adjusted
+
+    def time(self):
+        """Return Unix time in seconds"""
+        return self.now_ms() // 1000
+
+    def time_ms(self):
+        return self.now_ms()
+
+    def localtime(self, t=None):
+        """Return time.gmtime of ``t`` (default: now) shifted by utc_offset"""
+        if t is None:
+            t = self.time()
+        return time.gmtime(int(t) + self.utc_offset - EPOCH_OFFSET)
+
+    def ready(self):
+        """Return True once the time can be used for signing (synced, or NTP unreachable)"""
+        return self.synced or self.failures >= 3
+
+    def correct(self, t):
+        """Return ``t`` moved onto the synchronized clock if it was stamped before the first sync"""
+        window = self.step_window
+        if window is not None and window[0] <= t <= window[1]:
+            return t + window[2]
+        return t
+
+    def poll(self):
+        """Sync if due; returns True if a sync happened"""
+        if time.ticks_diff(time.ticks_ms(), self.next_sync) < 0:
+            return False
+        return self.sync()
+
+    def query(self):
+        """Ask the server for the time
+
+        Returns:
+            tuple: (server time in Unix ms at the moment the reply arrived,
+            ticks_ms at that moment, round trip in ms)
+        """
+        packet = bytearray(48)
+        packet[0] = 0x1B  # LI 0, version 3, mode 3 (client)
+        addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.settimeout(self.timeout_ms / 1000)
+            sent = time.ticks_ms()
+            sock.sendto(packet, addr)
+            reply = sock.recv(48)
+            received = time.ticks_ms()
+        finally:
+            sock.close()
+        if len(reply) < 48 or reply[1] == 0:  # Stratum 0: kiss-of-death
+            raise ValueError("Bad NTP reply")
+        rx_s, rx_f, tx_s, tx_f = struct.unpack_from("!IIII", reply, 32)
+        server_rx = (rx_s - NTP_DELTA) * 1000 + (rx_f * 1000 >> 32)
+        server_tx = (tx_s - NTP_DELTA) * 1000 + (tx_f * 1000 >> 32)
+        rtt = max(0, time.ticks_diff(received, sent) - (server_tx - server_rx))
+        return server_tx + rtt // 2, received, rtt
+
+    def sync(self):
+        """Query the server now and adjust offset and drift; returns True on success"""
+        self.attempts += 1
+        try:
+            server_ms, at_ticks, rtt = self.query()
+        except (OSError, ValueError, IndexError) as e:
+            print(f"Error syncing clock with {self.host}: {e}")
+            self.failures += 1
+            self.next_sync = time.ticks_add(time.ticks_ms(), self.retry_s * 1000)
+            self.retry_s = min(self.retry_s * 2, self.interval_ms // 1000)
+            return False
+        self.acquire()
+        try:
+            elapsed = time.ticks_diff(at_ticks, self.base_ticks)
+            local_ms = self.base_ms + elapsed + elapsed * self.drift_ppm // 1_000_000
+            offset = server_ms - local_ms
+            if self.synced and self.last_sync is not None:
+                interval = time.ticks_diff(at_ticks, self.last_sync)
+                if interval >= MIN_DRIFT_INTERVAL_MS and abs(offset) < STEP_THRESHOLD_MS:
+                    # The error accumulated since the last sync is the residual drift
+                    measured = self.drift_ppm + offset * 1_000_000 // interval
+                    self.drift_ppm = max(-MAX_DRIFT_PPM, min(MAX_DRIFT_PPM, (self.drift_ppm + measured) // 2))
+            self.base_ms = server_ms
+            self.base_ticks = at_ticks
+        finally:
+            self.release()
+        if not self.synced and abs(offset) >= STEP_THRESHOLD_MS:
+            step = offset // 1000
+            self.step_window = (self.boot_time, local_ms // 1000, step)
+            print(f"Clock stepped by {step} s")
+        first = not self.synced
+        self.synced = True
+        self.failures = 0
+        self.last_sync = at_ticks
+        self.last_offset_ms = offset
+        self.last_rtt_ms = rtt
+        self.retry_s = RETRY_MIN_S
+        self.next_sync = time.ticks_add(at_ticks, self.interval_ms)
+        if self.set_rtc and machine is not None:
+            self.update_rtc()
+        if first and self.step_window is not None and self.on_step is not None:
+            self.on_step(*self.step_window)
+        return True
+
+    def acquire(self):
+        if self.lock is not None:
+            self.lock.acquire()
+
+    def release(self):
+        if self.lock is not None:
+            self.lock.release()
+
+    def update_rtc(self):
+        t = time.gmtime(self.time() - EPOCH_OFFSET)
+        try:
+            machine.RTC().datetime((t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0))
+        except (AttributeError, OSError) as e:
+            print(f"Error setting RTC: {e}")
@@ -0,0 +1,207 @@
+"""Coalescing command dispatcher with optimistic state
+
+Commands are queued per target (a device or a scene) and sent after a short
+coalescing window, one request at a time:
+
+- repeated taps on the same device collapse into one command;
+- on/off flapping keeps only the last command, and is dropped entirely when
+  the device ends up where it already is;
+- a scene runs several device actions in a single API request.
+
+The expected power state is applied immediately (``state()``) so the UI can
+redraw in the same frame, and is confirmed or rolled back when the response
+arrives. Requests are sent from ``poll()`` on the caller's core. With
+``use_thread=True`` they run on a thread on the second core instead, which is
+only safe if the send functions share no state (HTTP/TLS stack, counters)
+with code running on the first core; results are still handled in ``poll()``.
+
+Usage:
+    commands = CommandQueue(display.control_device, display.execute_scene, on_result)
+    commands.submit(device_id, "turnOn")
+    while True:
+        commands.poll()
+"""
+
+import time
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+# Power state each command leads to (commands not listed leave it unknown)
+COMMAND_STATES = {"turnOn": "on", "turnOff": "off"}
+
+
+class CommandQueue:
+    def __init__(self, send_command, send_scene, on_result=None, coalesce_ms=300,
+                 max_retries=2, retry_ms=1000, use_thread=False):
+        """
+        Args:
+            send_command (callable): send_command(device_id, command, parameter)
+                -> True, False (rejected) or None (network error, retried)
+            send_scene (callable): send_scene(scene_id) -> True, False or None
+            on_result (callable): on_result(target, ok) once a request completes
+            coalesce_ms (int): Wait this long after the last tap before sending
+            max_retries (int): Retries after network errors
+            retry_ms (int): Delay before a retry
+            use_thread (bool): Send from a thread on the second core when possible
+                (see the module docstring)
+        """
+        self.send_command = send_command
+        self.send_scene = send_scene
+        self.on_result = on_result
+        self.coalesce_ms = coalesce_ms
+        self.max_retries = max_retries
+        self.retry_ms = retry_ms
+        self.use_thread = use_thread and _thread is not None
+        # Pending requests in submission order: [target, command, parameter, due_ms, retries]
+        # target is ('device', device_id) or ('scene', scene_id)
+        self.pending = []
+        self.confirmed = {}  # {device_id: 'on' | 'off'} as last acknowledged
+        self.optimistic = {}  # {device_id: 'on' | 'off'} expected after pending commands
+        self.scene_effects = {}  # {scene_id: {device_id: command}}
+        self.in_flight = None
+        self.result = None  # (entry, outcome) written by the sender
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def state(self, device_id):
+        """Return the power state to show: optimistic, confirmed or None (unknown)"""
+        state = self.optimistic.get(device_id)
+        return state if state is not None else self.confirmed.get(device_id)
+
+    def busy(self, device_id):
+        """Return True while a command for the device is pending or in flight"""
+        return device_id in self.optimistic
+
+    def find(self, target):
+        for entry in self.pending:
+            if entry[0] == target:
+                return entry
+        return None
+
+    def submit(self, device_id, command, parameter="default"):
+        """Queue a device command and apply its expected state at once"""
+        target = ('device', device_id)
+        due = time.ticks_add(time.ticks_ms(), self.coalesce_ms)
+        expected = COMMAND_STATES.get(command)
+        entry = self.find(target)
+        if entry is not None:
+            # A newer command for the same device replaces the queued one
+            self.coalesced += 1
+            if expected is not None and expected == self.confirmed.get(device_id) and not self.in_flight_for(target):
+                # Flapping back to where the device already is: send nothing
+                self.pending.remove(entry)
+                self.optimistic.pop(device_id, None)
+                return
+            entry[1] = command
+            entry[2] = parameter
+            entry[3] = due
+        else:
+            self.pending.append([target, command, parameter, due, 0])
+        if expected is not None:
+            self.optimistic[device_id] = expected
+
+    def toggle(self, device_id):
+        """Queue turnOff if the device is (expected to be) on, turnOn otherwise"""
+        self.submit(device_id, "turnOff" if self.state(device_id) == "on" else "turnOn")
+
+    def run_scene(self, scene_id, effects=None):
+        """Queue a scene; ``effects`` {device_id: command} gives the optimistic states"""
+        target = ('scene', scene_id)
+        due = time.ticks_add(time.ticks_ms(), self.coalesce_ms)
+        effects = effects or {}
+        self.scene_effects[scene_id] = effects
+        entry = self.find(target)
+        if entry is not None:
+            self.coalesced += 1  # Tapping a scene twice runs it once
+            entry[3] = due
+        else:
+            self.pending.append([target, None, None, due, 0])
+        for device_id, command in effects.items():
+            # The scene supersedes queued commands for the same devices
+            device_entry = self.find(('device', device_id))
+            if device_entry is not None:
+                self.pending.remove(device_entry)
+                self.coalesced += 1
+            expected = COMMAND_STATES.get(command)
+            if expected is not None:
+                self.optimistic[device_id] = expected
+
+    def in_flight_for(self, target):
+        return self.in_flight is not None and self.in_flight[0] == target
+
+    def poll(self):
+        """Handle a finished request, then send the next due one"""
+        if self.result is not None:
+            entry, outcome = self.result
+            self.result = None
+            self.in_flight = None
+            self.finish(entry, outcome)
+        if self.in_flight is not None or not self.pending:
+            return
+        now = time.ticks_ms()
+        for entry in self.pending:
+            if time.ticks_diff(now, entry[3]) >= 0:
+                self.pending.remove(entry)
+                self.dispatch(entry)
+                return
+
+    def dispatch(self, entry):
+        self.in_flight = entry
+        if self.use_thread:
+            try:
+                _thread.start_new_thread(self.send, (entry,))
+                return
+            except OSError:
+                pass  # Second core is busy; send from this core instead
+        self.send(entry)
+
+    def send(self, entry):
+        target = entry[0]
+        try:
+            if target[0] == 'scene':
+                outcome = self.send_scene(target[1])
+            else:
+                outcome = self.send_command(target[1], entry[1], entry[2])
+        except Exception as e:
+            print(f"Error sending command: {e}")
+            outcome = None
+        self.sent += 1
+        self.result = (entry, outcome)
+
+    def finish(self, entry, outcome):
+        target = entry[0]
+        if outcome is None and entry[4] < self.max_retries and self.find(target) is None:
+            # Network error: retry unless a newer command was queued meanwhile
+            entry[4] += 1
+            entry[3] = time.ticks_add(time.ticks_ms(), self.retry_ms)
+            self.pending.append(entry)
+            return
+        ok = bool(outcome)
+        if target[0] == 'scene':
+            devices = self.scene_effects.get(target[1], {})
+        else:
+            devices = {target[1]: entry[1]}
+        for device_id, command in devices.items():
+            expected = COMMAND_STATES.get(command)
+            if ok and expected is not None:
+                self.confirmed[device_id] = expected
+            # A newer queued command keeps its optimistic state; otherwise the
+            # display falls back to the confirmed state (rolled back on failure)
+            if self.find(('device', device_id)) is None:
+                self.optimistic.pop(device_id, None)
+        if not ok:
+            self.failed += 1
+        if self.on_result:
+            self.on_result(target, ok)
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'failed': self.failed,
+        }
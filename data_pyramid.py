@@ -0,0 +1,424 @@
+"""Long-term meter history on flash and a multi-resolution pyramid for graphs
+
+``HistoryLog`` appends every sample of a meter to a small binary file
+(10 bytes per sample), keeping about ``max_records`` of them. When a graph
+is opened, ``DataPyramid`` loads the log into compact arrays and builds
+coarser levels by averaging ``factor`` neighbouring samples, so any time
+window can be drawn from the finest level that has at most about
+plot-width points in it. Each coarse bucket also keeps the min, max, sum
+and count of the samples under it, so ``stats`` answers min/max/mean over
+any time range in O(factor * levels), i.e. O(log n), without the averaging
+flattening peaks. ``append`` and ``evict`` keep every level up to date as
+samples arrive and expire.
+
+Usage:
+    log = HistoryLog("history_C0FFEE000001.bin", max_records=2016)
+    log.append(data_point)
+    pyramid = DataPyramid.load(log)
+    level, lo, hi = pyramid.select(t0, t1, max_points=180)
+    pyramid.append(DataPyramid.pack(data_point))
+    pyramid.evict(log.first())
+    low, high, mean = pyramid.stats(0, t0, t1)   # temperature
+"""
+
+import os
+import struct
+from array import array
+
+RECORD = "<Ihhh"  # timestamp, temperature*10, humidity*10, co2
+RECORD_SIZE = struct.calcsize(RECORD)
+NONE = -32768
+FIELDS = ('temperature', 'humidity', 'co2')
+SCALES = (10, 10, 1)
+READ_CHUNK = 64  # Records read from flash at a time
+
+
+def encode(value, scale):
+    if value is None:
+        return NONE
+    return max(-32767, min(32767, int(round(value * scale))))
+
+
+def decode(raw, scale):
+    return None if raw == NONE else raw / scale
+
+
+class HistoryLog:
+    def __init__(self, path, max_records):
+        """
+        Args:
+            path (str): Log file on flash
+            max_records (int): Samples to keep; the file is trimmed once it
+                grows a quarter beyond this
+        """
+        self.path = path
+        self.max_records = max_records
+        self.last_time = None
+        self.first_time = None  # Cached by first(); reset when the file is rewritten
+
+    def size(self):
+        try:
+            return os.stat(self.path)[6] // RECORD_SIZE
+        except OSError:
+            return 0
+
+    def append(self, data_point):
+        timestamp = int(data_point['timestamp'])
+        if self.last_time is not None and timestamp <= self.last_time:
+            return  # Already logged (e.g. the same sample replayed)
+        record = struct.pack(
+            RECORD, timestamp,
+            *[encode(data_point.get(field), scale) for field, scale in zip(FIELDS, SCALES)]
+        )
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(record)
+            self.last_time = timestamp
+            if self.size() > self.max_records + self.max_records // 4:
+                self.trim()
+        except OSError as e:
+            print(f"Error appending history log: {e}")
+
+    def trim(self):
+        """Rewrite the file with only the newest max_records samples"""
+        keep = self.max_records * RECORD_SIZE
+        tmp = self.path + ".tmp"
+        with open(self.path, 'rb') as src, open(tmp, 'wb') as dst:
+            src.seek(-keep, 2)
+            while True:
+                chunk = src.read(READ_CHUNK * RECORD_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        os.rename(tmp, self.path)
+        self.first_time = None
+
+    def shift(self, start, end, step):
+        """Move samples stamped within [start, end] by ``step`` seconds (clock correction)
+
+        Samples that would no longer be newer than the one before are dropped,
+        so the file stays in time order.
+        """
+        tmp = self.path + ".tmp"
+        last = None
+        try:
+            with open(tmp, 'wb') as dst:
+                for record in self.records():
+                    timestamp = record[0]
+                    if start <= timestamp <= end:
+                        timestamp += step
+                    if last is not None and timestamp <= last:
+                        continue
+                    dst.write(struct.pack(RECORD, timestamp, *record[1:]))
+                    last = timestamp
+            os.rename(tmp, self.path)
+        except OSError as e:
+            print(f"Error shifting history log: {e}")
+            return
+        self.last_time = last
+        self.first_time = None
+
+    def first(self):
+        """Return the oldest logged timestamp, or None if the log is empty"""
+        if self.first_time is None:
+            self.first_time = self.bounds()[0]
+        return self.first_time
+
+    def bounds(self):
+        """Return (first, last) timestamp and the record count, or (None, None, 0)"""
+        count = self.size()
+        if not count:
+            return None, None, 0
+        try:
+            with open(self.path, 'rb') as f:
+                first = struct.unpack(RECORD, f.read(RECORD_SIZE))[0]
+                f.seek((count - 1) * RECORD_SIZE)
+                last = struct.unpack(RECORD, f.read(RECORD_SIZE))[0]
+        except (OSError, ValueError):
+            return None, None, 0
+        return first, last, count
+
+    def records(self):
+        """Yield (timestamp, temperature, humidity, co2) raw tuples, oldest first"""
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return
+        with f:
+            while True:
+                chunk = f.read(READ_CHUNK * RECORD_SIZE)
+                if not chunk:
+                    break
+                for offset in range(0, len(chunk) - RECORD_SIZE + 1, RECORD_SIZE):
+                    yield struct.unpack_from(RECORD, chunk, offset)
+
+
+class PyramidLevel:
+    """One resolution: timestamps plus one int16 array per field
+
+    ``series`` holds the bucket means that are drawn. Coarse levels also
+    hold per-bucket min/max (int16), sum and count (int32) of non-missing
+    samples; at level 0 a sample is its own min and max. A sum cannot
+    overflow before a bucket covers 65536 samples, far more than a log holds.
+    """
+
+    def __init__(self, count=0, coarse=False):
+        self.times = array('L', [0] * count)
+        self.series = [array('h', [0] * count) for _ in FIELDS]
+        if coarse:
+            self.mins = [array('h', [0] * count) for _ in FIELDS]
+            self.maxs = [array('h', [0] * count) for _ in FIELDS]
+            self.sums = [array('l', [0] * count) for _ in FIELDS]
+            self.counts = [array('l', [0] * count) for _ in FIELDS]
+        else:
+            self.mins = self.maxs = self.series
+            self.sums = self.counts = None
+
+    def __len__(self):
+        return len(self.times)
+
+    def bisect(self, timestamp, right=False):
+        """Return the first index whose time is >= timestamp (> if right)"""
+        times = self.times
+        lo, hi = 0, len(times)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[mid] < timestamp or (right and times[mid] == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def value(self, field_index, i):
+        return decode(self.series[field_index][i], SCALES[field_index])
+
+    def grow(self):
+        """Add one zeroed bucket at the end"""
+        self.times.append(0)
+        groups = (self.series,) if self.counts is None else (
+            self.series, self.mins, self.maxs, self.sums, self.counts)
+        for arrays in groups:
+            for values in arrays:
+                values.append(0)
+
+    def drop(self, count):
+        """Remove the oldest ``count`` buckets"""
+        self.times = self.times[count:]
+        self.series = [values[count:] for values in self.series]
+        if self.counts is None:
+            self.mins = self.maxs = self.series
+        else:
+            self.mins = [values[count:] for values in self.mins]
+            self.maxs = [values[count:] for values in self.maxs]
+            self.sums = [values[count:] for values in self.sums]
+            self.counts = [values[count:] for values in self.counts]
+
+    def fold(self, field_index, i, acc):
+        """Fold bucket i into acc = [min, max, sum, count] (raw values)"""
+        if self.counts is None:
+            value = self.series[field_index][i]
+            if value == NONE:
+                return
+            low = high = total = value
+            used = 1
+        else:
+            used = self.counts[field_index][i]
+            if not used:
+                return
+            low = self.mins[field_index][i]
+            high = self.maxs[field_index][i]
+            total = self.sums[field_index][i]
+        if acc[3] == 0 or low < acc[0]:
+            acc[0] = low
+        if acc[3] == 0 or high > acc[1]:
+            acc[1] = high
+        acc[2] += total
+        acc[3] += used
+
+
+class DataPyramid:
+    def __init__(self, level0, factor=4, min_points=32):
+        """
+        Args:
+            level0 (PyramidLevel): Full-resolution samples, oldest first
+            factor (int): Samples averaged into one at each coarser level
+            min_points (int): Stop adding levels below this many points
+        """
+        self.factor = factor
+        self.min_points = min_points
+        self.levels = [level0]
+        level = level0
+        while len(level) > min_points:
+            level = self.downsample(level, factor)
+            self.levels.append(level)
+
+    @classmethod
+    def load(cls, log, before=(), after=()):
+        """Build a pyramid from a HistoryLog
+
+        Args:
+            before (list): Data points used for times older than the log
+                (e.g. the in-memory hourly averages)
+            after (list): Data points used for times newer than the log
+        """
+        # The arrays are sized up front and the log is streamed into them, so
+        # a week of samples never exists as a list of tuples
+        first, last, count = log.bounds() if log is not None else (None, None, 0)
+        head = [d for d in before if first is None or int(d['timestamp']) < first]
+        if first is None:
+            last = int(head[-1]['timestamp']) if head else None
+        tail = [d for d in after if last is None or int(d['timestamp']) > last]
+        total = len(head) + count + len(tail)
+        level0 = PyramidLevel(total)
+        i = 0
+        for d in head:
+            cls.store(level0, i, cls.pack(d))
+            i += 1
+        if count:
+            for record in log.records():
+                if i == len(head) + count:
+                    break  # Appended while loading
+                cls.store(level0, i, record)
+                i += 1
+        for d in tail:
+            cls.store(level0, i, cls.pack(d))
+            i += 1
+        return cls(level0)
+
+    @staticmethod
+    def store(level, i, record):
+        level.times[i] = record[0]
+        for f in range(len(FIELDS)):
+            level.series[f][i] = record[f + 1]
+
+    @staticmethod
+    def pack(data_point):
+        return (int(data_point['timestamp']),) + tuple(
+            encode(data_point.get(field), scale) for field, scale in zip(FIELDS, SCALES)
+        )
+
+    @staticmethod
+    def downsample(level, factor):
+        count = (len(level) + factor - 1) // factor
+        coarse = PyramidLevel(count, coarse=True)
+        for j in range(count):
+            DataPyramid.summarize(level, coarse, j, factor)
+        return coarse
+
+    @staticmethod
+    def summarize(fine, coarse, j, factor):
+        """Recompute bucket j of ``coarse`` from its samples in ``fine``"""
+        start = j * factor
+        end = min(start + factor, len(fine))
+        coarse.times[j] = sum(fine.times[start:end]) // (end - start)
+        acc = [0, 0, 0, 0]
+        for f in range(len(FIELDS)):
+            acc[0] = acc[1] = acc[2] = acc[3] = 0
+            for i in range(start, end):
+                fine.fold(f, i, acc)
+            used = acc[3]
+            coarse.series[f][j] = acc[2] // used if used else NONE
+            coarse.mins[f][j] = acc[0] if used else NONE
+            coarse.maxs[f][j] = acc[1] if used else NONE
+            coarse.sums[f][j] = acc[2]
+            coarse.counts[f][j] = used
+
+    def append(self, record):
+        """Add a (timestamp, temperature, humidity, co2) raw record
+
+        Older or repeated timestamps are ignored. Only the last bucket of
+        each level is recomputed, and a level is added once the top one
+        outgrows ``min_points``.
+        """
+        level0 = self.levels[0]
+        if len(level0) and record[0] <= level0.times[-1]:
+            return
+        level0.grow()
+        self.store(level0, len(level0) - 1, record)
+        for k in range(1, len(self.levels)):
+            fine = self.levels[k - 1]
+            coarse = self.levels[k]
+            j = (len(fine) - 1) // self.factor
+            if j == len(coarse):
+                coarse.grow()
+            self.summarize(fine, coarse, j, self.factor)
+        top = self.levels[-1]
+        if len(top) > self.min_points:
+            self.levels.append(self.downsample(top, self.factor))
+
+    def evict(self, timestamp):
+        """Drop samples older than ``timestamp`` (e.g. trimmed from the log)
+
+        Samples go in whole buckets of the top level, so every coarse bucket
+        keeps covering the same samples; up to one such bucket of expired
+        samples stays until the next call. Levels that are no longer needed
+        are removed.
+        """
+        if timestamp is None:
+            return
+        unit = self.factor ** (len(self.levels) - 1)
+        count = self.levels[0].bisect(timestamp) // unit * unit
+        if not count:
+            return
+        for level in self.levels:
+            level.drop(count)
+            count //= self.factor
+        while len(self.levels) > 1 and len(self.levels[-2]) <= self.min_points:
+            self.levels.pop()
+
+    def extent(self):
+        """Return (first, last) timestamp, or None if there is no data"""
+        times = self.levels[0].times
+        if not times:
+            return None
+        return times[0], times[-1]
+
+    def select(self, t0, t1, max_points):
+        """Pick the finest level with at most max_points samples in [t0, t1]
+
+        Returns:
+            tuple: (level, lo, hi); indices lo..hi-1 include one sample on
+            each side of the window so lines reach the plot edges
+        """
+        for level in self.levels:
+            lo = max(0, level.bisect(t0) - 1)
+            hi = min(len(level), level.bisect(t1, right=True) + 1)
+            if hi - lo <= max_points:
+                return level, lo, hi
+
+    def stats(self, field_index, t0, t1):
+        """Return (min, max, mean) of a field over samples stamped in [t0, t1]
+
+        Returns None if there is no value in the range.
+        """
+        level0 = self.levels[0]
+        return self.span_stats(field_index, 0, level0.bisect(t0), level0.bisect(t1, right=True))
+
+    def span_stats(self, field_index, k, lo, hi):
+        """Return (min, max, mean) of a field over buckets lo..hi-1 of level k
+
+        Whole buckets of the next level are taken from it, so only the ragged
+        ends are visited at each level. Returns None if there is no value.
+        """
+        acc = [0, 0, 0, 0]
+        factor = self.factor
+        last = len(self.levels) - 1
+        while lo < hi:
+            level = self.levels[k]
+            if k == last:
+                for i in range(lo, hi):
+                    level.fold(field_index, i, acc)
+                break
+            while lo < hi and lo % factor:
+                level.fold(field_index, lo, acc)
+                lo += 1
+            while lo < hi and hi % factor:
+                hi -= 1
+                level.fold(field_index, hi, acc)
+            lo //= factor
+            hi //= factor
+            k += 1
+        if not acc[3]:
+            return None
+        scale = SCALES[field_index]
+        return acc[0] / scale, acc[1] / scale, acc[2] / acc[3] / scale
@@ -0,0 +1,192 @@
+"""Virtualized, scrollable list of rows (used for the device list screen)
+
+Only rows inside the viewport are ever drawn. Each row is recorded once by
+``render_row`` as display-list ops relative to the row's own origin and kept
+while it is visible; rows that scroll out are dropped and the cache is reused
+for the rows scrolling in, so at most a screenful of rows is held however
+long the list is.
+
+Scrolling:
+- in portrait orientation the panel's hardware scroll (VSCRDEF/VSCSAD) moves
+  the rows already on screen and only the newly exposed lines are rendered;
+  the viewport's panel rows are used as a ring buffer (content line ``c``
+  always lives in panel row ``y + c % height``);
+- in landscape the panel scrolls along the wrong axis, so the viewport is
+  re-rendered from the cached rows through the strip renderer.
+
+Usage:
+    rows = DeviceList(lcd, (10, 44, 460, 240), 30, render_row, BACKGROUND_COLOR)
+    rows.set_count(len(entries))
+    rows.draw()
+    while True:
+        index = rows.handle_touch(lcd.get_touch_points())  # tapped row or None
+"""
+
+TAP_SLOP = 8  # Pixels a finger may move before a touch becomes a drag
+
+
+class DeviceList:
+    def __init__(self, lcd, rect, row_height, render_row, bg_color, hardware_scroll=None):
+        """
+        Args:
+            lcd (lcd_st7796): Display
+            rect (tuple): Viewport (x, y, w, h); h should be a multiple of row_height
+            row_height (int): Height of each row in pixels
+            render_row (callable): render_row(index, width, height) -> list of
+                ('r', ...) and ('t', ...) ops relative to the row's top left
+            bg_color (int): Viewport background in RGB565 format
+            hardware_scroll (bool): Use the panel's scroll registers (default:
+                when the orientation allows it)
+        """
+        self.lcd = lcd
+        self.x, self.y, self.width, self.height = rect
+        self.row_height = row_height
+        self.render_row = render_row
+        self.bg_color = bg_color
+        if hardware_scroll is None:
+            hardware_scroll = lcd.hardware_scroll()
+        self.hardware_scroll = hardware_scroll
+        self.count = 0
+        self.offset = 0  # Content line at the top of the viewport
+        self.rows = {}  # {index: ops} for the visible rows
+        self.drag = None  # [start x, start y, start offset, moved]
+        self.scrolled = False  # The panel's scroll area is set up
+
+    def set_count(self, count):
+        self.count = count
+        self.rows = {}
+        self.offset = min(self.offset, self.max_offset())
+
+    def max_offset(self):
+        return max(0, self.count * self.row_height - self.height)
+
+    def visible(self, top, bottom):
+        """Return (first, last) row indices with lines in [top, bottom), last exclusive"""
+        first = max(0, top // self.row_height)
+        last = min(self.count, (bottom + self.row_height - 1) // self.row_height)
+        return first, last
+
+    def invalidate(self, index=None):
+        """Forget the recorded ops of a row (all rows if index is None)"""
+        if index is None:
+            self.rows = {}
+        else:
+            self.rows.pop(index, None)
+
+    def recycle(self):
+        """Drop the recorded rows that scrolled out of the viewport"""
+        first, last = self.visible(self.offset, self.offset + self.height)
+        for index in list(self.rows):
+            if index < first or index >= last:
+                del self.rows[index]
+
+    def render(self, top, bottom, screen_y):
+        """Render content lines [top, bottom) with line ``top`` at panel row ``screen_y``"""
+        lcd = self.lcd
+        lcd.begin_frame()
+        lcd.fill_rectangle(self.x, screen_y, self.width, bottom - top, self.bg_color)
+        frame = lcd.frame_ops
+        first, last = self.visible(top, bottom)
+        for index in range(first, last):
+            ops = self.rows.get(index)
+            if ops is None:
+                ops = self.rows[index] = self.render_row(index, self.width, self.row_height)
+            y = screen_y + index * self.row_height - top
+            for op in ops:
+                frame.append((op[0], self.x + op[1], y + op[2]) + op[3:])
+        lcd.end_frame(clip=(self.x, screen_y, self.x + self.width - 1, screen_y + bottom - top - 1))
+
+    def render_lines(self, top, bottom):
+        """Render content lines [top, bottom), which must be visible"""
+        if not self.hardware_scroll:
+            self.render(top, bottom, self.y + top - self.offset)
+            return
+        # Content lines live in the panel rows of the viewport as a ring buffer
+        start = top % self.height
+        first = min(bottom - top, self.height - start)
+        self.render(top, top + first, self.y + start)
+        if first < bottom - top:
+            self.render(top + first, bottom, self.y)
+
+    def draw(self):
+        """Repaint the whole viewport"""
+        if self.hardware_scroll:
+            self.lcd.set_scroll_area(self.y, self.height)
+            self.lcd.set_scroll_start(self.y + self.offset % self.height)
+            self.scrolled = True
+        self.render_lines(self.offset, self.offset + self.height)
+        self.recycle()
+
+    def redraw(self, index):
+        """Repaint one row, e.g. after its state changed"""
+        self.rows.pop(index, None)
+        top = max(self.offset, index * self.row_height)
+        bottom = min(self.offset + self.height, (index + 1) * self.row_height)
+        if top < bottom:
+            self.render_lines(top, bottom)
+
+    def scroll_to(self, offset):
+        """Scroll so content line ``offset`` is at the top; returns True if it moved"""
+        offset = max(0, min(int(offset), self.max_offset()))
+        delta = offset - self.offset
+        if not delta:
+            return False
+        self.offset = offset
+        if self.hardware_scroll and abs(delta) < self.height:
+            # Shift what is on screen, then fill in the exposed lines
+            self.lcd.set_scroll_start(self.y + offset % self.height)
+            if delta > 0:
+                self.render_lines(offset + self.height - delta, offset + self.height)
+            else:
+                self.render_lines(offset, offset - delta)
+            self.recycle()
+        else:
+            self.draw()
+        return True
+
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def item_at(self, x, y):
+        """Return the index of the row at screen position (x, y), or None"""
+        if not self.contains(x, y):
+            return None
+        index = (self.offset + y - self.y) // self.row_height
+        return index if index < self.count else None
+
+    def dragging(self):
+        return self.drag is not None
+
+    def handle_touch(self, points):
+        """Scroll with a drag; report a tap once the finger is lifted
+
+        Args:
+            points (list): Points touched right now (lcd.get_touch_points())
+
+        Returns:
+            int: Index of the tapped row, or None
+        """
+        drag = self.drag
+        if not points:
+            self.drag = None
+            if drag is not None and not drag[3]:
+                return self.item_at(drag[0], drag[1])
+            return None
+        x, y = points[0]
+        if drag is None:
+            if self.contains(x, y):
+                self.drag = [x, y, self.offset, False]
+            return None
+        if not drag[3] and abs(y - drag[1]) < TAP_SLOP:
+            return None
+        drag[3] = True
+        self.scroll_to(drag[2] - (y - drag[1]))
+        return None
+
+    def close(self):
+        """Restore the panel's scroll registers before other screens are drawn"""
+        if self.scrolled:
+            self.lcd.reset_scroll()
+            self.scrolled = False
+        self.rows = {}
+        self.drag = None
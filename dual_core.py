@@ -0,0 +1,173 @@
+"""Run polling and persistence on the RP2040's second core
+
+The UI core (core 0) keeps rendering and handling touch; the worker on
+core 1 performs the HTTPS requests (including notification posts), JSON
+parsing and flash writes. Finished samples and device lists are handed over
+through a preallocated, lock-protected queue; only the UI core changes the
+state it renders from.
+
+Usage:
+    display = SwitchBotDisplay(dual_core=True)
+    display.run()
+"""
+
+import _thread
+import time
+
+
+class MessageQueue:
+    """Fixed-size FIFO shared between the two cores
+
+    All slots are allocated up front; ``put`` never grows the queue and
+    returns False when it is full.
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self.kinds = [None] * size
+        self.times = [0] * size
+        self.payloads = [None] * size
+        self.head = 0
+        self.count = 0
+        self.lock = _thread.allocate_lock()
+
+    def put(self, kind, timestamp, payload=None):
+        with self.lock:
+            if self.count == self.size:
+                return False
+            index = (self.head + self.count) % self.size
+            self.kinds[index] = kind
+            self.times[index] = timestamp
+            self.payloads[index] = payload
+            self.count += 1
+            return True
+
+    def get(self):
+        """Return (kind, timestamp, payload), or None if the queue is empty"""
+        with self.lock:
+            if self.count == 0:
+                return None
+            index = self.head
+            message = (self.kinds[index], self.times[index], self.payloads[index])
+            self.payloads[index] = None  # Drop the reference for the GC
+            self.head = (index + 1) % self.size
+            self.count -= 1
+            return message
+
+
+class PollWorker:
+    """Polling/persistence loop for core 1
+
+    Messages to the UI core: ('devices', time, fetch_devices result) before
+    each ('samples', time, [(device_id, data_point), ...]), ('pushed', time,
+    None) to record the webhook/BLE readings for this tick, and ('failed',
+    time, None). The UI core asks for persistence by setting
+    ``persist_requested`` and for an immediate poll with ``refresh_requested``.
+    Polls are scheduled in ticks, so clock steps on the UI core do not move them.
+    """
+
+    def __init__(self, display, clock, retry_s, queue_size=4):
+        """
+        Args:
+            display (SwitchBotDisplay): Owner of the history, polled for samples
+            clock (Clock): The display's clock; poll times stamp the samples
+            retry_s (int): Seconds to wait before retrying after a failed poll
+                (the display's FAILED_POLL_RETRY)
+            queue_size (int): Messages the UI core may lag behind
+        """
+        self.display = display
+        self.clock = clock
+        self.retry_s = retry_s
+        self.queue = MessageQueue(queue_size)
+        # Taken by the UI core while ingesting and by the worker while saving
+        self.history_lock = _thread.allocate_lock()
+        self.running = False
+        self.persist_requested = False
+        self.refresh_requested = False
+        self.next_poll = None  # ticks_ms of the next poll; None polls now
+
+    def start(self):
+        self.running = True
+        _thread.start_new_thread(self.run, ())
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        display = self.display
+        while self.running:
+            due = (self.refresh_requested or self.next_poll is None
+                   or time.ticks_diff(time.ticks_ms(), self.next_poll) >= 0)
+            if due and display.wifi_ready() and display.polling_allowed():
+                now = self.clock.time()
+                # Pushed webhook/BLE values stand in for polls until reconciliation is due
+                if not self.refresh_requested and display.push_active(now):
+                    self.put("pushed", now)
+                    self.schedule(display.update_interval)
+                else:
+                    result = display.fetch_samples(now)
+                    if result is None:
+                        self.put("failed", now)
+                        self.schedule(self.retry_s)
+                    else:
+                        self.put("devices", now, result[0])
+                        self.put("samples", now, result[1])
+                        self.schedule(display.update_interval)
+                self.refresh_requested = False
+
+            # Alert notifications are posted from here, not from the UI core
+            if display.notifier is not None and display.wifi_ready():
+                display.notifier.poll()
+
+            if self.persist_requested:
+                self.persist_requested = False
+                with self.history_lock:
+                    display.save_data()
+                    display.save_screen_cache()
+
+            time.sleep_ms(50)
+
+    def schedule(self, seconds):
+        self.next_poll = time.ticks_add(time.ticks_ms(), seconds * 1000)
+
+    def put(self, kind, timestamp, payload=None):
+        # Wait for the UI core to drain the queue rather than dropping data
+        while not self.queue.put(kind, timestamp, payload):
+            time.sleep_ms(10)
+
+    def process_messages(self):
+        """Apply queued device lists, samples and failures on the UI core without ever blocking
+
+        Returns:
+            bool: True if the screen needs a redraw (new samples, or the values
+            became stale after a failed poll)
+        """
+        updated = False
+        redraw = False
+        while self.queue.count:
+            # Skip this round if the worker is saving; try again next loop
+            if not self.history_lock.acquire(0):
+                break
+            try:
+                message = self.queue.get()
+                if message is None:
+                    break
+                kind, timestamp, payload = message
+                if kind == "devices":
+                    self.display.set_devices(payload)
+                elif kind == "samples":
+                    self.display.last_reconcile = timestamp
+                    self.display.apply_samples(payload, timestamp)
+                    updated = True
+                elif kind == "pushed":
+                    samples = self.display.live_samples(timestamp)
+                    self.display.apply_samples(samples, timestamp, True)
+                    updated = True
+                elif kind == "failed":
+                    # Same handling as a failed poll in single-core mode
+                    redraw = self.display.poll_failed() or redraw
+            finally:
+                self.history_lock.release()
+        if updated:
+            self.persist_requested = True
+        return updated or redraw
@@ -0,0 +1,309 @@
+"""LAN fan-out of meter snapshots to several display nodes
+
+One node (the leader) polls the SwitchBot cloud and broadcasts compact
+binary snapshots over UDP multicast; the other nodes (followers) render
+from them and only poll the cloud themselves while the leader is silent.
+
+Packet layout (little endian):
+    header:   magic '4s', version 'B', kind 'B', seq 'I', timestamp 'I',
+              part 'B', parts 'B', count 'B'
+    SNAPSHOT: count x (device_id '12s', temp*10 'h', humidity 'B', co2 'H', flags 'B')
+    DEVICES:  count x (device_id '12s', type 'B', name_len 'B', name bytes)
+
+A snapshot or device list that does not fit in one MAX_PACKET datagram is
+split into ``parts`` packets with the same timestamp; followers apply it once
+every part has arrived. Missing values are sent as TEMP_NONE / HUMIDITY_NONE
+/ CO2_NONE and decoded to None.
+"""
+
+import socket
+import struct
+import time
+
+MAGIC = b"SBFO"
+VERSION = 2
+KIND_SNAPSHOT = 1
+KIND_DEVICES = 2
+
+HEADER = "<4sBBIIBBB"
+HEADER_SIZE = struct.calcsize(HEADER)
+MAX_PACKET = 1472  # UDP payload of a 1500-byte Ethernet frame
+RECORD = "<12shBHB"
+RECORD_SIZE = struct.calcsize(RECORD)
+DEVICE_HEADER = "<12sBB"
+DEVICE_HEADER_SIZE = struct.calcsize(DEVICE_HEADER)
+
+TEMP_NONE = -32768
+HUMIDITY_NONE = 0xFF
+CO2_NONE = 0xFFFF
+
+DEVICE_TYPES = ("Meter", "MeterPro(CO2)", "WoIOSensor", "MeterPlus", "MeterPro")
+
+RESTART_SEQ = 4
+
+MULTICAST_GROUP = "239.255.42.99"
+MULTICAST_PORT = 50042
+STRUCT_ERROR = getattr(struct, "error", ValueError)  # MicroPython raises ValueError
+
+
+def group_bytes(group):
+    return bytes(int(part) for part in group.split("."))
+
+
+def pack_id(device_id):
+    return device_id.encode()[:12]
+
+
+def unpack_id(raw):
+    return raw.rstrip(b"\x00").decode()
+
+
+def encode_name(name, limit=255):
+    """UTF-8 encode ``name``, cut to ``limit`` bytes on a character boundary"""
+    data = name.encode()
+    if len(data) <= limit:
+        return data
+    end = limit
+    while end and data[end] & 0xC0 == 0x80:  # Do not split a multibyte character
+        end -= 1
+    return data[:end]
+
+
+def split_payload(items, limit):
+    """Group packed items into lists of at most ``limit`` bytes each"""
+    groups = []
+    group = []
+    size = 0
+    for item in items:
+        if group and size + len(item) > limit:
+            groups.append(group)
+            group = []
+            size = 0
+        group.append(item)
+        size += len(item)
+    if group or not groups:
+        groups.append(group)
+    return groups[:255]
+
+
+class FanoutLeader:
+    """Broadcast snapshots after each poll, and re-send them as a heartbeat"""
+
+    def __init__(self, group=MULTICAST_GROUP, port=MULTICAST_PORT, heartbeat_s=30, devices_every=10, ttl=1):
+        self.addr = socket.getaddrinfo(group, port)[0][-1]
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        except (AttributeError, OSError):
+            pass  # Default TTL of 1 keeps packets on the LAN anyway
+        self.heartbeat_s = heartbeat_s
+        self.devices_every = devices_every
+        self.seq = 0
+        self.published = 0
+        self.snapshot = None
+        self.devices = None
+        self.last_sent = 0  # ticks_ms
+
+    def next_header(self, kind, timestamp, part, parts, count):
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        return struct.pack(HEADER, MAGIC, VERSION, kind, self.seq, int(timestamp), part, parts, count)
+
+    def send_parts(self, kind, timestamp, items):
+        """Send packed records in as many packets as needed to stay within MAX_PACKET"""
+        groups = split_payload(items, MAX_PACKET - HEADER_SIZE)
+        for part, group in enumerate(groups):
+            self.send(self.next_header(kind, timestamp, part, len(groups), len(group)) + b"".join(group))
+
+    def publish(self, display, timestamp):
+        """Build and send a snapshot of the latest values of every meter"""
+        records = []
+        meters = []
+        for meter in display.meters:
+            device_id = meter.get("deviceId")
+            latest = display.get_latest_values(device_id)
+            if not latest:
+                continue
+            temp, humidity, co2 = latest
+            records.append(struct.pack(
+                RECORD,
+                pack_id(device_id),
+                TEMP_NONE if temp is None else int(round(temp * 10)),
+                HUMIDITY_NONE if humidity is None else int(round(humidity)),
+                CO2_NONE if co2 is None else int(round(co2)),
+                0,
+            ))
+            meters.append(meter)
+        if self.devices is None or [m.get("deviceId") for m in meters] != [m.get("deviceId") for m in self.devices]:
+            self.published = 0  # Meter set changed: send the names with this snapshot
+        self.snapshot = (timestamp, records)
+        self.devices = meters
+        self.send_snapshot()
+
+    def send_snapshot(self):
+        if self.snapshot is None:
+            return
+        timestamp, records = self.snapshot
+        # Followers need names to place meters in rooms; send them periodically
+        if self.published % self.devices_every == 0:
+            self.send_devices(timestamp)
+        self.published += 1
+        self.send_parts(KIND_SNAPSHOT, timestamp, records)
+
+    def send_devices(self, timestamp):
+        if not self.devices:
+            return
+        parts = []
+        for meter in self.devices:
+            name = encode_name(meter.get("deviceName", ""))
+            device_type = meter.get("deviceType", "")
+            type_index = DEVICE_TYPES.index(device_type) if device_type in DEVICE_TYPES else 0xFF
+            parts.append(struct.pack(DEVICE_HEADER, pack_id(meter.get("deviceId")), type_index, len(name)) + name)
+        self.send_parts(KIND_DEVICES, timestamp, parts)
+
+    def send(self, packet):
+        try:
+            self.sock.sendto(packet, self.addr)
+            self.last_sent = time.ticks_ms()
+        except OSError as e:
+            print(f"Fan-out send error: {e}")
+
+    def poll(self):
+        """Re-send the last snapshot as a heartbeat when nothing was sent for a while"""
+        if self.snapshot is not None and time.ticks_diff(time.ticks_ms(), self.last_sent) >= self.heartbeat_s * 1000:
+            self.send_snapshot()
+
+
+class FanoutFollower:
+    """Receive snapshots without blocking and decode them into samples"""
+
+    def __init__(self, group=MULTICAST_GROUP, port=MULTICAST_PORT, silence_s=120):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(socket.getaddrinfo("0.0.0.0", port)[0][-1])
+        membership = group_bytes(group) + bytes(4)  # Group + INADDR_ANY
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sock.setblocking(False)
+        self.silence_s = silence_s
+        self.last_seq = None
+        # ticks_ms: intervals do not move when the wall clock is synced
+        self.started = time.ticks_ms()
+        self.last_heard = None
+        self.last_snapshot_time = None
+        self.partial = {}  # {kind: [timestamp, [payload of each part or None]]}
+        self.received = 0
+        self.dropped = 0
+
+    def leader_silent(self):
+        """Return True if nothing was heard for silence_s (counted from start-up)"""
+        last = self.last_heard if self.last_heard is not None else self.started
+        return time.ticks_diff(time.ticks_ms(), last) >= self.silence_s * 1000
+
+    def is_newer(self, seq):
+        if self.last_seq is None:
+            return True
+        # Serial number arithmetic handles wrap-around; a leader that restarted
+        # counts from 1 again, so very small sequence numbers are accepted too
+        diff = (seq - self.last_seq) & 0xFFFFFFFF
+        return diff != 0 and (diff < 0x80000000 or seq <= RESTART_SEQ)
+
+    def poll(self):
+        """Read all queued packets
+
+        Returns:
+            tuple: (meters or None, samples or None, snapshot timestamp or None);
+            meters is a list of device dicts when a DEVICES packet arrived,
+            samples is [(device_id, data_point), ...] for the newest snapshot
+        """
+        meters = samples = timestamp = None
+        while True:
+            try:
+                packet = self.sock.recv(MAX_PACKET)
+            except OSError:
+                break
+            decoded = self.decode(packet)
+            if decoded is None:
+                self.dropped += 1
+                continue
+            kind, packet_time, part, parts, payload = decoded
+            self.received += 1
+            self.last_heard = time.ticks_ms()
+            payload = self.assemble(kind, packet_time, part, parts, payload)
+            if payload is None:
+                continue  # Waiting for the other parts
+            if kind == KIND_DEVICES:
+                meters = payload
+            elif kind == KIND_SNAPSHOT:
+                samples = payload
+                timestamp = packet_time
+                self.last_snapshot_time = packet_time
+        return meters, samples, timestamp
+
+    def assemble(self, kind, timestamp, part, parts, payload):
+        """Collect the parts of a split packet; return the joined payload once complete"""
+        if parts == 1:
+            self.partial.pop(kind, None)
+            return payload
+        pending = self.partial.get(kind)
+        if pending is None or pending[0] != timestamp or len(pending[1]) != parts:
+            # A newer snapshot replaces an incomplete one; a heartbeat repeats
+            # the same timestamp and fills in parts that were lost
+            pending = self.partial[kind] = [timestamp, [None] * parts]
+        pending[1][part] = payload
+        if any(p is None for p in pending[1]):
+            return None
+        del self.partial[kind]
+        joined = []
+        for p in pending[1]:
+            joined.extend(p)
+        return joined
+
+    def decode(self, packet):
+        """Return (kind, timestamp, part, parts, payload), or None for a stale or malformed packet"""
+        if len(packet) < HEADER_SIZE:
+            return None
+        magic, version, kind, seq, timestamp, part, parts, count = struct.unpack_from(HEADER, packet, 0)
+        if magic != MAGIC or version != VERSION or part >= parts or not self.is_newer(seq):
+            return None
+        try:
+            payload = self.decode_payload(packet, kind, timestamp, count)
+        except (UnicodeError, ValueError, STRUCT_ERROR):
+            return None  # Anyone on the LAN can send to the group
+        if payload is None:
+            return None
+        self.last_seq = seq
+        return kind, timestamp, part, parts, payload
+
+    def decode_payload(self, packet, kind, timestamp, count):
+        offset = HEADER_SIZE
+        if kind == KIND_SNAPSHOT:
+            if len(packet) < offset + count * RECORD_SIZE:
+                return None
+            samples = []
+            for _ in range(count):
+                raw_id, temp, humidity, co2, _ = struct.unpack_from(RECORD, packet, offset)
+                offset += RECORD_SIZE
+                samples.append((unpack_id(raw_id), {
+                    'timestamp': timestamp,
+                    'temperature': None if temp == TEMP_NONE else temp / 10,
+                    'humidity': None if humidity == HUMIDITY_NONE else humidity,
+                    'co2': None if co2 == CO2_NONE else co2,
+                }))
+            return samples
+        if kind == KIND_DEVICES:
+            meters = []
+            for _ in range(count):
+                if len(packet) < offset + DEVICE_HEADER_SIZE:
+                    return None
+                raw_id, type_index, name_len = struct.unpack_from(DEVICE_HEADER, packet, offset)
+                offset += DEVICE_HEADER_SIZE
+                if len(packet) < offset + name_len:
+                    return None
+                name = packet[offset:offset + name_len].decode()
+                offset += name_len
+                meters.append({
+                    "deviceId": unpack_id(raw_id),
+                    "deviceName": name,
+                    "deviceType": DEVICE_TYPES[type_index] if type_index < len(DEVICE_TYPES) else "Meter",
+                })
+            return meters
+        return None
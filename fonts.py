@@ -0,0 +1,165 @@
+"""Bitmap fonts in a compact 1-bit glyph atlas
+
+A font is a fixed cell (width x height) and a set of characters. Glyphs are
+stored one after another in a single bytearray, row by row with the most
+significant bit first (framebuf.MONO_HLSB), so a 16x16 glyph takes 32 bytes.
+
+Fonts come from:
+- ``BitmapFont.builtin(scale)``: the framebuf 8x8 font scaled by an integer
+  factor once, when the atlas is built;
+- ``BitmapFont.load(path)``: font files made on the host with
+  ``asset_tool.py font`` (e.g. large digits rendered from a TTF).
+
+Drawing text directly expands each atlas byte (8 pixels) into 16 bytes of
+RGB565 through a 4 KB table precomputed for the color pair, so a glyph row
+costs one slice copy per byte; the last few tables are kept. Inside a frame,
+glyphs are blitted into the strips by framebuf with a 2-color palette.
+
+Usage:
+    big = BitmapFont.builtin(2, "0123456789.-C% ")
+    lcd.draw_text(x, y, "22.5C", TEXT_COLOR, BUTTON_COLOR, font=big)
+"""
+
+import framebuf
+import struct
+
+FONT_MAGIC = b"BFNT"
+FONT_HEADER = "<4sBBBH"  # magic, version, width, height, glyph count
+ASCII = "".join(chr(c) for c in range(32, 127))
+TABLE_CACHE = 3  # Expansion tables kept (4 KB each)
+
+_tables = []  # [(color, bg_color, table), ...], most recent first
+
+
+def expansion_table(color, bg_color):
+    """Return a memoryview mapping each byte of 1-bit pixels to 16 bytes of RGB565"""
+    for entry in _tables:
+        if entry[0] == color and entry[1] == bg_color:
+            return entry[2]
+    table = bytearray(256 * 16)
+    fg = (color & 0xFF, color >> 8)
+    bg = (bg_color & 0xFF, bg_color >> 8)
+    for value in range(256):
+        base = value * 16
+        for bit in range(8):
+            low, high = fg if value & (0x80 >> bit) else bg
+            table[base + bit * 2] = low
+            table[base + bit * 2 + 1] = high
+    entry = (color, bg_color, memoryview(table))
+    _tables.insert(0, entry)
+    del _tables[TABLE_CACHE:]
+    return entry[2]
+
+
+class BitmapFont:
+    def __init__(self, width, height, chars, atlas):
+        """
+        Args:
+            width (int): Cell width in pixels
+            height (int): Cell height in pixels
+            chars (str): Characters in atlas order
+            atlas (bytearray): Glyph bitmaps, MONO_HLSB rows padded to bytes
+        """
+        self.width = width
+        self.height = height
+        self.chars = chars
+        self.row_bytes = (width + 7) // 8
+        self.glyph_size = self.row_bytes * height
+        self.atlas = atlas
+        self.index = {c: i for i, c in enumerate(chars)}
+        # Characters not in the font are drawn as '?' or, failing that, blank
+        self.fallback = self.index.get('?', self.index.get(' ', 0))
+        self.glyphs = {}  # {index: FrameBuffer} for framebuf blits, built lazily
+        self.palette = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+
+    @classmethod
+    def builtin(cls, scale=1, chars=ASCII):
+        """Build an atlas from the framebuf 8x8 font, scaled by ``scale``"""
+        size = 8 * scale
+        row_bytes = scale
+        atlas = bytearray(len(chars) * size * row_bytes)
+        src = bytearray(8)
+        fb = framebuf.FrameBuffer(src, 8, 8, framebuf.MONO_HLSB)
+        for i, c in enumerate(chars):
+            fb.fill(0)
+            fb.text(c, 0, 0, 1)
+            base = i * size * row_bytes
+            for y in range(8):
+                bits = src[y]
+                # Each source pixel becomes scale x scale pixels
+                scaled = 0
+                for x in range(8):
+                    if bits & (0x80 >> x):
+                        scaled |= ((1 << scale) - 1) << ((7 - x) * scale)
+                line = scaled.to_bytes(row_bytes, 'big')
+                for r in range(scale):
+                    offset = base + (y * scale + r) * row_bytes
+                    atlas[offset:offset + row_bytes] = line
+        return cls(size, size, chars, atlas)
+
+    @classmethod
+    def load(cls, path):
+        """Load a font file made with ``asset_tool.py font``"""
+        with open(path, 'rb') as f:
+            magic, version, width, height, count = struct.unpack(
+                FONT_HEADER, f.read(struct.calcsize(FONT_HEADER)))
+            if magic != FONT_MAGIC or version != 1:
+                raise ValueError("Not a font file")
+            chars = f.read(count).decode()
+            atlas = bytearray(count * ((width + 7) // 8) * height)
+            f.readinto(atlas)
+        return cls(width, height, chars, atlas)
+
+    def text_width(self, text):
+        return len(text) * self.width
+
+    def expansion_table(self, color, bg_color):
+        return expansion_table(color, bg_color)
+
+    def glyph_index(self, c):
+        index = self.index.get(c)
+        return self.fallback if index is None else index
+
+    def expand_row(self, out, text, row, table):
+        """Write pixel row ``row`` of ``text`` into ``out`` as RGB565
+
+        Args:
+            out (memoryview): text_width(text) * 2 bytes
+            text (str): Text to draw
+            row (int): Row within the cell
+            table (memoryview): expansion_table(color, bg_color)
+        """
+        atlas = self.atlas
+        row_bytes = self.row_bytes
+        # Bytes of RGB565 taken from the last atlas byte of each glyph row
+        last = self.width * 2 - (row_bytes - 1) * 16
+        offset = row * row_bytes
+        j = 0
+        for c in text:
+            base = self.glyph_index(c) * self.glyph_size + offset
+            for k in range(row_bytes - 1):
+                value = atlas[base + k] * 16
+                out[j:j + 16] = table[value:value + 16]
+                j += 16
+            value = atlas[base + row_bytes - 1] * 16
+            out[j:j + last] = table[value:value + last]
+            j += last
+
+    def glyph(self, index):
+        fb = self.glyphs.get(index)
+        if fb is None:
+            start = index * self.glyph_size
+            fb = framebuf.FrameBuffer(
+                memoryview(self.atlas)[start:start + self.glyph_size],
+                self.width, self.height, framebuf.MONO_HLSB, self.row_bytes * 8)
+            self.glyphs[index] = fb
+        return fb
+
+    def compose(self, fb, x, y, text, color, bg_color):
+        """Blit ``text`` into a framebuf (used by the strip renderer)"""
+        palette = self.palette
+        palette.pixel(0, 0, bg_color)
+        palette.pixel(1, 0, color)
+        for c in text:
+            fb.blit(self.glyph(self.glyph_index(c)), x, y, -1, palette)
+            x += self.width
@@ -0,0 +1,208 @@
+"""Tiny non-blocking HTTP/1.1 server for MicroPython
+
+``poll()`` accepts connections, reads requests and writes at most one
+chunk per client per call, so it can run from the display's main loop
+without stalling rendering. Handlers may return a generator as the body;
+it is streamed with chunked transfer encoding and never built in memory.
+
+Usage:
+    server = HttpServer(port=8080)
+    server.route("GET", "/hello", lambda request: (200, "text/plain", "hi"))
+    while True:
+        server.poll()
+"""
+
+import socket
+import time
+
+MAX_REQUEST_SIZE = 4096
+STATUS_TEXT = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def parse_query(query):
+    params = {}
+    for item in query.split("&"):
+        if item:
+            key, _, value = item.partition("=")
+            params[key] = value
+    return params
+
+
+class Request:
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+
+class Client:
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.inbuf = b""
+        self.outbuf = b""
+        self.body_iter = None
+        self.started = time.ticks_ms()
+
+
+class HttpServer:
+    def __init__(self, port=80, max_clients=2, timeout_ms=10_000, chunk_size=512):
+        """
+        Args:
+            port (int): TCP port to listen on
+            max_clients (int): Connections served at the same time
+            timeout_ms (int): Drop clients that make no progress for this long
+            chunk_size (int): Approximate bytes written per client per poll
+        """
+        self.port = port
+        self.max_clients = max_clients
+        self.timeout_ms = timeout_ms
+        self.chunk_size = chunk_size
+        self.routes = {}
+        self.clients = []
+        addr = socket.getaddrinfo("0.0.0.0", port)[0][-1]
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(addr)
+        self.sock.listen(max_clients)
+        self.sock.setblocking(False)
+        print(f"HTTP server listening on port {port}")
+
+    def route(self, method, path, handler):
+        """Register ``handler(request) -> (status, content_type, body)``
+
+        ``body`` may be str, bytes or an iterator of str/bytes chunks.
+        """
+        self.routes[(method, path)] = handler
+
+    def poll(self):
+        """Serve pending work without blocking"""
+        self.accept()
+        now = time.ticks_ms()
+        for client in self.clients[:]:
+            try:
+                if time.ticks_diff(now, client.started) > self.timeout_ms:
+                    self.close(client)
+                elif client.body_iter is None and not client.outbuf:
+                    self.read(client)
+                else:
+                    self.write(client)
+            except OSError as e:
+                if e.args and e.args[0] == 11:  # EAGAIN: try again next poll
+                    continue
+                self.close(client)
+
+    def accept(self):
+        if len(self.clients) >= self.max_clients:
+            return
+        try:
+            sock, addr = self.sock.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        self.clients.append(Client(sock, addr))
+
+    def close(self, client):
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+        if client in self.clients:
+            self.clients.remove(client)
+
+    def read(self, client):
+        data = client.sock.recv(512)
+        if not data:
+            self.close(client)
+            return
+        client.inbuf += data
+        header_end = client.inbuf.find(b"\r\n\r\n")
+        if header_end < 0:
+            if len(client.inbuf) > MAX_REQUEST_SIZE:
+                self.respond(client, 413, "text/plain", "Request too large")
+            return
+        try:
+            lines = client.inbuf[:header_end].decode().split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except (ValueError, UnicodeError):
+            # Undecodable headers or a bad Content-Length
+            self.respond(client, 400, "text/plain", "Bad request")
+            return
+        if length < 0:
+            self.respond(client, 400, "text/plain", "Bad request")
+            return
+        if length > MAX_REQUEST_SIZE:
+            self.respond(client, 413, "text/plain", "Request too large")
+            return
+        body = client.inbuf[header_end + 4:]
+        if len(body) < length:
+            return  # Wait for the rest of the body
+        path, _, query = target.partition("?")
+        request = Request(method, path, parse_query(query), headers, body[:length])
+        handler = self.routes.get((method, path))
+        if handler is None:
+            status = 405 if any(p == path for _, p in self.routes) else 404
+            self.respond(client, status, "text/plain", STATUS_TEXT[status])
+            return
+        try:
+            status, content_type, response_body = handler(request)
+        except Exception as e:
+            print(f"HTTP handler error: {e}")
+            status, content_type, response_body = 500, "text/plain", "Internal error"
+        self.respond(client, status, content_type, response_body)
+
+    def respond(self, client, status, content_type, body):
+        head = "HTTP/1.1 {} {}\r\nContent-Type: {}\r\nConnection: close\r\n".format(
+            status, STATUS_TEXT.get(status, ""), content_type
+        )
+        if isinstance(body, (str, bytes)):
+            if isinstance(body, str):
+                body = body.encode()
+            client.outbuf = (head + "Content-Length: {}\r\n\r\n".format(len(body))).encode() + body
+        else:
+            client.outbuf = (head + "Transfer-Encoding: chunked\r\n\r\n").encode()
+            client.body_iter = iter(body)
+
+    def write(self, client):
+        # Refill the output buffer from the streamed body, one chunk at a time
+        if not client.outbuf and client.body_iter is not None:
+            data = b""
+            while len(data) < self.chunk_size:
+                try:
+                    piece = next(client.body_iter)
+                except StopIteration:
+                    client.body_iter = None
+                    break
+                except Exception as e:
+                    # The headers are already sent; drop only this client
+                    print(f"HTTP body error: {e}")
+                    self.close(client)
+                    return
+                data += piece.encode() if isinstance(piece, str) else piece
+            if data:
+                client.outbuf = ("%x\r\n" % len(data)).encode() + data + b"\r\n"
+            if client.body_iter is None:
+                client.outbuf += b"0\r\n\r\n"
+        if client.outbuf:
+            sent = client.sock.send(client.outbuf)
+            client.outbuf = client.outbuf[sent:]
+            if sent:
+                client.started = time.ticks_ms()  # Idle timeout restarts on progress
+        if not client.outbuf and client.body_iter is None:
+            self.close(client)
@@ -0,0 +1,129 @@
+"""Idle scheduling and display power states for the main loops
+
+Instead of spinning with ``time.sleep_ms(10)``, a loop tells the scheduler
+how long it may sleep (until its next timer deadline) and is woken early by
+the touch interrupt. After ``dim_after`` seconds without a touch the
+backlight is dimmed with PWM; after ``off_after`` seconds it is switched
+off and the panel enters sleep mode. While the screen is off and nothing is
+due soon, the core uses machine.lightsleep, which the touch interrupt ends.
+
+A touch on a dark screen only wakes it: ``poll`` returns True and the caller
+drops that touch, so nobody presses a button they cannot see.
+
+Usage:
+    idle = IdleScheduler(lcd, dim_after=60, off_after=300)
+    while True:
+        if idle.poll():
+            lcd.clear_touch()
+        ...
+        idle.sleep(ms_until_next_deadline)
+"""
+
+import time
+
+try:
+    import machine
+except ImportError:
+    machine = None
+
+ACTIVE = 'active'
+DIMMED = 'dimmed'
+OFF = 'off'
+POLL_MS = 10  # Sleep slice while waiting for a touch without lightsleep
+LIGHT_SLEEP_MIN_MS = 100  # Shorter waits are not worth stopping the clocks
+
+
+class IdleScheduler:
+    def __init__(self, lcd, dim_after=60, off_after=300, dim_level=20, light_sleep=True):
+        """
+        Args:
+            lcd (lcd_st7796): Display whose backlight and sleep mode are managed
+            dim_after (int): Seconds without activity before dimming (None: never)
+            off_after (int): Seconds without activity before the screen is
+                switched off (None: never)
+            dim_level (int): Backlight percentage while dimmed
+            light_sleep (bool): Use machine.lightsleep while the screen is off
+                (the USB serial console does not survive it)
+        """
+        self.lcd = lcd
+        self.dim_after_ms = dim_after * 1000 if dim_after is not None else None
+        self.off_after_ms = off_after * 1000 if off_after is not None else None
+        self.dim_level = dim_level
+        self.light_sleep = light_sleep and machine is not None and hasattr(machine, 'lightsleep')
+        self.state = ACTIVE
+        self.last_activity = time.ticks_ms()
+        self.touches = lcd.touch_events()
+        self.slept_ms = 0  # Time spent sleeping, for reporting
+        self.light_slept_ms = 0
+
+    def activity(self):
+        """Restart the inactivity timer and restore full brightness"""
+        self.last_activity = time.ticks_ms()
+        if self.state != ACTIVE:
+            self.lcd.sleep_out()
+            self.lcd.set_backlight(100)
+            self.state = ACTIVE
+
+    def wake(self):
+        """Turn the screen on for something worth seeing (e.g. an alert)"""
+        self.activity()
+
+    def poll(self):
+        """Notice touches and move between power states
+
+        Returns:
+            bool: True if a touch just woke a dark screen; the caller should
+            discard the pending touches
+        """
+        events = self.lcd.touch_events()
+        if events != self.touches:
+            self.touches = events
+            woke = self.state == OFF
+            self.activity()
+            return woke
+        idle_ms = time.ticks_diff(time.ticks_ms(), self.last_activity)
+        if self.state != OFF and self.off_after_ms is not None and idle_ms >= self.off_after_ms:
+            self.lcd.set_backlight(0)
+            self.lcd.sleep_in()
+            self.state = OFF
+        elif self.state == ACTIVE and self.dim_after_ms is not None and idle_ms >= self.dim_after_ms:
+            self.lcd.set_backlight(self.dim_level)
+            self.state = DIMMED
+        return False
+
+    def next_transition_ms(self):
+        """Return milliseconds until the next power state change, or None"""
+        if self.state == ACTIVE and self.dim_after_ms is not None:
+            after = self.dim_after_ms
+        elif self.state != OFF and self.off_after_ms is not None:
+            after = self.off_after_ms
+        else:
+            return None
+        return max(0, after - time.ticks_diff(time.ticks_ms(), self.last_activity))
+
+    def sleep(self, ms):
+        """Sleep up to ``ms`` milliseconds, returning early on a touch"""
+        transition = self.next_transition_ms()
+        if transition is not None:
+            ms = min(ms, transition)
+        if ms <= 0:
+            return
+        start = time.ticks_ms()
+        if self.light_sleep and self.state == OFF and ms >= LIGHT_SLEEP_MIN_MS:
+            # The backlight pin is driven low (not PWM), so it stays off
+            try:
+                machine.lightsleep(ms)
+                slept = time.ticks_diff(time.ticks_ms(), start)
+                self.slept_ms += slept
+                self.light_slept_ms += slept
+                return
+            except (OSError, ValueError) as e:
+                print(f"Error in lightsleep, using sleep_ms: {e}")
+                self.light_sleep = False
+        deadline = time.ticks_add(start, ms)
+        while self.lcd.touch_events() == self.touches:
+            remaining = time.ticks_diff(deadline, time.ticks_ms())
+            if remaining <= 0:
+                break
+            time.sleep_ms(min(POLL_MS, remaining))
+        self.slept_ms += time.ticks_diff(time.ticks_ms(), start)
@@ -1,4 +1,5 @@
 from lcd_lib import lcd_st7796, draw_button, hex_to_rgb565
+from idle import IdleScheduler
 import machine
 import time
 
@@ -17,7 +18,12 @@ draw_button(lcd, BUTTON_OFF, hex_to_rgb565("#00469C"), "Off", 0xFFFF)
 
 led = machine.Pin("LED", machine.Pin.OUT)
 
+# Dim after a minute, screen off after five; a touch turns it back on
+idle = IdleScheduler(lcd, dim_after=60, off_after=300)
+
 while True:
+    if idle.poll():
+        lcd.clear_touch()
     for x, y in lcd.get_touch_xy():
         bx, by, bw, bh = BUTTON_ON
         if (bx <= x < bx + bw) and (by <= y < by + bh):
@@ -33,4 +39,5 @@ while True:
             time.sleep_ms(100)
             lcd.clear_touch()
             break
-    time.sleep_ms(10)
+    # Nothing else to do until the next touch
+    idle.sleep(1000)
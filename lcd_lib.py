@@ -1,6 +1,13 @@
-from machine import Pin, SPI, I2C
+from machine import Pin, SPI, I2C, PWM
 import framebuf
+import struct
 import time
+import perf_trace
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
 
 LCD_WIDTH = 320
 LCD_HEIGHT = 480
@@ -17,6 +24,360 @@ MOSI = 11
 MISO = 12
 LCD_RST = 13
 LCD_BL = 15
+BACKLIGHT_PWM_FREQ = 1000
+SLEEP_MODE_GAP_MS = 120  # ST7796: minimum time between SLPIN and SLPOUT, either way
+
+# Scratch buffer size classes for drawing: (bytes, count), sized to the most
+# buffers in use at once: 960 bytes hold one 480-pixel RGB565 row (blit_asset
+# holds its read and palette buffers together), 7680 bytes hold 8 rows (a text
+# line; the strip renderer splits it into its two strip buffers)
+POOL_SIZE_CLASSES = ((64, 1), (LCD_HEIGHT * 2, 2), (LCD_HEIGHT * 2 * 8, 1))
+
+# Image assets written by asset_tool.py (RGB565 in the panel's byte order)
+ASSET_MAGIC = b"R565"
+ASSET_HEADER = "<4sBBHHBH"  # magic, version, encoding, width, height, flags, key color
+ASSET_RAW = 0
+ASSET_RLE = 1
+ASSET_PALETTE = 2
+ASSET_KEYED = 0x01  # Pixels of the key color are transparent
+ASSET_READ_SIZE = 512  # Bytes read from flash at a time
+
+
+class buffer_lease:
+    """One pooled buffer; used as a context manager returned by buffer_pool.borrow"""
+
+    def __init__(self, pool, size):
+        self.pool = pool
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.capacity = size
+        self.size = 0
+        self.in_use = False
+        # The last view handed out; draws repeat sizes, so slicing is rare
+        self.view = self.mv
+        self.view_size = size
+
+    def __enter__(self):
+        if self.size != self.view_size:
+            self.view = self.mv[:self.size]
+            self.view_size = self.size
+        return self.view
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.in_use = False
+        return False
+
+
+class buffer_pool:
+    def __init__(self, size_classes=POOL_SIZE_CLASSES):
+        """Reusable scratch buffers shared by the drawing primitives
+
+        Args:
+            size_classes (tuple): ((bytes, count), ...) in ascending size order
+        """
+        self.leases = []
+        for size, count in size_classes:
+            for _ in range(count):
+                self.leases.append(buffer_lease(self, size))
+        self.max_size = size_classes[-1][0]
+        self.misses = 0
+
+    def borrow(self, size):
+        """Borrow a buffer of at least ``size`` bytes
+
+        Use as ``with pool.borrow(n) as mv:``; ``mv`` is a memoryview of exactly
+        ``size`` bytes. If no pooled buffer fits, a temporary one is allocated
+        and counted in ``misses``.
+        """
+        for lease in self.leases:
+            if not lease.in_use and lease.capacity >= size:
+                lease.in_use = True
+                lease.size = size
+                return lease
+        self.misses += 1
+        lease = buffer_lease(self, size)
+        lease.size = size
+        return lease
+
+
+def fill_color(mv, color):
+    """Fill a memoryview with an RGB565 color by doubling slice copies"""
+    size = len(mv)
+    mv[0] = color & 0xFF
+    mv[1] = color >> 8
+    n = 2
+    while n < size:
+        k = min(n, size - n)
+        mv[n:n + k] = mv[0:k]
+        n += k
+
+
+class strip_renderer:
+    """Render a recorded display list in horizontal strips
+
+    Each strip is composed into one half of a pooled buffer with ``framebuf``
+    while the other half is being sent over SPI. Transmission runs in a thread
+    on the second core when one can be started; otherwise strips are sent
+    synchronously (still with a single SPI burst per strip).
+    """
+
+    def __init__(self, lcd, use_thread=True):
+        self.lcd = lcd
+        self.use_thread = use_thread and _thread is not None
+        if self.use_thread:
+            # free[i] is held while buffer i is being composed or sent,
+            # full[i] is released once buffer i is ready to send
+            self.free = [_thread.allocate_lock(), _thread.allocate_lock()]
+            self.full = [_thread.allocate_lock(), _thread.allocate_lock()]
+            for lock in self.full:
+                lock.acquire()
+        self.bufs = [None, None]
+        self.windows = [None, None]
+        self.abort = False  # Tells the sender thread to stop after a compose error
+
+    def render(self, ops, x0, y0, x1, y1):
+        """Render ``ops`` clipped to the window (x0, y0)-(x1, y1), inclusive"""
+        lcd = self.lcd
+        width = x1 - x0 + 1
+        rows = max(1, min(y1 - y0 + 1, lcd.pool.max_size // 2 // (width * 2)))
+        strips = (y1 - y0 + rows) // rows
+        strip_size = width * rows * 2
+        with lcd.pool.borrow(strip_size * 2) as buf:
+            self.bufs[0] = buf[:strip_size]
+            self.bufs[1] = buf[strip_size:]
+            threaded = False
+            self.abort = False
+            if self.use_thread and strips > 1:
+                try:
+                    _thread.start_new_thread(self.send_strips, (strips,))
+                    threaded = True
+                except OSError:
+                    pass  # Second core is busy (e.g. dual-core polling)
+            try:
+                for i in range(strips):
+                    sy = y0 + i * rows
+                    h = min(rows, y1 - sy + 1)
+                    index = i & 1
+                    if threaded:
+                        self.free[index].acquire()
+                    try:
+                        fb = framebuf.FrameBuffer(self.bufs[index], width, h, framebuf.RGB565)
+                        t0 = perf_trace.begin()
+                        compose(fb, ops, x0, sy, h)
+                        perf_trace.end("compose_strip", t0)
+                        self.windows[index] = (x0, sy, x1, sy + h - 1)
+                    except BaseException:
+                        if threaded:
+                            # Wake the sender waiting for this strip so it exits
+                            # and frees the second core
+                            self.abort = True
+                            self.full[index].release()
+                        raise
+                    if threaded:
+                        self.full[index].release()
+                    else:
+                        self.send(index)
+            finally:
+                if threaded:
+                    # Wait until the sender has finished with both buffers
+                    for lock in self.free:
+                        lock.acquire()
+                        lock.release()
+                self.bufs[0] = self.bufs[1] = None
+
+    def send_strips(self, count):
+        """Sender thread: transmit ``count`` strips as they become ready"""
+        for i in range(count):
+            index = i & 1
+            self.full[index].acquire()
+            if self.abort:
+                self.free[index].release()
+                return
+            try:
+                self.send(index)
+            except Exception as e:
+                # Keep releasing buffers so the composer never waits forever
+                print(f"Error sending strip: {e}")
+            self.free[index].release()
+
+    def send(self, index):
+        lcd = self.lcd
+        x0, sy, x1, sy1 = self.windows[index]
+        lcd.set_windows(x0, sy, x1, sy1)
+        lcd.dc(1)
+        lcd.cs(0)
+        t0 = perf_trace.begin()
+        lcd.bus.write(self.bufs[index][:(x1 - x0 + 1) * (sy1 - sy + 1) * 2])
+        perf_trace.end("spi_write", t0)
+        lcd.cs(1)
+
+
+def compose(fb, ops, x0, y0, rows):
+    """Draw the display list ops that intersect a strip into ``fb``
+
+    ``fb`` covers screen rows y0..y0+rows-1 starting at column x0.
+    Ops are ('r', x, y, w, h, color), ('t', x, y, text, color, bg_color),
+    ('f', x, y, text, color, bg_color, font) for a fonts.BitmapFont and
+    ('p', x, y, w, h, color, xs, ys), a 2-pixel wide polyline whose points
+    lie within the (x, y, w, h) box.
+    """
+    y1 = y0 + rows
+    for op in ops:
+        y = op[2]
+        kind = op[0]
+        if kind == 'r':
+            if y + op[4] <= y0 or y >= y1:
+                continue
+            fb.fill_rect(op[1] - x0, y - y0, op[3], op[4], op[5])
+        elif kind == 'p':
+            if y + op[4] <= y0 or y >= y1:
+                continue
+            color = op[5]
+            xs = op[6]
+            ys = op[7]
+            for i in range(len(xs) - 1):
+                ya = ys[i]
+                yb = ys[i + 1]
+                # Skip segments that do not reach this strip
+                if (ya if ya < yb else yb) >= y1 or (ya if ya > yb else yb) + 1 < y0:
+                    continue
+                xa = xs[i] - x0
+                xb = xs[i + 1] - x0
+                ya -= y0
+                yb -= y0
+                fb.line(xa, ya, xb, yb, color)
+                fb.line(xa + 1, ya + 1, xb + 1, yb + 1, color)
+        elif kind == 'f':
+            font = op[6]
+            if y + font.height <= y0 or y >= y1:
+                continue
+            font.compose(fb, op[1] - x0, y - y0, op[3], op[4], op[5])
+        else:
+            if y + 8 <= y0 or y >= y1:
+                continue
+            text = op[3]
+            fb.fill_rect(op[1] - x0, y - y0, len(text) * 8, 8, op[5])
+            fb.text(text, op[1] - x0, y - y0, op[4])
+
+
+class asset_stream:
+    """Decode an asset file row by row from small buffered reads
+
+    Rows are encoded independently, so each can be sent as soon as it is
+    decoded. In RLE and palette files every run starts with a control byte:
+    with bit 7 set, (low 7 bits + 1) copies of the next pixel follow,
+    otherwise that many literal pixels. Palette files store 1-byte indices
+    instead of pixels. Key-colored pixels are only ever stored as repeat
+    runs, so transparent spans fall out of the decoding.
+    """
+
+    def __init__(self, f, buf, palette):
+        """
+        Args:
+            f (file): Asset file opened in binary mode
+            buf (memoryview): Read buffer
+            palette (memoryview): 512-byte buffer for the palette
+        """
+        magic, version, encoding, width, height, flags, key = struct.unpack(
+            ASSET_HEADER, f.read(struct.calcsize(ASSET_HEADER)))
+        if magic != ASSET_MAGIC or version != 1:
+            raise ValueError("Not an asset file")
+        self.f = f
+        self.buf = buf
+        self.pos = 0
+        self.end = 0
+        self.encoding = encoding
+        self.width = width
+        self.height = height
+        self.keyed = bool(flags & ASSET_KEYED)
+        self.key = key
+        self.palette = palette
+        if encoding == ASSET_PALETTE:
+            count = struct.unpack("<H", f.read(2))[0]
+            f.readinto(palette[:count * 2])
+
+    def fill(self):
+        self.end = self.f.readinto(self.buf)
+        self.pos = 0
+        if not self.end:
+            raise ValueError("Truncated asset file")
+
+    def byte(self):
+        if self.pos == self.end:
+            self.fill()
+        value = self.buf[self.pos]
+        self.pos += 1
+        return value
+
+    def copy(self, out, start, count):
+        """Copy ``count`` bytes of the stream into out[start:]"""
+        while count:
+            if self.pos == self.end:
+                self.fill()
+            n = min(count, self.end - self.pos)
+            out[start:start + n] = self.buf[self.pos:self.pos + n]
+            self.pos += n
+            start += n
+            count -= n
+
+    def row(self, out):
+        """Decode the next row into ``out`` (width * 2 bytes)
+
+        Returns:
+            list: Opaque pixel spans [(start, end), ...], end exclusive
+        """
+        width = self.width
+        if self.encoding == ASSET_RAW:
+            self.copy(out, 0, width * 2)
+            return self.key_spans(out) if self.keyed else [(0, width)]
+        palette = self.palette
+        indexed = self.encoding == ASSET_PALETTE
+        spans = []
+        start = 0
+        i = 0
+        while i < width:
+            control = self.byte()
+            n = (control & 0x7F) + 1
+            if control & 0x80:
+                if indexed:
+                    index = self.byte() * 2
+                    color = palette[index] | (palette[index + 1] << 8)
+                else:
+                    color = self.byte() | (self.byte() << 8)
+                if self.keyed and color == self.key:
+                    if i > start:
+                        spans.append((start, i))
+                    start = i + n
+                else:
+                    fill_color(out[i * 2:(i + n) * 2], color)
+            elif indexed:
+                for j in range(i * 2, (i + n) * 2, 2):
+                    index = self.byte() * 2
+                    out[j] = palette[index]
+                    out[j + 1] = palette[index + 1]
+            else:
+                self.copy(out, i * 2, n * 2)
+            i += n
+        if width > start:
+            spans.append((start, width))
+        return spans
+
+    def key_spans(self, out):
+        """Find the opaque spans of a raw row by comparing every pixel"""
+        spans = []
+        start = None
+        low = self.key & 0xFF
+        high = self.key >> 8
+        for i in range(self.width):
+            transparent = out[i * 2] == low and out[i * 2 + 1] == high
+            if transparent and start is not None:
+                spans.append((start, i))
+                start = None
+            elif not transparent and start is None:
+                start = i
+        if start is not None:
+            spans.append((start, self.width))
+        return spans
 
 
 class touch_ft6336u:
@@ -30,6 +391,7 @@ class touch_ft6336u:
         irq_pin=I2C_IRQ,
         rst_pin=I2C_RST,
         max_touch=5,
+        reset=True,
     ):
         self.bus = I2C(
     id=i2c_num,
@@ -43,12 +405,18 @@ class touch_ft6336u:
 
         self.max_touch = max_touch
         self.coordinates = []
-        self.reset()
+        self.events = 0  # Touch interrupts so far (lets an idle loop notice taps)
+        # Touches are ignored until the controller has booted after a reset
+        self.ready_at = None
+        self.resetting = False
+        if reset:
+            self.reset()
         self.read_flag = True
 
         self.int.irq(handler=self.int_cb, trigger=Pin.IRQ_FALLING)
 
     def int_cb(self, pin):
+        self.events += 1
         self.read_touch_data()
 
     def reset(self):
@@ -59,6 +427,30 @@ class touch_ft6336u:
         self.rst(1)
         time.sleep(0.2)
 
+    def begin_reset(self):
+        """Pull the reset line low without waiting
+
+        Call ``end_reset`` afterwards; the time in between can be spent on
+        other initialization (e.g. the panel's own reset delays).
+        """
+        self.rst(0)
+        self.resetting = True
+        self.reset_start = time.ticks_ms()
+
+    def end_reset(self, low_ms=200, boot_ms=200):
+        """Release the reset line started by ``begin_reset``
+
+        Waits only for whatever is left of the ``low_ms`` reset pulse; the
+        ``boot_ms`` start-up time is not waited for, touches are simply
+        ignored until it has elapsed.
+        """
+        remaining = low_ms - time.ticks_diff(time.ticks_ms(), self.reset_start)
+        if remaining > 0:
+            time.sleep_ms(remaining)
+        self.rst(1)
+        self.ready_at = time.ticks_add(time.ticks_ms(), boot_ms)
+        self.resetting = False
+
     def read_bytes(self, reg_addr, length):
         try:
             self.bus.writeto(int(self.device_addr), bytes([reg_addr]))
@@ -74,6 +466,12 @@ class touch_ft6336u:
     def read_touch_data(self):
         TOUCH_NUM_REG = 0x02
         TOUCH_XY_REG = 0x03
+        if self.resetting:
+            return
+        if self.ready_at is not None:
+            if time.ticks_diff(self.ready_at, time.ticks_ms()) > 0:
+                return
+            self.ready_at = None
         buf = self.read_bytes(TOUCH_NUM_REG, 1)
         if buf is not None and buf[0] != 0:
             point_count = buf[0]
@@ -99,9 +497,38 @@ class touch_ft6336u:
         self.clear()
         return coordinates
 
+    def read_points(self, max_points=2):
+        """Return the points touched right now [(x, y), ...]
+
+        Polled for gestures: unlike the IRQ path this also reports fingers
+        held still, and an empty list once they are lifted. The status and
+        both point registers are read in one I2C transaction so a touch IRQ
+        cannot interleave with it.
+        """
+        TOUCH_NUM_REG = 0x02
+        if self.resetting:
+            return []
+        if self.ready_at is not None:
+            if time.ticks_diff(self.ready_at, time.ticks_ms()) > 0:
+                return []
+            self.ready_at = None
+        try:
+            buf = self.bus.readfrom_mem(int(self.device_addr), TOUCH_NUM_REG, 1 + 6 * max_points)
+        except Exception as e:
+            print(f"Error reading touch points: {e}")
+            return []
+        points = []
+        for i in range(min(buf[0] & 0x0F, max_points)):
+            offset = 1 + i * 6
+            points.append((
+                ((buf[offset] & 0x0F) << 8) + buf[offset + 1],
+                ((buf[offset + 2] & 0x0F) << 8) + buf[offset + 3],
+            ))
+        return points
+
 
 class lcd_st7796:
-    def __init__(self, horizontal=True, reverse=False):
+    def __init__(self, horizontal=True, reverse=False, baudrate=1_000_000):
         self.horizontal = horizontal
         self.reverse = reverse
 
@@ -116,10 +543,14 @@ class lcd_st7796:
         self.rst = Pin(LCD_RST, Pin.OUT)
         self.bl = Pin(LCD_BL, Pin.OUT)
         self.bl(1)
+        self.bl_pwm = None
+        self.backlight = 100
+        self.sleeping = False
+        self.sleep_changed_at = 0  # ticks_ms of the last SLPIN/SLPOUT
         self.cs(1)
         self.bus = SPI(
     1,
-    1_000_000,
+    baudrate,
     polarity=0,
     phase=0,
     sck=Pin(SCK),
@@ -128,13 +559,21 @@ class lcd_st7796:
 )
         self.dc = Pin(LCD_DC, Pin.OUT)
         self.dc(1)
+        # Single byte buffer reused by write_cmd/write_data
+        self.byte_buf = bytearray(1)
+        # Scratch buffers shared by all drawing operations
+        self.pool = buffer_pool()
+        # Display list recorded between begin_frame and end_frame
+        self.frame_ops = None
+        self.frame_blits = []  # Assets drawn once the frame is rendered
+        self.renderer = strip_renderer(self)
+
+        # Hold the touch controller in reset while the panel initializes,
+        # so both reset delays overlap instead of running back to back
+        self.touch = touch_ft6336u(reset=False)
+        self.touch.begin_reset()
         self.lcd_init()
-
-        self.touch = touch_ft6336u()
-        
-        # Create a larger framebuffer for text rendering (480x32 pixels)
-        self.text_buf = bytearray(480 * 32 * 2)  # 480x32 pixels, 2 bytes per pixel
-        self.text_fb = framebuf.FrameBuffer(self.text_buf, 480, 32, framebuf.RGB565)
+        self.touch.end_reset()
 
     def clear_display(
         self, color=0xA33F, init_color0=0x00FF, init_color1=0xF00F, sleep=1
@@ -150,12 +589,14 @@ class lcd_st7796:
     def write_cmd(self, cmd):
         self.dc(0)
         self.cs(0)
-        self.bus.write(bytearray([cmd]))
+        self.byte_buf[0] = cmd & 0xFF
+        self.bus.write(self.byte_buf)
 
     def write_data(self, buf):
         self.dc(1)
         self.cs(0)
-        self.bus.write(bytearray([buf]))
+        self.byte_buf[0] = buf & 0xFF
+        self.bus.write(self.byte_buf)
         self.cs(1)
 
     def lcd_init(self):
@@ -165,6 +606,7 @@ class lcd_st7796:
         time.sleep_ms(10)
 
         self.write_cmd(0x11)
+        self.sleep_changed_at = time.ticks_ms()
 
         time.sleep_ms(120)
 
@@ -263,6 +705,7 @@ class lcd_st7796:
         self.write_cmd(0x29)
 
     def set_windows(self, Xstart, Ystart, Xend, Yend):
+        t0 = perf_trace.begin()
         self.write_cmd(0x2A)
         self.write_data(Xstart >> 8)
         self.write_data(Xstart)
@@ -275,35 +718,49 @@ class lcd_st7796:
         self.write_data(((Yend) - 0) >> 8)
         self.write_data((Yend) - 0)
         self.write_cmd(0x2C)
+        perf_trace.end("set_windows", t0)
 
     def draw_point(self, x, y, color):
+        if self.frame_ops is not None:
+            self.frame_ops.append(('r', x, y, 1, 1, color))
+            return
         self.set_windows(x, y, x, y)
         self.dc(1)
         self.cs(0)
-        self.bus.write(bytearray([color & 0xFF, color >> 8]))
+        t0 = perf_trace.begin()
+        with self.pool.borrow(2) as buf:
+            buf[0] = color & 0xFF
+            buf[1] = color >> 8
+            self.bus.write(buf)
+        perf_trace.end("spi_write", t0)
         self.cs(1)
 
-    def draw_square(self, x, y, s, color):
-        x_start = x
-        y_start = y
-        x_end = x + s
-        y_end = y + s
+    def draw_polyline(self, xs, ys, color):
+        """Draw a 2-pixel wide line through the points (xs[i], ys[i])
 
-        self.set_windows(x_start, y_start, x_end, y_end)
-        self.dc(1)
-        self.cs(0)
-        for i in range((s + 1) * (s + 1)):
-            self.bus.write(bytearray([color & 0xFF, color >> 8]))
-        self.cs(1)
+        Args:
+            xs (list): X coordinates
+            ys (list): Y coordinates
+            color (int): Line color in RGB565 format
+        """
+        if len(xs) < 2:
+            return
+        x = min(xs)
+        y = min(ys)
+        op = ('p', x, y, max(xs) - x + 2, max(ys) - y + 2, color, xs, ys)
+        if self.frame_ops is not None:
+            self.frame_ops.append(op)
+            return
+        # Lines are only drawn through the strip renderer
+        self.frame_ops = [op]
+        self.end_frame()
+
+    def draw_square(self, x, y, s, color):
+        # The window is inclusive, so the square is (s + 1) pixels wide
+        self.fill_rectangle(x, y, s + 1, s + 1, color)
 
     def lcd_fill(self, color):
-        buffer = bytearray([color & 0xFF, color >> 8] * self.width)
-        self.set_windows(0, 0, self.width, self.height)
-        self.dc(1)
-        self.cs(0)
-        for i in range(self.height):
-            self.bus.write(buffer)
-        self.cs(1)
+        self.fill_rectangle(0, 0, self.width, self.height, color)
 
     def fix_xy(self, x, y):
         if self.reverse:
@@ -325,10 +782,247 @@ class lcd_st7796:
     def get_touch_xy(self):
         return [(self.fix_xy(x, y)) for x, y in self.touch.get_touch_xy()]
 
+    def touch_events(self):
+        """Return the number of touch interrupts so far"""
+        return self.touch.events
+
+    def set_backlight(self, level):
+        """Set the backlight brightness
+
+        Fully on and off drive the pin directly, so the level also holds in
+        machine.lightsleep (PWM stops while the clocks are gated).
+
+        Args:
+            level (int): Brightness in percent, 0-100
+        """
+        level = max(0, min(100, level))
+        if level in (0, 100):
+            if self.bl_pwm is not None:
+                self.bl_pwm.deinit()
+                self.bl_pwm = None
+                self.bl = Pin(LCD_BL, Pin.OUT)
+            self.bl(1 if level else 0)
+        else:
+            if self.bl_pwm is None:
+                self.bl_pwm = PWM(self.bl)
+                self.bl_pwm.freq(BACKLIGHT_PWM_FREQ)
+            self.bl_pwm.duty_u16(level * 65535 // 100)
+        self.backlight = level
+
+    def sleep_in(self):
+        """Turn the display off and enter sleep mode (DISPOFF 0x28, SLPIN 0x10)
+
+        The frame memory keeps its contents and can still be written, so the
+        screen is redrawn as usual while asleep.
+        """
+        if self.sleeping:
+            return
+        self.write_cmd(0x28)
+        self.wait_sleep_mode_gap()
+        self.write_cmd(0x10)
+        self.sleeping = True
+        self.sleep_changed_at = time.ticks_ms()
+
+    def sleep_out(self):
+        """Leave sleep mode (SLPOUT 0x11) and turn the display on (DISPON 0x29)"""
+        if not self.sleeping:
+            return
+        self.wait_sleep_mode_gap()
+        self.write_cmd(0x11)
+        self.sleep_changed_at = time.ticks_ms()
+        # Other commands may follow SLPOUT after 5 ms
+        time.sleep_ms(5)
+        self.write_cmd(0x29)
+        self.sleeping = False
+
+    def wait_sleep_mode_gap(self):
+        """Wait until SLEEP_MODE_GAP_MS have passed since the last SLPIN/SLPOUT
+
+        The ST7796 needs 120 ms after SLPIN before SLPOUT and after SLPOUT
+        before SLPIN, so a tap right after the screen goes off may wait here.
+        """
+        remaining = SLEEP_MODE_GAP_MS - time.ticks_diff(time.ticks_ms(), self.sleep_changed_at)
+        if remaining > 0:
+            time.sleep_ms(remaining)
+
+    def get_touch_points(self):
+        """Return the points touched right now in screen coordinates (for gestures)"""
+        return [self.fix_xy(x, y) for x, y in self.touch.read_points()]
+
+    def begin_frame(self):
+        """Start recording drawing calls instead of sending them immediately
+
+        Use for full redraws: ``end_frame`` composes the recorded calls into
+        double-buffered strips, so each pixel is sent once in large bursts and
+        rendering overlaps with SPI transfer.
+        """
+        self.frame_ops = []
+
+    def end_frame(self, clip=None):
+        """Render everything recorded since ``begin_frame``
+
+        Args:
+            clip (tuple): Optional (x0, y0, x1, y1) window, inclusive; ops
+                are drawn only inside it
+        """
+        ops = self.frame_ops
+        self.frame_ops = None
+        if ops:
+            self.render_ops(ops, clip)
+        blits = self.frame_blits
+        self.frame_blits = []
+        for path, x, y, key in blits:
+            self.blit_asset(path, x, y, key)
+
+    def render_ops(self, ops, clip=None):
+        """Render a display list through the strip renderer"""
+        # Only render the bounding box of what was drawn
+        x0, y0 = self.width, self.height
+        x1 = y1 = 0
+        for op in ops:
+            if op[0] == 't':
+                w, h = len(op[3]) * 8, 8
+            elif op[0] == 'f':
+                w, h = op[6].text_width(op[3]), op[6].height
+            else:
+                w, h = op[3], op[4]
+            x0 = min(x0, op[1])
+            y0 = min(y0, op[2])
+            x1 = max(x1, op[1] + w - 1)
+            y1 = max(y1, op[2] + h - 1)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.width - 1, x1), min(self.height - 1, y1)
+        if clip is not None:
+            x0, y0 = max(clip[0], x0), max(clip[1], y0)
+            x1, y1 = min(clip[2], x1), min(clip[3], y1)
+        if x1 < x0 or y1 < y0:
+            return
+        t0 = perf_trace.begin()
+        self.renderer.render(ops, x0, y0, x1, y1)
+        perf_trace.end("render_frame", t0)
+
     def clear_touch(self):
         self.touch.clear()
 
-    def draw_text(self, x, y, text, color, bg_color=0xFFFF):
+    def asset_size(self, path):
+        """Return (width, height) of an asset file, or None if it cannot be read"""
+        try:
+            with open(path, 'rb') as f:
+                header = struct.unpack(ASSET_HEADER, f.read(struct.calcsize(ASSET_HEADER)))
+        except (OSError, ValueError) as e:
+            print(f"Error reading asset {path}: {e}")
+            return None
+        return header[3], header[4]
+
+    def blit_asset(self, path, x, y, key=None):
+        """Draw an asset file made by asset_tool.py, streamed from flash
+
+        Rows are decoded from small buffered reads into pooled buffers and
+        sent with windowed SPI writes, so the image never has to fit in RAM.
+        Inside a frame, assets are drawn after the frame has been rendered
+        (on top of it).
+
+        Args:
+            path (str): Asset file
+            x (int): X coordinate of the top left corner
+            y (int): Y coordinate of the top left corner
+            key (int): Transparent color in RGB565 format (default: the key
+                stored in the file, if any)
+        """
+        if self.frame_ops is not None:
+            self.frame_blits.append((path, x, y, key))
+            return
+        t0 = perf_trace.begin()
+        try:
+            with open(path, 'rb') as f:
+                with self.pool.borrow(ASSET_READ_SIZE) as buf, self.pool.borrow(512) as palette:
+                    stream = asset_stream(f, buf, palette)
+                    if key is not None:
+                        stream.keyed = True
+                        stream.key = key
+                    w, h = stream.width, stream.height
+                    if stream.keyed or x < 0 or y < 0 or x + w > self.width or y + h > self.height:
+                        self.blit_spans(stream, x, y)
+                    else:
+                        self.blit_window(stream, x, y)
+        except (OSError, ValueError) as e:
+            print(f"Error drawing asset {path}: {e}")
+        perf_trace.end("blit_asset", t0)
+
+    def blit_window(self, stream, x, y):
+        """Send an opaque asset through one window, as many rows per write as fit"""
+        w, h = stream.width, stream.height
+        row_bytes = w * 2
+        rows = max(1, min(h, self.pool.max_size // row_bytes))
+        with self.pool.borrow(row_bytes * rows) as buf:
+            self.set_windows(x, y, x + w - 1, y + h - 1)
+            self.dc(1)
+            self.cs(0)
+            remaining = h
+            while remaining:
+                n = min(rows, remaining)
+                for r in range(n):
+                    stream.row(buf[r * row_bytes:(r + 1) * row_bytes])
+                t0 = perf_trace.begin()
+                self.bus.write(buf[:n * row_bytes])
+                perf_trace.end("spi_write", t0)
+                remaining -= n
+            self.cs(1)
+
+    def blit_spans(self, stream, x, y):
+        """Send an asset row by row, skipping transparent pixels and the off-screen parts"""
+        w, h = stream.width, stream.height
+        with self.pool.borrow(w * 2) as buf:
+            for r in range(h):
+                sy = y + r
+                if sy >= self.height:
+                    break
+                spans = stream.row(buf)
+                if sy < 0:
+                    continue
+                for start, end in spans:
+                    start = max(start, -x)
+                    end = min(end, self.width - x)
+                    if start >= end:
+                        continue
+                    self.set_windows(x + start, sy, x + end - 1, sy)
+                    self.dc(1)
+                    self.cs(0)
+                    self.bus.write(buf[start * 2:end * 2])
+                    self.cs(1)
+
+    def hardware_scroll(self):
+        """Return True if the panel can scroll the screen vertically
+
+        The ST7796 scrolls along its 480-row axis, which is the screen's
+        vertical axis only in the (non-reversed) portrait orientation.
+        """
+        return not self.horizontal and not self.reverse
+
+    def set_scroll_area(self, top, height):
+        """Define the vertical scroll area (VSCRDEF, 0x33) in panel rows
+
+        Args:
+            top (int): Fixed rows above the scroll area
+            height (int): Rows in the scroll area; the rest stays fixed below it
+        """
+        self.write_cmd(0x33)
+        for value in (top, height, LCD_HEIGHT - top - height):
+            self.write_data(value >> 8)
+            self.write_data(value)
+
+    def set_scroll_start(self, row):
+        """Show panel row ``row`` at the top of the scroll area (VSCSAD, 0x37)"""
+        self.write_cmd(0x37)
+        self.write_data(row >> 8)
+        self.write_data(row)
+
+    def reset_scroll(self):
+        """Return to an unscrolled screen (panel rows map to screen rows again)"""
+        self.set_scroll_area(0, LCD_HEIGHT)
+        self.set_scroll_start(0)
+
+    def draw_text(self, x, y, text, color, bg_color=0xFFFF, font=None):
         """Draw text at the specified position
         
         Args:
@@ -337,32 +1031,77 @@ class lcd_st7796:
             text (str): Text to draw
             color (int): Text color in RGB565 format
             bg_color (int): Background color in RGB565 format (default: white)
+            font (BitmapFont): Font from fonts.py (default: built-in 8x8 font)
         """
-        # Calculate text dimensions
+        t_text = perf_trace.begin()
+        if font is not None:
+            text = text[:self.width // font.width]
+            if text:
+                if self.frame_ops is not None:
+                    self.frame_ops.append(('f', x, y, text, color, bg_color, font))
+                else:
+                    self.draw_font_text(x, y, text, color, bg_color, font)
+            perf_trace.end("draw_text", t_text)
+            return
+        # Calculate text dimensions (clipped to the screen width)
+        text = text[:self.width // 8]
         text_width = len(text) * 8
         text_height = 8
+        if not text_width:
+            perf_trace.end("draw_text", t_text)
+            return
+        if self.frame_ops is not None:
+            self.frame_ops.append(('t', x, y, text, color, bg_color))
+            perf_trace.end("draw_text", t_text)
+            return
         
-        # Clear the text buffer with specified background color
-        self.text_fb.fill(bg_color)
-        
-        # Draw text in the buffer
-        self.text_fb.text(text, 0, 0, color)
-        
-        # Create a smaller buffer for the actual text area
-        text_area = bytearray(text_width * text_height * 2)
-        for row in range(text_height):
-            for col in range(text_width):
-                pixel = self.text_buf[(row * 480 + col) * 2:(row * 480 + col) * 2 + 2]
-                text_area[(row * text_width + col) * 2:(row * text_width + col) * 2 + 2] = pixel
-        
-        # Draw the buffer contents to the screen
-        self.set_windows(x, y, x + text_width - 1, y + text_height - 1)
-        self.dc(1)
-        self.cs(0)
-        self.bus.write(text_area)
-        self.cs(1)
+        # Render the text into a pooled buffer of exactly the text area
+        with self.pool.borrow(text_width * text_height * 2) as buf:
+            fb = framebuf.FrameBuffer(buf, text_width, text_height, framebuf.RGB565)
+            fb.fill(bg_color)
+            fb.text(text, 0, 0, color)
+            
+            # Draw the buffer contents to the screen
+            self.set_windows(x, y, x + text_width - 1, y + text_height - 1)
+            self.dc(1)
+            self.cs(0)
+            t0 = perf_trace.begin()
+            self.bus.write(buf)
+            perf_trace.end("spi_write", t0)
+            self.cs(1)
+        perf_trace.end("draw_text", t_text)
 
-    def draw_centered_text(self, x, y, w, h, text, color, bg_color=0xFFFF):
+    def draw_font_text(self, x, y, text, color, bg_color, font):
+        """Stream text in a BitmapFont to the panel
+
+        Rows are expanded through the font's table for the color pair into
+        a pooled buffer, as many rows per SPI write as fit in it.
+        """
+        table = font.expansion_table(color, bg_color)
+        row_size = font.text_width(text) * 2
+        rows = max(1, min(font.height, self.pool.max_size // row_size))
+        self.set_windows(x, y, x + row_size // 2 - 1, y + font.height - 1)
+        with self.pool.borrow(row_size * rows) as buf:
+            row = 0
+            while row < font.height:
+                n = min(rows, font.height - row)
+                for r in range(n):
+                    font.expand_row(buf[r * row_size:(r + 1) * row_size], text, row + r, table)
+                self.dc(1)
+                self.cs(0)
+                t0 = perf_trace.begin()
+                self.bus.write(buf[:n * row_size])
+                perf_trace.end("spi_write", t0)
+                self.cs(1)
+                row += n
+
+    def text_size(self, text, font=None):
+        """Return (width, height) of text drawn with draw_text"""
+        if font is None:
+            return len(text) * 8, 8
+        return font.text_width(text), font.height
+
+    def draw_centered_text(self, x, y, w, h, text, color, bg_color=0xFFFF, font=None):
         """Draw text centered in the specified rectangle
         
         Args:
@@ -373,12 +1112,12 @@ class lcd_st7796:
             text (str): Text to draw
             color (int): Text color in RGB565 format
             bg_color (int): Background color in RGB565 format (default: white)
+            font (BitmapFont): Font from fonts.py (default: built-in 8x8 font)
         """
-        text_width = len(text) * 8
-        text_height = 8
+        text_width, text_height = self.text_size(text, font)
         text_x = x + (w - text_width) // 2
         text_y = y + (h - text_height) // 2
-        self.draw_text(text_x, text_y, text, color, bg_color)
+        self.draw_text(text_x, text_y, text, color, bg_color, font)
 
     def fill_rectangle(self, x, y, w, h, color):
         """Fill a rectangle with the specified color
@@ -390,15 +1129,29 @@ class lcd_st7796:
             h (int): Height
             color (int): Fill color in RGB565 format
         """
+        if w <= 0 or h <= 0:
+            return
+        if self.frame_ops is not None:
+            self.frame_ops.append(('r', x, y, w, h, color))
+            return
         self.set_windows(x, y, x + w - 1, y + h - 1)
         self.dc(1)
         self.cs(0)
-        # Create a buffer for one row
+        # Borrow a buffer holding as many whole rows as the pool allows
         # Note: color is already in RGB565 format, so we need to maintain the byte order
-        buf = bytearray([color & 0xFF, color >> 8] * w)
-        # Write the buffer for each row
-        for _ in range(h):
-            self.bus.write(buf)
+        row_bytes = w * 2
+        rows = max(1, min(h, self.pool.max_size // row_bytes))
+        with self.pool.borrow(row_bytes * rows) as buf:
+            fill_color(buf, color)
+            # Write the buffer for each block of rows
+            t0 = perf_trace.begin()
+            remaining = h
+            while remaining >= rows:
+                self.bus.write(buf)
+                remaining -= rows
+            if remaining:
+                self.bus.write(buf[:row_bytes * remaining])
+            perf_trace.end("spi_write", t0)
         self.cs(1)
 
 def swap_bytes(color):
@@ -1,6 +1,7 @@
 from lcd_lib import lcd_st7796, draw_button, hex_to_rgb565
+from notify_queue import NotificationQueue
+from idle import IdleScheduler
 import time
-import requests
 import machine
 
 
@@ -15,22 +16,25 @@ lcd.clear_display()
 
 draw_button(lcd, BUTTON, hex_to_rgb565("#36C5F0"), "Notify", 0xFFFF)
 
+# Messages are persisted, batched and retried. Nothing else here uses the
+# network, so posts run on a thread on the second core and never block the loop
+notifier = NotificationQueue(WEBHOOK_URL, timeout=5, use_thread=True)
+
+# Dim after a minute, screen off after five; a touch turns it back on
+idle = IdleScheduler(lcd, dim_after=60, off_after=300)
+
 
 def slack_notify():
     rtc = machine.RTC()
     datetime = rtc.datetime()
     t = f"{datetime[0]}-{datetime[1]:02d}-{datetime[2]:02d} {datetime[4]:02d}:{datetime[5]:02d}:{datetime[6]:02d}"
 
-    response = requests.post(
-        WEBHOOK_URL,
-        json={"text": f"From Raspberry Pi Pico ({t})"},
-        timeout=60,
-    )
-    print("Status code:", +response.status_code)
-    print(response.text)
+    notifier.notify(f"From Raspberry Pi Pico ({t})")
 
 
 while True:
+    if idle.poll():
+        lcd.clear_touch()
     for x, y in lcd.get_touch_xy():
         bx, by, bw, bh = BUTTON
         if (bx <= x < bx + bw) and (by <= y < by + bh):
@@ -39,4 +43,9 @@ while True:
             time.sleep(1)
             lcd.clear_touch()
             break
-    time.sleep_ms(10)
+    notifier.poll()
+    # Sleep until the next touch or until the pending batch is due
+    wait = 1000
+    if notifier.due is not None:
+        wait = max(0, min(wait, time.ticks_diff(notifier.due, time.ticks_ms())))
+    idle.sleep(wait)
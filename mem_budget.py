@@ -0,0 +1,158 @@
+"""Heap budget manager for MicroPython
+
+Instead of calling ``gc.collect()`` before and after every request, code runs
+inside named phases (render, network, persist). Each phase has a budget: the
+amount of free heap it expects to need. A collection only happens when the
+free heap at phase entry is below that budget. The manager also records
+low-water marks of ``gc.mem_free`` and high-water marks of ``gc.mem_alloc``
+per phase, so budgets and history retention can be tuned from real numbers.
+
+Usage:
+    memory = MemoryManager()
+    with memory.phase("network"):
+        response = requests.get(url)
+    print(memory.stats())
+"""
+
+import gc
+import perf_trace
+
+# Free heap (bytes) each phase expects to have available
+PHASE_BUDGETS = {
+    "render": 8 * 1024,
+    "network": 48 * 1024,  # TLS handshake and JSON parsing
+    "persist": 24 * 1024,  # json.dump of the history
+}
+
+# Fraction of the heap allocated between automatic collections
+GC_THRESHOLD_RATIO = 4
+
+
+class MemoryPhase:
+    """Context manager for one phase; created once per phase name"""
+
+    def __init__(self, manager, name, budget):
+        self.manager = manager
+        self.name = name
+        self.budget = budget
+        self.entries = 0
+        self.collections = 0
+        self.min_free = None
+        self.max_alloc = 0
+
+    def __enter__(self):
+        self.entries += 1
+        self.manager.ensure(self)
+        self.sample()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.sample()
+        return False
+
+    def sample(self):
+        """Update the low/high-water marks with the current heap state"""
+        free = gc.mem_free()
+        alloc = gc.mem_alloc()
+        if self.min_free is None or free < self.min_free:
+            self.min_free = free
+        if alloc > self.max_alloc:
+            self.max_alloc = alloc
+
+
+class MemoryManager:
+    def __init__(self, budgets=None, threshold_ratio=GC_THRESHOLD_RATIO):
+        """Create the manager and set the automatic GC threshold
+
+        Args:
+            budgets (dict): Phase name to required free bytes (default: PHASE_BUDGETS)
+            threshold_ratio (int): Run automatic GC after 1/N of the heap is allocated
+                (0 leaves ``gc.threshold`` untouched)
+        """
+        self.phases = {}
+        for name, budget in (budgets or PHASE_BUDGETS).items():
+            self.phases[name] = MemoryPhase(self, name, budget)
+        self.collections = 0
+        self.heap_size = gc.mem_free() + gc.mem_alloc()
+        if threshold_ratio:
+            gc.threshold(self.heap_size // threshold_ratio)
+
+    def phase(self, name):
+        """Return the context manager for phase ``name``"""
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = MemoryPhase(self, name, 0)
+            self.phases[name] = phase
+        return phase
+
+    def ensure(self, phase):
+        """Collect only if the free heap is below the phase budget
+
+        Returns:
+            bool: True if a collection was run
+        """
+        if gc.mem_free() >= phase.budget:
+            return False
+        perf_trace.gc_collect()
+        phase.collections += 1
+        self.collections += 1
+        return True
+
+    def sample(self, name):
+        """Record the heap state inside a running phase (e.g. at its peak)"""
+        self.phase(name).sample()
+
+    def headroom(self):
+        """Smallest margin (bytes) between a phase's low-water mark and its budget
+
+        A large positive value means history retention could grow; a negative
+        value means that phase had to collect (or would fail) to fit.
+        """
+        margins = [
+            phase.min_free - phase.budget
+            for phase in self.phases.values()
+            if phase.min_free is not None
+        ]
+        return min(margins) if margins else None
+
+    def stats(self):
+        """Return heap statistics per phase
+
+        Returns:
+            dict: {'heap_size', 'mem_free', 'mem_alloc', 'collections', 'headroom',
+                   'phases': {name: {'budget', 'entries', 'collections',
+                                     'min_free', 'max_alloc'}}}
+        """
+        return {
+            "heap_size": self.heap_size,
+            "mem_free": gc.mem_free(),
+            "mem_alloc": gc.mem_alloc(),
+            "collections": self.collections,
+            "headroom": self.headroom(),
+            "phases": {
+                name: {
+                    "budget": phase.budget,
+                    "entries": phase.entries,
+                    "collections": phase.collections,
+                    "min_free": phase.min_free,
+                    "max_alloc": phase.max_alloc,
+                }
+                for name, phase in self.phases.items()
+            },
+        }
+
+    def report(self):
+        """Print the statistics on the serial console"""
+        stats = self.stats()
+        print(
+            "Heap: {} bytes, free {}, collections {}, headroom {}".format(
+                stats["heap_size"], stats["mem_free"], stats["collections"], stats["headroom"]
+            )
+        )
+        for name, phase in stats["phases"].items():
+            print(
+                "  {:8s} budget {:6d} min_free {} max_alloc {} entries {} gc {}".format(
+                    name, phase["budget"], phase["min_free"], phase["max_alloc"],
+                    phase["entries"], phase["collections"],
+                )
+            )
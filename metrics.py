@@ -0,0 +1,123 @@
+"""Metrics and history endpoints for SwitchBotDisplay
+
+Routes registered on an ``HttpServer``:
+    GET /metrics       Current readings in Prometheus text format
+    GET /history.json  History as JSON, streamed sample by sample
+    GET /history.csv   History as CSV, streamed row by row
+
+The history endpoints accept ``?device=<deviceId>`` and
+``?series=5min|hourly`` to narrow the output. Bodies are generators over
+the in-memory history, so the full document is never built.
+"""
+
+import gc
+import json
+
+SERIES = ("5min", "hourly")
+METRICS = (
+    ("temperature", "switchbot_temperature_celsius", "Temperature in degrees Celsius"),
+    ("humidity", "switchbot_humidity_percent", "Relative humidity in percent"),
+    ("co2", "switchbot_co2_ppm", "CO2 concentration in ppm"),
+)
+
+
+def register(server, display):
+    """Add the metrics and history routes for ``display`` to ``server``"""
+    server.route("GET", "/metrics", lambda request: (200, "text/plain; version=0.0.4", metrics_body(display)))
+    server.route("GET", "/history.json", lambda request: (200, "application/json", history_json(display, request.query)))
+    server.route("GET", "/history.csv", lambda request: (200, "text/csv", history_csv(display, request.query)))
+
+
+def label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def metrics_body(display):
+    """Yield Prometheus exposition lines for the latest sample of each meter"""
+    meters = []
+    for meter in display.meters:
+        device_id = meter.get("deviceId")
+        latest = display.get_latest_values(device_id)
+        if latest:
+            name = display.get_device_name(device_id) or device_id
+            meters.append((device_id, name, latest))
+    for index, (_, metric, help_text) in enumerate(METRICS):
+        yield "# HELP {} {}\n# TYPE {} gauge\n".format(metric, help_text, metric)
+        for device_id, name, latest in meters:
+            value = latest[index]
+            if value is not None:
+                yield '{}{{device_id="{}",device="{}"}} {}\n'.format(
+                    metric, label(device_id), label(name), value
+                )
+    yield "# TYPE switchbot_last_update_timestamp_seconds gauge\n"
+    yield "switchbot_last_update_timestamp_seconds {}\n".format(int(display.last_update))
+    yield "# TYPE switchbot_data_stale gauge\n"
+    yield "switchbot_data_stale {}\n".format(1 if display.stale else 0)
+    yield "# TYPE pico_heap_free_bytes gauge\n"
+    yield "pico_heap_free_bytes {}\n".format(gc.mem_free())
+    breaker = getattr(display, "api_breaker", None)
+    if breaker is not None:
+        health = breaker.health()
+        yield "# HELP switchbot_api_circuit_open 1 while API requests are skipped after failures\n"
+        yield "# TYPE switchbot_api_circuit_open gauge\n"
+        yield "switchbot_api_circuit_open {}\n".format(0 if health["state"] == "closed" else 1)
+        for key in ("calls", "failures", "skipped", "opened"):
+            yield "# TYPE switchbot_api_{}_total counter\n".format(key)
+            yield "switchbot_api_{}_total {}\n".format(key, health[key])
+    wifi = getattr(display, "wifi", None)
+    if wifi is not None and wifi.rssi is not None:
+        yield "# TYPE pico_wifi_rssi_dbm gauge\n"
+        yield "pico_wifi_rssi_dbm {}\n".format(wifi.rssi)
+
+
+def selected(display, query):
+    """Yield (device_id, series, samples) for the requested history"""
+    device = query.get("device")
+    series_filter = query.get("series")
+    for device_id in list(display.meter_history):
+        if device and device_id != device:
+            continue
+        device_data = display.meter_history[device_id]
+        if not isinstance(device_data, dict):
+            continue
+        for series in SERIES:
+            if series_filter and series != series_filter:
+                continue
+            yield device_id, series, device_data.get(f"{series}_data", [])
+
+
+def history_json(display, query):
+    """Yield {"devices": {id: {"5min_data": [...], ...}}} piece by piece"""
+    yield '{"devices": {'
+    current = None
+    first_series = True
+    for device_id, series, samples in selected(display, query):
+        if device_id != current:
+            if current is not None:
+                yield "}, "
+            yield "{}: {{".format(json.dumps(device_id))
+            current = device_id
+            first_series = True
+        if not first_series:
+            yield ", "
+        first_series = False
+        yield '"{}_data": ['.format(series)
+        # cleanup_old_data replaces the lists, so the one held here stays intact
+        for i in range(len(samples)):
+            yield (", " if i else "") + json.dumps(samples[i])
+        yield "]"
+    if current is not None:
+        yield "}"
+    yield "}}"
+
+
+def history_csv(display, query):
+    """Yield CSV rows: device_id,series,timestamp,temperature,humidity,co2"""
+    yield "device_id,series,timestamp,temperature,humidity,co2\n"
+    for device_id, series, samples in selected(display, query):
+        for i in range(len(samples)):
+            d = samples[i]
+            yield "{},{},{},{},{},{}\n".format(
+                device_id, series, d["timestamp"],
+                *["" if d.get(field) is None else d[field] for field in ("temperature", "humidity", "co2")]
+            )
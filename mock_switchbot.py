@@ -0,0 +1,645 @@
+"""Local stand-in for the SwitchBot API v1.1 with fault injection.
+
+This script runs on the host (CPython), not on the Pico. It serves the
+endpoints used by ``switchbot_display.py`` and checks the same signature
+that ``sign``/``get_auth_headers`` produce, so the display can be pointed at
+it by setting ``API_BASE_URL`` in ``private.py``.
+
+Examples:
+    # Server with 50-400 ms latency, 5% 5xx, 2% statusCode 190, 1% hangs
+    python mock_switchbot.py serve --port 8080 --latency uniform:50,400 \\
+        --error-rate 0.05 --status190-rate 0.02 --hang-rate 0.01
+
+    # Load driver simulating 12 panels polling for 60 seconds
+    python mock_switchbot.py load --url http://127.0.0.1:8080/v1.1 \\
+        --panels 12 --duration 60
+
+    # Send synthetic, signed webhook events to the Pico every 5 seconds
+    python mock_switchbot.py webhook --url http://192.168.1.50:8080/webhook \\
+        --secret <WEBHOOK_SECRET> --interval 5
+
+    # Relay real SwitchBot webhook posts received on port 9000 to the Pico
+    python mock_switchbot.py webhook --url http://192.168.1.50:8080/webhook \\
+        --secret <WEBHOOK_SECRET> --listen 9000
+
+    # NTP stand-in on UDP 12300 whose clock is 3 s ahead and gains 200 ppm
+    python mock_switchbot.py ntp --port 12300 --offset 3 --drift-ppm 200
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import math
+import socket
+import struct
+import random
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TOKEN = "<YOUR_SWITCHBOT_TOKEN>"
+DEFAULT_SECRET = "<YOUR_SWITCHBOT_SECRET>"
+
+# Allowed difference between the client's "t" header and the server clock
+SIGN_TIME_WINDOW = 5 * 60 * 1000  # 5 minutes in milliseconds
+
+# Devices served by the mock (names match DEVICE_NAMES in switchbot_display)
+MOCK_DEVICES = [
+    {"deviceId": "C0FFEE000001", "deviceName": "小部屋の温湿度計", "deviceType": "Meter"},
+    {"deviceId": "C0FFEE000002", "deviceName": "CO2センサー", "deviceType": "MeterPro(CO2)"},
+    {"deviceId": "C0FFEE000003", "deviceName": "ベランダの防水温湿度計", "deviceType": "WoIOSensor"},
+    {"deviceId": "C0FFEE000004", "deviceName": "コーヒー", "deviceType": "Bot"},
+    {"deviceId": "C0FFEE000005", "deviceName": "換気扇", "deviceType": "Bot"},
+    {"deviceId": "C0FFEE000006", "deviceName": "人感センサー キッチン", "deviceType": "Motion Sensor"},
+]
+
+# deviceType reported in webhook events for the mock devices
+WEBHOOK_DEVICE_TYPES = {
+    "Meter": "WoMeter",
+    "MeterPro(CO2)": "MeterPro(CO2)",
+    "WoIOSensor": "WoIOSensor",
+    "Motion Sensor": "WoPresence",
+}
+
+MOCK_SCENES = [
+    {"sceneId": "scene-good-night", "sceneName": "Good Night"},
+    {"sceneId": "scene-coffee", "sceneName": "Coffee Time"},
+]
+
+
+def sign(token, secret, nonce, t):
+    """Reference signature, identical to ``switchbot_display.sign``"""
+    string_to_sign = "{}{}{}".format(token, t, nonce)
+    digest = hmac.new(
+        secret.encode("utf-8"), string_to_sign.encode("utf-8"), hashlib.sha256
+    ).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def get_auth_headers(token, secret):
+    """Build request headers the same way the Pico does"""
+    t = str(int(time.time() * 1000))
+    nonce = uuid.uuid4().hex
+    return {
+        "Authorization": token,
+        "sign": sign(token, secret, nonce, t),
+        "t": t,
+        "nonce": nonce,
+    }
+
+
+def parse_latency(spec):
+    """Parse a latency distribution spec into a sampler returning seconds.
+
+    Supported specs (values in milliseconds):
+        const:MS, uniform:LOW,HIGH, normal:MEAN,STDDEV, exp:MEAN,
+        lognormal:MEDIAN,SIGMA
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "const":
+        (ms,) = values or [0.0]
+        return lambda: ms / 1000
+    if kind == "uniform":
+        low, high = values
+        return lambda: random.uniform(low, high) / 1000
+    if kind == "normal":
+        mean, stddev = values
+        return lambda: max(0.0, random.gauss(mean, stddev)) / 1000
+    if kind == "exp":
+        (mean,) = values
+        return lambda: random.expovariate(1 / mean) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class MockState:
+    """Shared server state: fault settings, quota counters and device values"""
+
+    def __init__(self, args):
+        self.token = args.token
+        self.secret = args.secret
+        self.check_sign = not args.no_sign_check
+        self.latency = parse_latency(args.latency)
+        self.error_rate = args.error_rate
+        self.status190_rate = args.status190_rate
+        self.hang_rate = args.hang_rate
+        self.hang_time = args.hang_time
+        self.daily_quota = args.daily_quota
+        self.lock = threading.Lock()
+        self.quota_day = time.gmtime()[:3]
+        self.quota_used = 0
+        self.counters = {}
+        self.values = {}
+        for device in MOCK_DEVICES:
+            self.values[device["deviceId"]] = {
+                "temperature": 25.0,
+                "humidity": 50,
+                "CO2": 800,
+                "power": "off",
+            }
+
+    def count(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def take_quota(self):
+        """Consume one API call, returning False when the daily quota is spent"""
+        with self.lock:
+            today = time.gmtime()[:3]
+            if today != self.quota_day:
+                self.quota_day = today
+                self.quota_used = 0
+            if self.daily_quota and self.quota_used >= self.daily_quota:
+                return False
+            self.quota_used += 1
+            return True
+
+    def device_status(self, device):
+        with self.lock:
+            value = self.values[device["deviceId"]]
+            value["temperature"] = round(
+                min(30.0, max(20.0, value["temperature"] + random.uniform(-0.2, 0.2))), 1
+            )
+            value["humidity"] = min(70, max(30, value["humidity"] + random.randint(-1, 1)))
+            value["CO2"] = min(1500, max(400, value["CO2"] + random.randint(-20, 20)))
+            status = {
+                "deviceId": device["deviceId"],
+                "deviceType": device["deviceType"],
+                "hubDeviceId": "000000000000",
+            }
+            if "Meter" in device["deviceType"] or "WoIOSensor" in device["deviceType"]:
+                status["temperature"] = value["temperature"]
+                status["humidity"] = value["humidity"]
+                status["battery"] = 100
+                if device["deviceType"] == "MeterPro(CO2)":
+                    status["CO2"] = value["CO2"]
+            else:
+                status["power"] = value["power"]
+            return status
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # Set by serve()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply(self, body=None, status_code=100, message="success"):
+        self.send_json(200, {"statusCode": status_code, "message": message, "body": body or {}})
+
+    def verify_signature(self):
+        headers = self.headers
+        if headers.get("Authorization") != self.state.token:
+            return False
+        t = headers.get("t", "")
+        nonce = headers.get("nonce", "")
+        if not t.isdigit() or abs(int(t) - time.time() * 1000) > SIGN_TIME_WINDOW:
+            return False
+        expected = sign(self.state.token, self.state.secret, nonce, t)
+        return hmac.compare_digest(expected, headers.get("sign", ""))
+
+    def inject_faults(self):
+        """Apply latency and failures; return True if the request was consumed"""
+        state = self.state
+        time.sleep(state.latency())
+        roll = random.random()
+        if roll < state.hang_rate:
+            # Half-open connection: keep the socket but never answer
+            state.count("hang")
+            time.sleep(state.hang_time)
+            self.close_connection = True
+            return True
+        roll -= state.hang_rate
+        if roll < state.error_rate:
+            state.count("5xx")
+            self.send_json(random.choice((500, 502, 503)), {"message": "Internal server error"})
+            return True
+        roll -= state.error_rate
+        if roll < state.status190_rate:
+            state.count("190")
+            self.reply(status_code=190, message="Device internal error due to device states not synchronized with server")
+            return True
+        return False
+
+    def handle_api(self, method):
+        state = self.state
+        path = self.path.split("?", 1)[0]
+        # Always drain the request body so keep-alive connections stay in sync
+        raw_body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if path.startswith("/bench"):
+            self.handle_bench()
+            return
+        if not path.startswith("/v1.1/"):
+            self.send_json(404, {"message": "Not found"})
+            return
+        state.count("requests")
+        if state.check_sign and not self.verify_signature():
+            state.count("401")
+            self.send_json(401, {"message": "Unauthorized"})
+            return
+        if not state.take_quota():
+            state.count("429")
+            self.send_json(429, {"message": "Too Many Requests"})
+            return
+        if self.inject_faults():
+            return
+
+        parts = path.strip("/").split("/")[1:]
+        devices = {d["deviceId"]: d for d in MOCK_DEVICES}
+        if method == "GET" and parts == ["devices"]:
+            self.reply({"deviceList": MOCK_DEVICES, "infraredRemoteList": []})
+        elif method == "GET" and len(parts) == 3 and parts[0] == "devices" and parts[2] == "status":
+            device = devices.get(parts[1])
+            if device is None:
+                self.reply(status_code=152, message="Error: device not found")
+            else:
+                self.reply(self.state.device_status(device))
+        elif method == "POST" and len(parts) == 3 and parts[0] == "devices" and parts[2] == "commands":
+            device = devices.get(parts[1])
+            try:
+                command = json.loads(raw_body or b"{}")
+            except ValueError:
+                self.reply(status_code=160, message="Unknown command")
+                return
+            if device is None:
+                self.reply(status_code=152, message="Error: device not found")
+                return
+            if command.get("command") in ("turnOn", "turnOff"):
+                with state.lock:
+                    state.values[device["deviceId"]]["power"] = command["command"][4:].lower()
+            self.reply()
+        elif method == "GET" and parts == ["scenes"]:
+            self.reply(MOCK_SCENES)
+        elif method == "POST" and len(parts) == 3 and parts[0] == "scenes" and parts[2] == "execute":
+            if parts[1] not in [s["sceneId"] for s in MOCK_SCENES]:
+                self.reply(status_code=190, message="Scene not found")
+            else:
+                self.reply()
+        else:
+            self.send_json(404, {"message": "Not found"})
+
+    def handle_bench(self):
+        """Unauthenticated payload endpoint: /bench?bytes=N returns N bytes"""
+        query = self.path.partition("?")[2]
+        size = 0
+        for item in query.split("&"):
+            key, _, value = item.partition("=")
+            if key == "bytes" and value.isdigit():
+                size = int(value)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        chunk = b"x" * 1024
+        while size > 0:
+            self.wfile.write(chunk[:size])
+            size -= len(chunk)
+
+    def do_GET(self):
+        self.handle_api("GET")
+
+    def do_POST(self):
+        self.handle_api("POST")
+
+
+def serve(args):
+    MockHandler.state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    scheme = "http"
+    if args.certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.certfile, args.keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    print(f"Mock SwitchBot API on {scheme}://{args.host}:{args.port}/v1.1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("Counters:", MockHandler.state.counters)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(math.ceil(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[max(0, index)]
+
+
+def api_call(url, token, secret, timeout, method="GET", body=None):
+    """Perform one signed call, returning (outcome, latency_seconds, payload)"""
+    payload = None
+    headers = get_auth_headers(token, secret)
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    request = urllib.request.Request(url, data=data, headers=headers, method=method)
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.loads(response.read())
+        outcome = "ok" if payload.get("statusCode") == 100 else f"status{payload.get('statusCode')}"
+    except urllib.error.HTTPError as e:
+        outcome = f"http{e.code}"
+    except (TimeoutError, OSError) as e:
+        outcome = "timeout" if "timed out" in str(e) else "error"
+    return outcome, time.monotonic() - start, payload if outcome == "ok" else None
+
+
+def load(args):
+    """Simulate several panels running the display's poll cycle"""
+    results = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def panel():
+        while time.monotonic() < deadline:
+            cycle_start = time.monotonic()
+            outcome, latency, payload = api_call(f"{args.url}/devices", args.token, args.secret, args.timeout)
+            samples = [("devices", outcome, latency)]
+            if payload is not None:
+                meters = [
+                    d for d in payload["body"]["deviceList"]
+                    if any(t in d.get("deviceType", "") for t in ("Meter", "WoIOSensor"))
+                ]
+                for meter in meters:
+                    outcome, latency, _ = api_call(
+                        f"{args.url}/devices/{meter['deviceId']}/status",
+                        args.token, args.secret, args.timeout,
+                    )
+                    samples.append(("status", outcome, latency))
+            with lock:
+                results.extend(samples)
+                results.append(("cycle", "ok", time.monotonic() - cycle_start))
+            if args.interval:
+                time.sleep(max(0.0, args.interval - (time.monotonic() - cycle_start)))
+
+    threads = [threading.Thread(target=panel, daemon=True) for _ in range(args.panels)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    requests_done = [r for r in results if r[0] != "cycle"]
+    print(f"Panels: {args.panels}, duration: {elapsed:.1f}s")
+    print(f"Requests: {len(requests_done)} ({len(requests_done) / elapsed:.1f} req/s)")
+    outcomes = {}
+    for _, outcome, _ in requests_done:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    print("Outcomes:", ", ".join(f"{k}={v}" for k, v in sorted(outcomes.items())))
+    for kind in ("devices", "status", "cycle"):
+        latencies = sorted(r[2] * 1000 for r in results if r[0] == kind)
+        if not latencies:
+            continue
+        print(
+            f"{kind:8s} n={len(latencies):5d} "
+            f"p50={percentile(latencies, 50):7.1f}ms "
+            f"p90={percentile(latencies, 90):7.1f}ms "
+            f"p99={percentile(latencies, 99):7.1f}ms "
+            f"max={latencies[-1]:7.1f}ms"
+        )
+
+
+class WebhookSigner:
+    """Sign relayed webhook bodies as webhook.py expects
+
+    X-Timestamp is in milliseconds and strictly increasing, so events sent in
+    the same millisecond still pass the receiver's replay check.
+    """
+
+    def __init__(self, url, secret, timeout):
+        self.url = url
+        self.secret = secret.encode("utf-8")
+        self.timeout = timeout
+        self.last_timestamp = 0
+        self.lock = threading.Lock()
+
+    def post(self, body):
+        """Forward one body; returns the HTTP status, or None if unreachable"""
+        with self.lock:
+            timestamp = max(int(time.time() * 1000), self.last_timestamp + 1)
+            self.last_timestamp = timestamp
+            digest = hmac.new(self.secret, f"{timestamp}.".encode() + body, hashlib.sha256).digest()
+            request = urllib.request.Request(self.url, data=body, method="POST", headers={
+                "Content-Type": "application/json",
+                "X-Timestamp": str(timestamp),
+                "X-Signature": base64.b64encode(digest).decode("utf-8"),
+            })
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+            except OSError as e:
+                print(f"Webhook post failed: {e}")
+                return None
+
+
+def mock_events():
+    """Yield SwitchBot-style changeReport payloads for the mock devices"""
+    values = {}
+    detected = False
+    while True:
+        for device in MOCK_DEVICES:
+            webhook_type = WEBHOOK_DEVICE_TYPES.get(device["deviceType"])
+            if webhook_type is None:
+                continue
+            device_id = device["deviceId"]
+            context = {
+                "deviceType": webhook_type,
+                "deviceMac": ":".join(device_id[i:i + 2] for i in range(0, 12, 2)),
+                "timeOfSample": int(time.time() * 1000),
+            }
+            if webhook_type == "WoPresence":
+                detected = not detected
+                context["detectionState"] = "DETECTED" if detected else "NOT_DETECTED"
+            else:
+                temp, humidity, co2 = values.get(device_id, (25.0, 50, 800))
+                temp = round(min(30.0, max(20.0, temp + random.uniform(-0.3, 0.3))), 1)
+                humidity = min(70, max(30, humidity + random.randint(-1, 1)))
+                co2 = min(1500, max(400, co2 + random.randint(-30, 30)))
+                values[device_id] = (temp, humidity, co2)
+                context.update({"temperature": temp, "scale": "CELSIUS", "humidity": humidity, "battery": 100})
+                if device["deviceType"] == "MeterPro(CO2)":
+                    context["CO2"] = co2
+            yield {"eventType": "changeReport", "eventVersion": "1", "context": context}
+
+
+def webhook(args):
+    """Send synthetic webhook events, or relay incoming ones, signed for the Pico"""
+    signer = WebhookSigner(args.url, args.secret, args.timeout)
+    if args.listen:
+        class RelayHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status = signer.post(body)
+                print(f"Relayed {len(body)} bytes: {status}")
+                # Always acknowledge so SwitchBot does not disable the webhook
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        server = ThreadingHTTPServer(("0.0.0.0", args.listen), RelayHandler)
+        print(f"Relaying webhooks from port {args.listen} to {args.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    sent = 0
+    for event in mock_events():
+        status = signer.post(json.dumps(event).encode("utf-8"))
+        context = event["context"]
+        print(f"{context['deviceMac']} {context['deviceType']}: {status}")
+        sent += 1
+        if args.count and sent >= args.count:
+            break
+        time.sleep(args.interval)
+
+
+NTP_DELTA = 2208988800  # Seconds from 1900-01-01 to 1970-01-01
+
+
+def ntp_timestamp(t):
+    """Return the 64-bit NTP timestamp of Unix time ``t`` as (seconds, fraction)"""
+    t += NTP_DELTA
+    seconds = int(t)
+    return seconds, int((t - seconds) * (1 << 32)) & 0xFFFFFFFF
+
+
+def ntp(args):
+    """Answer SNTP requests with the host clock plus an offset and drift"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((args.host, args.port))
+    print(f"NTP stand-in on udp://{args.host}:{args.port} (offset {args.offset} s, drift {args.drift_ppm} ppm)")
+    try:
+        serve_ntp(sock, args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+def serve_ntp(sock, args, stop=None):
+    """Answer SNTP requests on a bound UDP socket until ``stop`` is set
+
+    Args:
+        stop (threading.Event): Checked every 0.1 s; None serves forever
+    """
+    start = time.time()
+
+    def server_time():
+        now = time.time()
+        return now + args.offset + (now - start) * args.drift_ppm / 1e6
+
+    if stop is not None:
+        sock.settimeout(0.1)
+    while stop is None or not stop.is_set():
+        try:
+            request, addr = sock.recvfrom(512)
+        except socket.timeout:
+            continue
+        received = server_time()
+        if len(request) < 48:
+            continue
+        if args.latency:
+            time.sleep(args.latency / 1000)
+        if random.random() < args.drop_rate:
+            print(f"{addr[0]}: dropped")
+            continue
+        version = (request[0] >> 3) & 0x07
+        reply = bytearray(48)
+        reply[0] = (version << 3) | 4  # LI 0, the client's version, mode 4 (server)
+        reply[1] = 1  # Stratum 1
+        reply[2] = request[2]  # Poll interval
+        reply[3] = 0xEC  # Precision, about 2^-20 s
+        reply[12:16] = b"MOCK"  # Reference ID
+        struct.pack_into("!II", reply, 16, *ntp_timestamp(received))  # Reference time
+        reply[24:32] = request[40:48]  # Originate: the client's transmit time
+        struct.pack_into("!II", reply, 32, *ntp_timestamp(received))
+        struct.pack_into("!II", reply, 40, *ntp_timestamp(server_time()))
+        sock.sendto(reply, addr)
+        print(f"{addr[0]}: {time.strftime('%H:%M:%S', time.gmtime(received))} UTC")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the mock API server")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--token", default=DEFAULT_TOKEN)
+    serve_parser.add_argument("--secret", default=DEFAULT_SECRET)
+    serve_parser.add_argument("--no-sign-check", action="store_true", help="Accept unsigned requests")
+    serve_parser.add_argument("--latency", default="const:0", help="Latency distribution, e.g. uniform:50,400")
+    serve_parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an HTTP 5xx")
+    serve_parser.add_argument("--status190-rate", type=float, default=0.0, help="Probability of statusCode 190")
+    serve_parser.add_argument("--hang-rate", type=float, default=0.0, help="Probability of never answering")
+    serve_parser.add_argument("--hang-time", type=float, default=120.0, help="Seconds a hung request is held")
+    serve_parser.add_argument("--daily-quota", type=int, default=10000, help="Calls per day before HTTP 429 (0: unlimited)")
+    serve_parser.add_argument("--certfile", help="Serve HTTPS with this certificate")
+    serve_parser.add_argument("--keyfile", help="Private key for --certfile")
+    serve_parser.set_defaults(func=serve)
+
+    load_parser = subparsers.add_parser("load", help="Run the polling load driver")
+    load_parser.add_argument("--url", default="http://127.0.0.1:8080/v1.1")
+    load_parser.add_argument("--token", default=DEFAULT_TOKEN)
+    load_parser.add_argument("--secret", default=DEFAULT_SECRET)
+    load_parser.add_argument("--panels", type=int, default=10, help="Number of simulated panels")
+    load_parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    load_parser.add_argument("--interval", type=float, default=0.0, help="Seconds between poll cycles per panel")
+    load_parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    load_parser.set_defaults(func=load)
+
+    webhook_parser = subparsers.add_parser("webhook", help="Send or relay signed webhook events")
+    webhook_parser.add_argument("--url", required=True, help="Receiver URL, e.g. http://<pico>:8080/webhook")
+    webhook_parser.add_argument("--secret", required=True, help="WEBHOOK_SECRET shared with the Pico")
+    webhook_parser.add_argument("--listen", type=int, help="Relay POSTs received on this port instead")
+    webhook_parser.add_argument("--interval", type=float, default=5.0, help="Seconds between synthetic events")
+    webhook_parser.add_argument("--count", type=int, default=0, help="Stop after this many events (0: forever)")
+    webhook_parser.add_argument("--timeout", type=float, default=5.0, help="Per-request timeout in seconds")
+    webhook_parser.set_defaults(func=webhook)
+
+    ntp_parser = subparsers.add_parser("ntp", help="Run an NTP stand-in for clock sync tests")
+    ntp_parser.add_argument("--host", default="0.0.0.0")
+    ntp_parser.add_argument("--port", type=int, default=12300, help="UDP port (123 needs root)")
+    ntp_parser.add_argument("--offset", type=float, default=0.0, help="Seconds added to the host clock")
+    ntp_parser.add_argument("--drift-ppm", type=float, default=0.0, help="Rate error of the served clock")
+    ntp_parser.add_argument("--latency", type=float, default=0.0, help="Milliseconds before each reply")
+    ntp_parser.add_argument("--drop-rate", type=float, default=0.0, help="Probability of not replying")
+    ntp_parser.set_defaults(func=ntp)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
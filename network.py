@@ -1,10 +1,23 @@
 import time
 import network
+import socket
+import ssl
 import ubinascii
 
 ssid = "<SSID>"
 password = "<PASSWORD>"
 
+# Benchmark against a local endpoint serving /bench?bytes=N over HTTP/1.1,
+# e.g. `python mock_switchbot.py serve --port 8080` on a PC in the same LAN.
+# Leave BENCH_HOST as is to only print the interface information.
+BENCH_HOST = "<BENCH_HOST>"
+BENCH_PORT = 8080
+BENCH_TLS_PORT = None  # e.g. 8443 for a server started with --certfile/--keyfile
+BENCH_CONNECTS = 5  # TCP/TLS connections per setting
+BENCH_REQUESTS = 20  # Round trips per setting on one keep-alive connection
+BENCH_BYTES = 64 * 1024  # Payload for the throughput test
+BENCH_TX_POWERS = [None]  # TX power settings in dBm to try, None keeps the current one
+
 mac = ubinascii.hexlify(network.WLAN().config("mac"), ":").decode()
 print("MAC address: " + mac)
 
@@ -41,3 +54,135 @@ print('Security     :', wlan.config('security'))
 print('Hostname     :', wlan.config('hostname'))
 print('TX Power     :', wlan.config('txpower'))
 print('PM           :', wlan.config('pm'))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = (len(sorted_values) * pct + 99) // 100 - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, index))]
+
+
+def open_connection(host, port, tls):
+    """Open a TCP (and optionally TLS) connection
+
+    Returns:
+        tuple: (socket, tcp_connect_us, tls_handshake_us)
+    """
+    addr = socket.getaddrinfo(host, port)[0][-1]
+    sock = socket.socket()
+    start = time.ticks_us()
+    sock.connect(addr)
+    tcp_us = time.ticks_diff(time.ticks_us(), start)
+    tls_us = 0
+    if tls:
+        start = time.ticks_us()
+        sock = ssl.wrap_socket(sock, server_hostname=host)
+        tls_us = time.ticks_diff(time.ticks_us(), start)
+    return sock, tcp_us, tls_us
+
+
+def http_get(sock, host, size):
+    """Request /bench?bytes=size on an open connection and read the response
+
+    Returns:
+        tuple: (time_to_first_byte_us, total_us, body_bytes)
+    """
+    request = "GET /bench?bytes={} HTTP/1.1\r\nHost: {}\r\n\r\n".format(size, host)
+    start = time.ticks_us()
+    sock.write(request.encode())
+    stream = sock.makefile("rb") if hasattr(sock, "makefile") else sock
+    line = stream.readline()
+    first_byte_us = time.ticks_diff(time.ticks_us(), start)
+    if not line.startswith(b"HTTP/1.1 200"):
+        raise OSError("Unexpected response: {}".format(line))
+    length = 0
+    while True:
+        line = stream.readline()
+        if line in (b"\r\n", b""):
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    remaining = length
+    while remaining > 0:
+        chunk = stream.read(min(remaining, 2048))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+    return first_byte_us, time.ticks_diff(time.ticks_us(), start), length - remaining
+
+
+def run_benchmark(host, port, tls):
+    """Measure connect times, request round trips and throughput"""
+    tcp_times = []
+    tls_times = []
+    for _ in range(BENCH_CONNECTS):
+        sock, tcp_us, tls_us = open_connection(host, port, tls)
+        tcp_times.append(tcp_us // 1000)
+        tls_times.append(tls_us // 1000)
+        sock.close()
+
+    sock, _, _ = open_connection(host, port, tls)
+    rtts = []
+    try:
+        for _ in range(BENCH_REQUESTS):
+            first_byte_us, _, _ = http_get(sock, host, 0)
+            rtts.append(first_byte_us / 1000)
+        _, total_us, received = http_get(sock, host, BENCH_BYTES)
+    finally:
+        sock.close()
+
+    tcp_times.sort()
+    tls_times.sort()
+    rtts.sort()
+    result = {
+        "tcp_ms": percentile(tcp_times, 50),
+        "rtt_p50": percentile(rtts, 50),
+        "rtt_p90": percentile(rtts, 90),
+        "rtt_p99": percentile(rtts, 99),
+        "kbps": received * 8 * 1000 // max(1, total_us),
+    }
+    if tls:
+        result["tls_ms"] = percentile(tls_times, 50)
+    return result
+
+
+def benchmark_settings():
+    """Run the benchmark for every power management mode and TX power"""
+    pm_modes = [
+        ("none", getattr(wlan, "PM_NONE", 0xA11140)),
+        ("performance", getattr(wlan, "PM_PERFORMANCE", 0xA11142)),
+        ("powersave", getattr(wlan, "PM_POWERSAVE", 0xA11C82)),
+    ]
+    original_pm = wlan.config("pm")
+    original_txpower = wlan.config("txpower")
+    targets = [(BENCH_PORT, False)]
+    if BENCH_TLS_PORT:
+        targets.append((BENCH_TLS_PORT, True))
+    print("")
+    print("{:12s} {:>4s} {:>4s} {:>6s} {:>6s} {:>8s} {:>8s} {:>8s} {:>7s}".format(
+        "pm", "tx", "tls", "tcp", "tls_hs", "rtt_p50", "rtt_p90", "rtt_p99", "kbit/s"))
+    try:
+        for txpower in BENCH_TX_POWERS:
+            if txpower is not None:
+                wlan.config(txpower=txpower)
+            for pm_name, pm in pm_modes:
+                wlan.config(pm=pm)
+                time.sleep(1)  # Let the radio settle in the new mode
+                for port, tls in targets:
+                    try:
+                        r = run_benchmark(BENCH_HOST, port, tls)
+                    except OSError as e:
+                        print("{:12s} failed: {}".format(pm_name, e))
+                        continue
+                    print("{:12s} {:>4} {:>4s} {:>6} {:>6} {:>8.1f} {:>8.1f} {:>8.1f} {:>7}".format(
+                        pm_name, wlan.config("txpower"), "yes" if tls else "no",
+                        r["tcp_ms"], r.get("tls_ms", "-"),
+                        r["rtt_p50"], r["rtt_p90"], r["rtt_p99"], r["kbps"]))
+    finally:
+        wlan.config(pm=original_pm)
+        wlan.config(txpower=original_txpower)
+
+
+if not BENCH_HOST.startswith("<"):
+    benchmark_settings()
@@ -0,0 +1,215 @@
+"""Outbound notification queue for Slack-style webhooks
+
+Messages are appended to a queue that is persisted to flash, bursts are
+coalesced into a single webhook post, and failed posts are retried with
+exponential backoff. ``poll()`` is cheap unless a batch is due; the post
+is then sent on the caller's core with a short ``timeout``, holding
+``send_lock`` when one is given (e.g. the lock that serializes the other
+HTTPS requests of the application). If that lock is taken, the post waits
+for a later ``poll()`` instead of blocking. With ``use_thread=True`` the post
+runs on a thread on the second core, which is only safe if nothing on the
+first core uses the HTTP/TLS stack at the same time: pass the lock those
+requests hold as ``send_lock``.
+
+Usage:
+    notifier = NotificationQueue(WEBHOOK_URL)
+    notifier.notify("CO2 above 1500 ppm")
+    while True:
+        notifier.poll()
+        ...
+"""
+
+import json
+import time
+import requests
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+NOTIFY_QUEUE_FILE = "notify_queue.json"
+
+
+class NotificationQueue:
+    def __init__(
+        self,
+        webhook_url,
+        queue_file=NOTIFY_QUEUE_FILE,
+        coalesce_ms=2000,
+        max_messages=50,
+        max_batch=20,
+        retry_min_s=5,
+        retry_max_s=600,
+        timeout=10,
+        use_thread=False,
+        send_lock=None,
+        utc_offset=0,
+        clock=None,
+    ):
+        """
+        Args:
+            webhook_url (str): Incoming webhook URL (Slack compatible)
+            queue_file (str): File the pending messages are persisted to
+            coalesce_ms (int): Wait this long after a message for more to batch
+            max_messages (int): Oldest messages are dropped beyond this
+            max_batch (int): Maximum number of messages per post
+            retry_min_s (int): First retry delay after a failed post
+            retry_max_s (int): Maximum retry delay
+            timeout (int): HTTP timeout in seconds
+            use_thread (bool): Post from a thread on the second core when possible
+                (see the module docstring)
+            send_lock (lock): Held during each post; polls skip while it is taken
+            utc_offset (int): Seconds from UTC to the local time shown in messages
+                (ignored with ``clock``, which has its own)
+            clock (Clock): Time source for the message times (default: the RTC)
+        """
+        self.webhook_url = webhook_url
+        self.queue_file = queue_file
+        self.coalesce_ms = coalesce_ms
+        self.max_messages = max_messages
+        self.max_batch = max_batch
+        self.retry_min_s = retry_min_s
+        self.retry_max_s = retry_max_s
+        self.timeout = timeout
+        self.use_thread = use_thread and _thread is not None
+        self.send_lock = send_lock
+        self.utc_offset = utc_offset
+        self.clock = clock
+        self.lock = _thread.allocate_lock() if _thread is not None else None
+        self.pending = []  # [[timestamp, text, count], ...]
+        self.sending = False
+        self.retry_s = retry_min_s
+        self.due = None  # ticks_ms when the next post may be sent
+        self.sent = 0
+        self.failures = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.queue_file, 'r') as f:
+                self.pending = json.load(f)
+        except (OSError, ValueError):
+            self.pending = []
+        if self.pending:
+            self.due = time.ticks_ms()
+
+    def save(self):
+        try:
+            with open(self.queue_file, 'w') as f:
+                json.dump(self.pending, f)
+        except OSError as e:
+            print(f"Error saving notification queue: {e}")
+
+    def notify(self, text):
+        """Queue a message; identical consecutive messages are counted, not repeated"""
+        self.acquire()
+        try:
+            if self.pending and self.pending[-1][1] == text:
+                self.pending[-1][2] += 1
+            else:
+                now = self.clock.time() if self.clock is not None else time.time()
+                self.pending.append([now, text, 1])
+                if len(self.pending) > self.max_messages:
+                    del self.pending[:len(self.pending) - self.max_messages]
+            self.save()
+        finally:
+            self.release()
+        if self.due is None:
+            self.due = time.ticks_add(time.ticks_ms(), self.coalesce_ms)
+
+    def poll(self):
+        """Send the pending batch if it is due; returns immediately otherwise"""
+        if self.sending or self.due is None or not self.pending:
+            return
+        if time.ticks_diff(time.ticks_ms(), self.due) < 0:
+            return
+        if self.send_lock is not None and not self.send_lock.acquire(0):
+            return  # Another request is using the network; try on the next poll
+        self.sending = True
+        if self.use_thread:
+            try:
+                _thread.start_new_thread(self.send_batch, ())
+                return
+            except OSError:
+                pass  # Second core is busy; send from this core instead
+        self.send_batch()
+
+    def format_batch(self, batch):
+        lines = []
+        for timestamp, text, count in batch:
+            if self.clock is not None:
+                t = self.clock.localtime(timestamp)
+            else:
+                t = time.localtime(int(timestamp) + self.utc_offset)
+            line = "{:02d}:{:02d}:{:02d} {}".format(t[3], t[4], t[5], text)
+            if count > 1:
+                line += " (x{})".format(count)
+            lines.append(line)
+        return "\n".join(lines)
+
+    def send_batch(self):
+        """Post up to max_batch pending messages as one webhook message"""
+        try:
+            self.acquire()
+            # The entries themselves identify the batch: notify() may trim old
+            # messages or count repeats of the last one while the post is in flight
+            entries = self.pending[:self.max_batch]
+            batch = [(entry[0], entry[1], entry[2]) for entry in entries]
+            self.release()
+            if not batch:
+                self.due = None
+                return
+            ok = False
+            try:
+                response = requests.post(
+                    self.webhook_url,
+                    json={"text": self.format_batch(batch)},
+                    timeout=self.timeout,
+                )
+                ok = 200 <= response.status_code < 300
+                response.close()
+            except Exception as e:
+                print(f"Error sending notification: {e}")
+
+            self.acquire()
+            try:
+                if ok:
+                    for entry, (_, _, count) in zip(entries, batch):
+                        # Repeats counted during the post stay queued
+                        entry[2] -= count
+                        if entry[2] <= 0:
+                            for i, queued in enumerate(self.pending):
+                                if queued is entry:  # Not == : texts repeat
+                                    del self.pending[i]
+                                    break
+                    self.save()
+                    self.sent += len(batch)
+                    self.retry_s = self.retry_min_s
+                    self.due = time.ticks_ms() if self.pending else None
+                else:
+                    self.failures += 1
+                    self.due = time.ticks_add(time.ticks_ms(), self.retry_s * 1000)
+                    self.retry_s = min(self.retry_s * 2, self.retry_max_s)
+            finally:
+                self.release()
+        finally:
+            self.sending = False
+            if self.send_lock is not None:
+                self.send_lock.release()
+
+    def acquire(self):
+        if self.lock is not None:
+            self.lock.acquire()
+
+    def release(self):
+        if self.lock is not None:
+            self.lock.release()
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'sent': self.sent,
+            'failures': self.failures,
+            'retry_s': self.retry_s,
+        }
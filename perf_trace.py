@@ -0,0 +1,217 @@
+"""Lightweight performance tracing for the Pico
+
+Records (event, start_us, duration_us) in a fixed-size ring buffer using
+``time.ticks_us``. Recording is off by default and every hook returns
+immediately while disabled, so instrumented code pays only a function call.
+
+Usage:
+    import perf_trace
+    perf_trace.enable()
+    t0 = perf_trace.begin()
+    ...
+    perf_trace.end("draw_text", t0)
+    perf_trace.dump()  # Chrome trace JSON on the serial console
+
+Save the dumped text to a file and open it with chrome://tracing or
+https://ui.perfetto.dev to see the timeline.
+"""
+
+import gc
+import sys
+import time
+from array import array
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+DEFAULT_CAPACITY = 512
+
+enabled = False
+overlay = False
+
+_capacity = 0
+_names = []  # Event names, indexed by the values stored in _events
+_name_ids = {}
+_events = None
+_starts = None
+_durations = None
+_pos = 0
+_count = 0
+# The strip sender thread records from core 1 while core 0 records too
+_lock = _thread.allocate_lock() if _thread is not None else None
+
+# Overlay statistics (updated even when the ring buffer is disabled)
+FRAME_WINDOW_US = 10_000_000  # "max" covers the current and the previous window
+_writes = 0  # Panel writes seen so far; a frame without any drew nothing
+_frame_writes = 0
+_frame_window_start = 0
+_window_max_ms = 0
+_max_frame_ms = 0
+_last_frame_ms = 0
+_last_net_ms = 0
+
+
+def enable(capacity=DEFAULT_CAPACITY):
+    """Allocate the ring buffer and start recording"""
+    global enabled, _capacity, _events, _starts, _durations
+    if _capacity != capacity:
+        _capacity = capacity
+        _events = array("H", [0] * capacity)
+        _starts = array("L", [0] * capacity)
+        _durations = array("L", [0] * capacity)
+        clear()
+    enabled = True
+
+
+def disable(free=False):
+    """Stop recording, optionally releasing the ring buffer"""
+    global enabled, _capacity, _events, _starts, _durations
+    enabled = False
+    if free:
+        _capacity = 0
+        _events = _starts = _durations = None
+        clear()
+
+
+def clear():
+    """Drop all recorded events"""
+    global _pos, _count
+    _pos = 0
+    _count = 0
+
+
+def toggle_overlay():
+    """Switch the on-screen render time/latency overlay on or off"""
+    global overlay
+    overlay = not overlay
+    return overlay
+
+
+def begin():
+    """Return a start timestamp for ``end``, or 0 while tracing is off"""
+    if not (enabled or overlay):
+        return 0
+    return time.ticks_us()
+
+
+def end(name, start):
+    """Record an event that started at ``start`` (from ``begin``)"""
+    if not start:
+        return
+    record(name, start, time.ticks_diff(time.ticks_us(), start))
+
+
+def record(name, start, duration):
+    """Store one event in the ring buffer"""
+    global _pos, _count, _last_net_ms, _writes
+    if name.startswith("http"):
+        _last_net_ms = duration // 1000
+    elif name == "spi_write" or name == "set_windows":
+        _writes += 1
+    if not enabled:
+        return
+    if _lock is not None:
+        _lock.acquire()
+    try:
+        index = _name_ids.get(name)
+        if index is None:
+            index = len(_names)
+            _names.append(name)
+            _name_ids[name] = index
+        _events[_pos] = index
+        _starts[_pos] = start
+        _durations[_pos] = duration
+        _pos = (_pos + 1) % _capacity
+        if _count < _capacity:
+            _count += 1
+    finally:
+        if _lock is not None:
+            _lock.release()
+
+
+def gc_collect():
+    """Run ``gc.collect`` and record how long it took"""
+    start = begin()
+    gc.collect()
+    end("gc", start)
+
+
+def frame_begin():
+    """Start timing a code path that may redraw the screen (see ``frame``)"""
+    global _frame_writes
+    _frame_writes = _writes
+    return begin()
+
+
+def frame(start):
+    """Mark the end of a redraw that started at ``start`` (from ``frame_begin``)
+
+    Paths that ended up drawing nothing (e.g. a touch outside any button)
+    are not counted as frames.
+
+    Returns:
+        bool: True if a frame was recorded
+    """
+    global _frame_window_start, _window_max_ms, _max_frame_ms, _last_frame_ms
+    if not start or _writes == _frame_writes:
+        return False
+    now = time.ticks_us()
+    duration = time.ticks_diff(now, start)
+    record("frame", start, duration)
+    _last_frame_ms = duration // 1000
+    if time.ticks_diff(now, _frame_window_start) >= FRAME_WINDOW_US or _frame_window_start == 0:
+        _max_frame_ms = max(_window_max_ms, _last_frame_ms)
+        _window_max_ms = 0
+        _frame_window_start = now
+    _window_max_ms = max(_window_max_ms, _last_frame_ms)
+    _max_frame_ms = max(_max_frame_ms, _last_frame_ms)
+    return True
+
+
+def overlay_text():
+    """Short status text for the overlay, e.g. 'fr120 max340 net340' (ms)
+
+    The display only redraws on data, touches and command results, so the
+    render time of the last and the slowest recent frame says more than a
+    frame rate would.
+    """
+    return "fr{} max{} net{}".format(_last_frame_ms, _max_frame_ms, _last_net_ms)
+
+
+def draw_overlay(lcd, x, y, color=0xFFFF, bg_color=0x0000):
+    """Draw the overlay text if the overlay is enabled"""
+    if overlay:
+        lcd.draw_text(x, y, overlay_text(), color, bg_color)
+
+
+def events():
+    """Yield recorded events as (name, start_us, duration_us), oldest first"""
+    first = (_pos - _count) % _capacity if _capacity else 0
+    for i in range(_count):
+        j = (first + i) % _capacity
+        yield _names[_events[j]], _starts[j], _durations[j]
+
+
+def dump(stream=None):
+    """Write the ring buffer as Chrome trace JSON
+
+    Timestamps are made relative to the oldest event with ``ticks_diff`` so
+    the output stays monotonic across a ``ticks_us`` wrap-around.
+    """
+    if stream is None:
+        stream = sys.stdout
+    stream.write('{"traceEvents":[')
+    origin = None
+    separator = ""
+    for name, start, duration in events():
+        if origin is None:
+            origin = start
+        stream.write(
+            '{}{{"name":"{}","ph":"X","pid":0,"tid":0,"ts":{},"dur":{}}}'.format(
+                separator, name, time.ticks_diff(start, origin), duration
+            )
+        )
+        separator = ",\n"
+    stream.write('],"displayTimeUnit":"ms"}\n')
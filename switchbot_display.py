@@ -6,9 +6,22 @@ import uhashlib
 import ssl
 import random
 import os
+import sys
+import gc
 from lcd_lib import lcd_st7796, draw_button, hex_to_rgb565, update_button_text
 import framebuf
-from wifi import connect_wifi
+import perf_trace
+from mem_budget import MemoryManager
+from alerts import AlertEngine, LedPattern
+from wifi import WifiSupervisor
+from command_queue import CommandQueue
+from data_pyramid import HistoryLog, DataPyramid, NONE, SCALES
+from device_list import DeviceList
+from fonts import BitmapFont
+from idle import IdleScheduler
+from checkpoint import Checkpoint, Watchdog, write_json, reset_cause
+from clock import Clock
+from circuit import CircuitBreaker, Deadline, CLOSED
 from machine import Pin
 
 # Configuration
@@ -17,12 +30,38 @@ from machine import Pin
 # Import private configuration
 from private import SSID, PASSWORD, TOKEN, SECRET
 
+# Optional Slack webhook for alerts (set SLACK_WEBHOOK_URL in private.py)
+try:
+    from private import SLACK_WEBHOOK_URL
+except ImportError:
+    SLACK_WEBHOOK_URL = None
+NOTIFY_TIMEOUT = 3  # Seconds a webhook post may hold api_lock
+
+# Optional secret shared with the LAN webhook relay (set WEBHOOK_SECRET in private.py)
+try:
+    from private import WEBHOOK_SECRET
+except ImportError:
+    WEBHOOK_SECRET = None
+
 # SwitchBot API Configuration
-API_BASE_URL = "https://api.switch-bot.com/v1.1"
+# Set API_BASE_URL in private.py to point at a local stand-in (mock_switchbot.py)
+try:
+    from private import API_BASE_URL
+except ImportError:
+    API_BASE_URL = "https://api.switch-bot.com/v1.1"
+
+# Clock (clock.py): set NTP_SERVER in private.py for a LAN server or mock_switchbot.py ntp
+try:
+    from private import NTP_SERVER
+except ImportError:
+    NTP_SERVER = "pool.ntp.org"  # "host" or "host:port"
+NTP_INTERVAL = 6 * 3600  # Seconds between syncs
+UTC_OFFSET = 9 * 3600  # Displayed times and quiet hours are JST; timestamps are UTC
 
 # Display Configuration
 HORIZONTAL = True
 REVERSE = False
+LCD_BAUDRATE = 40_000_000  # SPI clock; a full-screen fill takes ~2.5 s at 1 MHz
 
 # LED Configuration
 LED = Pin("LED", Pin.OUT)
@@ -33,6 +72,8 @@ BUTTON_COLOR = hex_to_rgb565("#E3F2FD")  # Blue 50 - Very light blue for buttons
 BUTTON_ACTIVE_COLOR = hex_to_rgb565("#90CAF9")  # Blue 200 - Lighter blue when pressed
 TEXT_COLOR = hex_to_rgb565("#1565C0")  # Blue 800 - Dark blue for text
 WHITE_COLOR = hex_to_rgb565("#FFFFFF")  # White for graph background
+STALE_COLOR = hex_to_rgb565("#9E9E9E")  # Grey 500 - Cached values not yet refreshed
+ALERT_COLOR = hex_to_rgb565("#C62828")  # Red 800 - Alert banner background
 
 # Graph Colors (Material Design inspired, all in RGB565 format)
 TEMPERATURE_COLOR = hex_to_rgb565("#1E88E5")  # Blue 600 - より落ち着いた青
@@ -47,6 +88,23 @@ BUTTON_SPACING = 10  # Spacing between buttons
 SCREEN_WIDTH = 480
 SCREEN_HEIGHT = 320
 REFRESH_BUTTON = (10, SCREEN_HEIGHT - 30, 60, 20)  # Smaller refresh button
+ALERT_BANNER_RECT = (10, 264, SCREEN_WIDTH - 20, 20)  # Between room grid and bottom bar
+LAST_UPDATE_AREA = (SCREEN_WIDTH - 160, SCREEN_HEIGHT - 30, 160, 30)  # Tap to toggle perf overlay
+PERF_OVERLAY_RECT = (146, SCREEN_HEIGHT - 9, 168, 8)  # render time/latency overlay, below the buttons
+DEVICE_LIST_BUTTON = (146, SCREEN_HEIGHT - 30, 70, 20)  # Opens the list of all devices
+DEVICE_LIST_RECT = (10, 44, SCREEN_WIDTH - 20, 240)  # Scrolling viewport of the device list
+DEVICE_ROW_HEIGHT = 30
+WIFI_STATUS_POS = (78, SCREEN_HEIGHT - 20)  # Link state / RSSI, 7 characters
+
+# Graph Layout Configuration
+GRAPH_X = 50
+GRAPH_Y = 60
+GRAPH_WIDTH = SCREEN_WIDTH - 120
+GRAPH_HEIGHT = 180
+GRAPH_MAX_POINTS = GRAPH_WIDTH // 2  # Samples drawn per series at any zoom level
+GRAPH_MARKER_POINTS = 60  # Mark each sample while no more than this are visible
+MIN_GRAPH_SPAN = 1800  # Zooming in stops at 30 minutes
+GRAPH_TICK_STEPS = (600, 1800, 3600, 7200, 14400, 21600, 43200, 86400, 172800)
 
 # Room button positions (3x2 grid)
 ROOM_BUTTONS = {
@@ -58,6 +116,16 @@ ROOM_BUTTONS = {
     "Balcony": (330, 140),
 }
 
+# Optional room icons made with asset_tool.py, drawn in the top left corner
+# of the room buttons (streamed from flash), e.g. {"Kitchen": "icons/kitchen.r565"}
+ROOM_ICONS = {}
+ROOM_ICON_OFFSET = 6
+
+# Large font for the temperatures on the room buttons
+VALUE_FONT_FILE = None  # e.g. "fonts/digits16.fnt" made with asset_tool.py font
+VALUE_FONT_SCALE = 2  # Built-in 8x8 font scaled 2x when there is no font file
+VALUE_FONT_CHARS = "0123456789.-C% "
+
 # Device Name Translations
 DEVICE_NAMES = {
     # Living Room
@@ -101,12 +169,68 @@ DEVICE_PLACES = {
     "Balcony": ["Balcony Meter"]
 }
 
+# Devices with ON/OFF buttons on the room control screens
+CONTROL_DEVICE_TYPES = ("Bot", "Plug", "Plug Mini (US)", "Plug Mini (JP)")
+CONTROL_ROW_Y = 50
+CONTROL_ROW_HEIGHT = 40
+CONTROL_ROWS = 4
+# Scenes on the control screens: (label, sceneId, {device name: command it performs})
+# e.g. ("Coffee", "<sceneId>", {"Coffee Bot": "turnOn", "Fan": "turnOn"})
+SCENE_BUTTONS = []
+COMMAND_TIMEOUT = 10  # Seconds before a command/scene request is abandoned
+
+# API requests (circuit.py): per-request timeout, a deadline for each poll cycle,
+# and a circuit breaker that skips requests during a cloud outage
+API_TIMEOUT = 10  # Seconds per GET request
+API_POLL_DEADLINE = 30  # Seconds for the device list and all meters together
+API_FAILURE_THRESHOLD = 3  # Consecutive failures that open the circuit
+API_RESET_TIMEOUT = 30  # Seconds before the first probe request
+API_MAX_RESET_TIMEOUT = 600  # Failed probes double the wait up to this
+
+# Alert rules, evaluated as each sample arrives (see alerts.py)
+ALERT_RULES = [
+    {"name": "CO2 high", "device": "CO2 Meter", "field": "co2", "above": 1500, "hysteresis": 100},
+    {"name": "CO2 rising", "device": "CO2 Meter", "field": "co2", "rate_above": 600, "hysteresis": 300},
+    {"name": "Balcony freezing", "device": "Balcony Meter", "field": "temperature", "below": 0, "hysteresis": 1},
+    {"name": "Play Room dry", "device": "Play Room Meter", "field": "humidity", "below": 30, "hysteresis": 3},
+]
+ALERT_QUIET_HOURS = (23, 7)  # No LED or webhook between 23:00 and 07:00
+ALERT_UNITS = {"temperature": "C", "humidity": "%", "co2": "ppm"}
+
+# Local HTTP server for /metrics (Prometheus) and /history.json|csv, None to disable
+# (also receives POST /webhook events when WEBHOOK_SECRET is set)
+HTTP_SERVER_PORT = None
+RECONCILE_INTERVAL = 1800  # API poll interval while webhook/BLE readings keep values fresh
+BLE_SCAN = False  # Read Meter/CO2 advertisements directly over BLE (ble_meter.py, Pico W)
+EVENT_DEVICE_TYPES = ("Motion Sensor", "Contact Sensor")
+
+# LAN fan-out (fanout.py): "leader" polls the API and multicasts snapshots,
+# "follower" renders them and polls only while the leader is silent, None to disable
+FANOUT_ROLE = None
+FANOUT_SILENCE = 600  # Seconds without packets before a follower polls itself
+
+# Power states (idle.py): dim, then switch the screen off without touches
+IDLE_DIM_AFTER = 60  # Seconds; None to never dim
+IDLE_OFF_AFTER = 300  # Seconds; None to keep the screen on
+IDLE_DIM_LEVEL = 20  # Backlight percentage while dimmed
+IDLE_LIGHT_SLEEP = True  # machine.lightsleep while the screen is off (stops USB serial)
+IDLE_MAX_SLEEP_MS = 1000  # Longest sleep between loop iterations
+IDLE_BUSY_MS = 10  # Loop period during gestures and pending commands
+IDLE_NETWORK_MS = 50  # Loop period while sockets, BLE or the worker need polling
+
 # Data storage configuration
 DATA_FILE = "meter_data.json"
+SCREEN_CACHE_FILE = "screen_cache.json"  # Last rendered dashboard for warm boot
+CHECKPOINT_FILE = "checkpoint.json"  # View, devices and poll schedule for warm restarts
+CHECKPOINT_INTERVAL = 60  # Seconds between checkpoints (only written when the state changed)
+WATCHDOG_TIMEOUT = 120  # Seconds the loop may stall before the board resets; None to disable
 UPDATE_INTERVAL = 300  # 5 minutes in seconds
+FAILED_POLL_RETRY = 30  # Seconds before a failed poll is repeated
 HOURLY_INTERVAL = 3600  # 1 hour in seconds
 MAX_5MIN_SAMPLES = 12  # 1 hour worth of 5-minute samples
 MAX_HOURLY_SAMPLES = 24  # 24 hours worth of hourly samples
+HISTORY_LOG_FILE = "history_{}.bin"  # Per-meter samples on flash for panning back
+HISTORY_LOG_DAYS = 7
 
 def generate_nonce():
     # Generate 32 random hex characters
@@ -115,6 +239,9 @@ def generate_nonce():
         rand_bytes[i] = random.randint(0, 255)
     return ubinascii.hexlify(rand_bytes).decode('utf-8')
 
+# Request signatures and sample timestamps use this clock, not the RTC
+clock = Clock(NTP_SERVER, interval_s=NTP_INTERVAL, utc_offset=UTC_OFFSET)
+
 def sign(token, secret, nonce, t):
     # Format exactly as in the example
     string_to_sign = '{}{}{}'.format(token, t, nonce)
@@ -154,7 +281,7 @@ def sign(token, secret, nonce, t):
 
 def get_auth_headers():
     # Get timestamp in milliseconds
-    t = str(int(time.time() * 1000))
+    t = str(clock.time_ms())
     nonce = generate_nonce()
     sign_result = sign(TOKEN, SECRET, nonce, t)
     
@@ -167,36 +294,444 @@ def get_auth_headers():
     }
     return headers
 
+def compact_devices(devices):
+    """Return [[deviceId, deviceName, deviceType], ...] for caches and checkpoints"""
+    return [[d.get("deviceId"), d.get("deviceName", ""), d.get("deviceType", "")] for d in devices]
+
+def expand_devices(rows):
+    return [{"deviceId": d[0], "deviceName": d[1], "deviceType": d[2]} for d in rows]
+
+def format_value(value, spec, unit):
+    """Format a reading, or "--" when the meter did not report it (e.g. fan-out or BLE)"""
+    return ("--" if value is None else spec.format(value)) + unit
+
+def load_value_font():
+    if VALUE_FONT_FILE:
+        try:
+            return BitmapFont.load(VALUE_FONT_FILE)
+        except (OSError, ValueError) as e:
+            print(f"Error loading font {VALUE_FONT_FILE}: {e}")
+    return BitmapFont.builtin(VALUE_FONT_SCALE, VALUE_FONT_CHARS)
+
 class SwitchBotDisplay:
-    def __init__(self, pseudo_mode=False):
-        self.lcd = lcd_st7796(horizontal=HORIZONTAL, reverse=REVERSE)
-        self.lcd.clear_display(BACKGROUND_COLOR)  # Set background color
-        self.devices = []
+    def __init__(self, pseudo_mode=False, dual_core=False):
+        self.lcd = lcd_st7796(horizontal=HORIZONTAL, reverse=REVERSE, baudrate=LCD_BAUDRATE)
+        self.value_font = load_value_font()
+        self.idle = IdleScheduler(self.lcd, IDLE_DIM_AFTER, IDLE_OFF_AFTER, IDLE_DIM_LEVEL, IDLE_LIGHT_SLEEP)
+        self.waking = False  # The touch that woke the screen is still down
+        # Samples stamped before the first NTP sync are moved when the clock steps
+        clock.on_step = self.on_clock_step
         self.meters = []  # List to store meter devices
-        self.current_page = 0
-        self.items_per_page = 3
+        self.controls = []  # Devices with ON/OFF buttons (CONTROL_DEVICE_TYPES)
+        self.showing_controls = None  # Room name while its control screen is shown
+        self.commands_changed = False
+        # Every device of the account, for the scrolling device list
+        self.device_entries = []  # [(device_id, name, device_type), ...]
+        self.device_list = None
+        self.showing_device_list = False
         # Data storage for graphs
         self.meter_history = {}  # {device_id: [(timestamp, temp, humidity, co2), ...]}
+        self.history_logs = {}  # {device_id: HistoryLog} of the last HISTORY_LOG_DAYS
+        # Graph window: span in seconds ending at graph_end (None: now)
+        self.graph_pyramid = None
+        self.graph_key = None
+        self.graph_span = HOURLY_INTERVAL
+        self.graph_end = None
+        self.gesture = None  # (fingers, anchor x, distance, end, span) at its start
         self.last_update = 0
         self.last_hourly_update = 0
         self.update_interval = UPDATE_INTERVAL if not pseudo_mode else 10
         self.need_refresh = True
         self.initialized = False
+        # Values shown before the first successful poll come from the screen cache
+        self.stale = True
+        self.cached_values = {}  # {device_id: (temp, humidity, co2)}
+        # Commands are coalesced; the UI shows the expected state right away and
+        # is corrected when the response arrives. They are sent from the main
+        # loop: api_request shares the breaker, memory budgets and the TLS stack
+        # with polling, so it must not run on the other core at the same time
+        self.commands = CommandQueue(self.control_device, self.execute_scene, self.on_command_result)
+        # Every API request goes through the breaker; while it is open the cached
+        # values are shown as stale and only probe requests are sent
+        self.api_breaker = CircuitBreaker(API_FAILURE_THRESHOLD, API_RESET_TIMEOUT, API_MAX_RESET_TIMEOUT)
+        # Pushed webhook/BLE readings and motion/contact states
+        self.webhook = None
+        self.ble_scanner = None
+        self.live_values = {}  # {device_id: data_point}
+        self.event_devices = []
+        self.device_events = {}  # {device_id: (text, timestamp)}
+        self.pushed = False
+        self.last_reconcile = 0
+        self.poll_retry = None  # ticks_ms before which a failed poll is not repeated
         self.pseudo_mode = pseudo_mode
+        # Heap budgets per phase (replaces unconditional gc.collect calls)
+        self.memory = MemoryManager()
+        # Optional polling/persistence worker on the second core; it polls while
+        # this core sends commands, so API requests are serialized by a lock
+        self.worker = None
+        self.api_lock = None
+        if dual_core and not pseudo_mode:
+            import _thread
+            from dual_core import PollWorker
+            self.api_lock = _thread.allocate_lock()
+            self.worker = PollWorker(self, clock, FAILED_POLL_RETRY)
+        # Outbound alert notifications (persisted, batched and retried). Posts
+        # never run on this core: the worker sends them between polls in
+        # dual-core mode, otherwise a thread on the idle second core does.
+        # They hold api_lock, so they never share the TLS stack with an API
+        # request; a poll or command due meanwhile waits up to NOTIFY_TIMEOUT.
+        self.notifier = None
+        if SLACK_WEBHOOK_URL and not pseudo_mode:
+            from notify_queue import NotificationQueue
+            if self.api_lock is None:
+                import _thread
+                self.api_lock = _thread.allocate_lock()
+            self.notifier = NotificationQueue(SLACK_WEBHOOK_URL, timeout=NOTIFY_TIMEOUT,
+                                              use_thread=self.worker is None,
+                                              send_lock=self.api_lock, clock=clock)
+        # Threshold alerts: LED pattern, on-screen banner and webhook
+        self.alert_led = LedPattern(LED)
+        self.alerts = AlertEngine(
+            ALERT_RULES,
+            quiet_hours=ALERT_QUIET_HOURS,
+            on_fire=self.on_alert_fire,
+            on_clear=self.on_alert_clear,
+            utc_offset=UTC_OFFSET,
+            min_rate_interval=UPDATE_INTERVAL,
+        )
+        # Optional local metrics/history server so other systems don't poll the cloud
+        self.http_server = None
+        if HTTP_SERVER_PORT:
+            from http_server import HttpServer
+            import metrics
+            self.http_server = HttpServer(HTTP_SERVER_PORT)
+            metrics.register(self.http_server, self)
+            if WEBHOOK_SECRET and not pseudo_mode:
+                from webhook import WebhookReceiver
+                self.webhook = WebhookReceiver(WEBHOOK_SECRET, self.on_pushed_sample, self.on_pushed_event,
+                                               clock=clock)
+                self.webhook.register(self.http_server)
+        # Optional LAN fan-out; the socket is opened once WiFi is up
+        self.fanout_role = FANOUT_ROLE if not pseudo_mode else None
+        self.fanout = None
+        # Optional BLE scanner; readings take the same path as webhook samples
+        if BLE_SCAN and not pseudo_mode:
+            from ble_meter import BleMeterScanner
+            self.ble_scanner = BleMeterScanner(self.on_pushed_sample, clock=clock)
+            self.ble_scanner.start()
         # Initialize LED
         self.led = LED
         self.led.off()  # Ensure LED is off initially
         
+        # Start WiFi in the background; the first poll runs once it is up
+        self.wifi = None
+        self.wifi_status_text = None
+        if not pseudo_mode:
+            self.wifi = WifiSupervisor(SSID, PASSWORD)
+            self.wifi.poll()
+        
+        # Paint the last rendered dashboard while the radio associates;
+        # after a restart the checkpoint also restores devices and schedule
+        self.checkpoint = Checkpoint(CHECKPOINT_FILE, CHECKPOINT_INTERVAL)
+        self.checkpoint_saved = None  # State of the last checkpoint written
+        self.watchdog = None
+        self.load_screen_cache()
+        self.resume_state = self.checkpoint.load()
+        if self.resume_state is not None:
+            self.restore_checkpoint(self.resume_state)
+        self.draw_initial_screen()
+        
         # Load saved data if exists
         self.load_data()
-        
-        # Ensure WiFi connection if not in pseudo mode
-        if not pseudo_mode:
+
+    def wifi_ready(self):
+        """Return True if the API can be reached (always True in pseudo mode)"""
+        return self.wifi is None or self.wifi.connected
+
+    def link_status_text(self):
+        """WiFi link state, or 'no API' while the API circuit is open"""
+        if self.wifi.connected and self.api_breaker.state != CLOSED:
+            return 'no API'
+        return self.wifi.status_text()
+
+    def poll_wifi(self):
+        """Run the WiFi supervisor and redraw the link state when it changes"""
+        if self.wifi is None:
+            return
+        self.wifi.poll()
+        if self.link_status_text() != self.wifi_status_text:
+            self.draw_wifi_status()
+
+    def polling_allowed(self):
+        """Return False until the clock is synced, while the API circuit is open, or while a follower is fed by the leader"""
+        if self.wifi is not None and not clock.ready():
+            return False  # Requests signed with the unsynchronized RTC are rejected
+        retry = self.api_breaker.retry_ms()
+        if retry is not None and retry > 0:
+            return False  # Not until the breaker lets a probe through
+        if self.fanout_role != "follower":
+            return True
+        return self.fanout is not None and self.fanout.leader_silent()
+
+    def poll_clock(self):
+        """Sync the clock with NTP when due (a short UDP exchange)"""
+        if self.wifi is None or not self.wifi_ready():
+            return
+        clock.poll()
+
+    def on_clock_step(self, start, end, step):
+        """Move timestamps taken before the first NTP sync onto the synchronized clock"""
+        def shift(t):
+            return t + step if start <= t <= end else t
+        for device_data in self.meter_history.values():
+            if not isinstance(device_data, dict):
+                continue
+            for series in ('5min_data', 'hourly_data'):
+                for data_point in device_data.get(series, []):
+                    data_point['timestamp'] = shift(data_point['timestamp'])
+        for data_point in self.live_values.values():
+            data_point['timestamp'] = shift(data_point['timestamp'])
+        for device_id, (text, timestamp) in list(self.device_events.items()):
+            self.device_events[device_id] = (text, shift(timestamp))
+        self.last_update = shift(self.last_update)
+        self.last_hourly_update = shift(self.last_hourly_update)
+        self.last_reconcile = shift(self.last_reconcile)
+        for log in self.history_logs.values():
+            log.shift(start, end, step)
+        # The graph pyramid is rebuilt from the shifted samples
+        self.graph_pyramid = None
+        self.graph_key = None
+        self.pushed = True  # Redraw with the corrected times
+
+    def poll_fanout(self):
+        """Send the leader heartbeat, or apply snapshots received from the leader
+
+        Returns:
+            bool: True if a new snapshot was applied (the screen needs a redraw)
+        """
+        if self.fanout_role is None or not self.wifi_ready():
+            return False
+        if self.fanout is None:
             try:
-                connect_wifi(SSID, PASSWORD)
-            except Exception as e:
-                print(f"WiFi connection error: {e}")
-                raise
+                if self.fanout_role == "leader":
+                    from fanout import FanoutLeader
+                    self.fanout = FanoutLeader()
+                else:
+                    from fanout import FanoutFollower
+                    self.fanout = FanoutFollower(silence_s=FANOUT_SILENCE)
+            except OSError as e:
+                print(f"Error starting fan-out: {e}")
+                return False
+        if self.fanout_role == "leader":
+            self.fanout.poll()
+            return False
+        
+        meters, samples, timestamp = self.fanout.poll()
+        if meters:
+            self.meters = meters
+        # Heartbeats repeat the last snapshot; only newer ones are ingested
+        if samples is None or (timestamp <= self.last_update and not self.stale):
+            return False
+        self.apply_samples(samples, timestamp)
+        if self.worker is not None:
+            self.worker.persist_requested = True
+        else:
+            self.save_data()
+            self.save_screen_cache()
+        return True
+
+    def load_screen_cache(self):
+        """Load the devices and latest values of the last rendered dashboard"""
+        try:
+            with open(SCREEN_CACHE_FILE, 'r') as f:
+                cache = json.load(f)
+            self.last_update = cache.get('last_update', 0)
+            self.meters = expand_devices(cache.get('meters', []))
+            self.cached_values = {
+                device_id: tuple(values)
+                for device_id, values in cache.get('values', {}).items()
+            }
+        except (OSError, ValueError):
+            self.cached_values = {}
+
+    def save_screen_cache(self):
+        """Save the devices and latest values shown on the dashboard"""
+        values = {}
+        for meter in self.meters:
+            device_id = meter.get("deviceId")
+            latest = self.get_latest_values(device_id)
+            if latest:
+                values[device_id] = latest
+        cache = {
+            'last_update': self.last_update,
+            'meters': compact_devices(self.meters),
+            'values': values,
+        }
+        try:
+            with self.memory.phase("persist"):
+                write_json(SCREEN_CACHE_FILE, cache)
+        except Exception as e:
+            print(f"Error saving screen cache: {e}")
+
+    def view_state(self):
+        """Return the current screen as a JSON-friendly list"""
+        if getattr(self, 'showing_graph', False) and self.current_device_id:
+            return ['graph', self.current_device_id, self.current_device_name,
+                    self.current_view_mode, self.graph_span, self.graph_end]
+        if self.showing_controls:
+            return ['controls', self.showing_controls]
+        if self.showing_device_list:
+            return ['list']
+        return ['dashboard']
+
+    def checkpoint_state(self, crash=None):
+        """Return the runtime state needed to resume after a restart"""
+        values = {}
+        for meter in self.meters:
+            latest = self.get_latest_values(meter.get("deviceId"))
+            if latest:
+                values[meter.get("deviceId")] = list(latest)
+        return {
+            'view': self.view_state(),
+            'from_list': self.showing_device_list,
+            'list_offset': self.device_list.offset if self.device_list is not None else 0,
+            'schedule': [self.last_update, self.last_hourly_update, self.last_reconcile],
+            'meters': compact_devices(self.meters),
+            'controls': compact_devices(self.controls),
+            'events': compact_devices(self.event_devices),
+            'entries': [list(entry) for entry in self.device_entries],
+            'values': values,
+            'power': dict(self.commands.confirmed),
+            # Webhook replay protection survives restarts
+            'webhook_t': self.webhook.last_timestamp if self.webhook is not None else 0,
+            'crash': crash,
+        }
+
+    def restore_checkpoint(self, state):
+        """Restore devices, poll schedule and latest values from a checkpoint"""
+        print(f"Resuming from checkpoint (reset cause: {reset_cause()})")
+        if state.get('crash'):
+            print(f"Previous run stopped with: {state['crash']}")
+        self.meters = expand_devices(state.get('meters', [])) or self.meters
+        self.controls = expand_devices(state.get('controls', []))
+        self.event_devices = expand_devices(state.get('events', []))
+        self.device_entries = [tuple(entry) for entry in state.get('entries', [])]
+        last_update, last_hourly_update, last_reconcile = state.get('schedule', (0, 0, 0))
+        self.last_update = max(self.last_update, last_update)
+        self.last_hourly_update = last_hourly_update
+        self.last_reconcile = last_reconcile
+        for device_id, values in state.get('values', {}).items():
+            self.cached_values[device_id] = tuple(values)
+        self.commands.confirmed.update(state.get('power', {}))
+        if self.webhook is not None:
+            self.webhook.last_timestamp = max(self.webhook.last_timestamp, state.get('webhook_t', 0))
+        # Keep the poll schedule if the values are still current (the clock
+        # restarts from 2021 after a hard reset; then poll as soon as possible)
+        age = clock.time() - self.last_update
+        if 0 <= age < self.update_interval:
+            self.stale = False
+
+    def resume_view(self):
+        """Show the screen that was open when the checkpoint was written"""
+        state = self.resume_state
+        self.resume_state = None
+        if not state:
+            return
+        view = state.get('view') or ['dashboard']
+        if view[0] == 'graph' and view[1] in self.meter_history:
+            # The graph's Back button returns to the list if it was opened there
+            self.showing_device_list = bool(state.get('from_list'))
+            self.showing_graph = True
+            self.current_device_id = view[1]
+            self.current_device_name = view[2]
+            self.current_view_mode = view[3]
+            self.graph_span = view[4]
+            self.graph_end = view[5]
+            self.draw_graph(self.meter_history[view[1]], view[2], view[3], view[1])
+        elif view[0] == 'controls' and self.room_controls(view[1]):
+            self.draw_control_screen(view[1])
+        elif view[0] == 'list':
+            self.show_device_list()
+            self.device_list.scroll_to(state.get('list_offset', 0))
+            self.draw_device_list_header()
+
+    def save_checkpoint(self):
+        """Write a checkpoint when the view changed or, periodically, when anything changed"""
+        if self.gesture is not None or (self.device_list is not None and self.device_list.dragging()):
+            return  # Wait for the finger to lift
+        saved = self.checkpoint_saved
+        view_changed = saved is None or saved['view'] != self.view_state()
+        if not view_changed and not self.checkpoint.due():
+            return
+        state = self.checkpoint_state()
+        if state != saved:
+            with self.memory.phase("persist"):
+                self.checkpoint.save(state)
+        else:
+            self.checkpoint.last_save = time.ticks_ms()
+        self.checkpoint_saved = state
+
+    def crash(self, e):
+        """Record an unhandled error in the checkpoint and restart"""
+        print(f"Fatal error: {e}")
+        sys.print_exception(e)
+        try:
+            gc.collect()
+            self.checkpoint.save(self.checkpoint_state(crash=repr(e)))
+        except MemoryError:
+            pass  # The previous checkpoint is still intact
+        import machine
+        machine.reset()
+
+    def get_latest_values(self, device_id):
+        """Return (temp, humidity, co2) of the latest sample, or cached values"""
+        latest = self.live_values.get(device_id)
+        device_data = self.meter_history.get(device_id)
+        if isinstance(device_data, dict):
+            five_min_data = device_data.get('5min_data', [])
+            if five_min_data and (latest is None or five_min_data[-1]['timestamp'] >= latest['timestamp']):
+                latest = five_min_data[-1]
+        if latest is not None:
+            return (latest.get('temperature'), latest.get('humidity'), latest.get('co2'))
+        return self.cached_values.get(device_id)
+
+    def on_pushed_sample(self, device_id, data_point):
+        """Show a pushed (webhook/BLE) reading at once; history gets it at the next tick"""
+        if not any(meter.get("deviceId") == device_id for meter in self.meters):
+            return  # Unknown until the next reconciliation poll
+        self.live_values[device_id] = data_point
+        self.alerts.ingest(self.get_device_name(device_id), data_point)
+        self.pushed = True
+
+    def on_pushed_event(self, device_id, text, timestamp):
+        """Record the state of a motion/contact sensor (text None: idle)"""
+        if text is None:
+            self.device_events.pop(device_id, None)
+        else:
+            self.device_events[device_id] = (text, timestamp)
+        self.pushed = True
+
+    def push_active(self, current_time):
+        """Return True if every meter has a recent pushed reading and polling can slow down"""
+        if self.stale or not self.live_values or current_time - self.last_reconcile >= RECONCILE_INTERVAL:
+            return False
+        for meter in self.meters:
+            data_point = self.live_values.get(meter.get("deviceId"))
+            if data_point is None or current_time - data_point['timestamp'] >= RECONCILE_INTERVAL:
+                return False
+        return True
+
+    def live_samples(self, current_time):
+        """Return the latest pushed value of each meter as samples for this tick"""
+        samples = []
+        for meter in self.meters:
+            device_id = meter.get("deviceId")
+            data_point = self.live_values.get(device_id)
+            if data_point is not None:
+                sample = dict(data_point)
+                sample['timestamp'] = current_time
+                samples.append((device_id, sample))
+        return samples
 
     def load_data(self):
         """Load saved meter data from file"""
@@ -209,16 +744,17 @@ class SwitchBotDisplay:
 
     def save_data(self):
         """Save meter data to file"""
+        t0 = perf_trace.begin()
         try:
-            data = {'devices': self.meter_history}
-            with open(DATA_FILE, 'w') as f:
-                json.dump(data, f)
+            with self.memory.phase("persist"):
+                write_json(DATA_FILE, {'devices': self.meter_history})
         except Exception as e:
             print(f"Error saving data: {e}")
+        perf_trace.end("save_data", t0)
 
     def cleanup_old_data(self, device_id):
         """Remove data older than the retention period"""
-        current_time = time.time()
+        current_time = clock.time()
         
         if device_id not in self.meter_history:
             self.meter_history[device_id] = {'5min_data': [], 'hourly_data': []}
@@ -240,6 +776,16 @@ class SwitchBotDisplay:
             if current_time - d['timestamp'] <= HOURLY_INTERVAL * 24
         ][-MAX_HOURLY_SAMPLES:]
         device_data['hourly_data'] = hourly_data
+        
+        # The open graph's pyramid drops what neither the history log
+        # (trimmed to HISTORY_LOG_DAYS) nor the in-memory data still hold
+        if self.graph_pyramid is not None and device_id == self.graph_key:
+            oldest = [int(d[0]['timestamp']) for d in (hourly_data, five_min_data) if d]
+            first = self.get_history_log(device_id).first()
+            if first is not None:
+                oldest.append(first)
+            if oldest:
+                self.graph_pyramid.evict(min(oldest))
 
     def generate_pseudo_data(self):
         """Generate pseudo data for testing"""
@@ -250,8 +796,9 @@ class SwitchBotDisplay:
                 {"deviceId": "meter2", "deviceName": "CO2センサー", "deviceType": "MeterPro(CO2)"},
                 {"deviceId": "meter3", "deviceName": "ベランダの防水温湿度計", "deviceType": "Meter"}
             ]
+            self.device_entries = [self.device_entry(d) for d in self.meters]
 
-        current_time = time.time()
+        current_time = clock.time()
         
         # Generate or update data for each meter
         for meter in self.meters:
@@ -310,59 +857,115 @@ class SwitchBotDisplay:
 
         return True
 
-    def get_devices(self):
+    def api_request(self, path, name, timeout, data=None):
+        """GET (or POST ``data``) through the circuit breaker, always closing the response
+
+        Connection errors, timeouts, HTTP 5xx and 429 (quota) count as failures
+        of the API. So do other 4xx replies (e.g. 401 from a bad token) and
+        statusCode 190, which would be rejected again if repeated; those are
+        still returned. Device errors (offline, unsupported command) are not.
+
+        Returns:
+            dict: Parsed response, or None if the request failed or was skipped
+        """
+        if self.api_lock is None:
+            return self.send_request(path, name, timeout, data)
+        with self.api_lock:
+            return self.send_request(path, name, timeout, data)
+
+    def send_request(self, path, name, timeout, data=None):
+        if timeout <= 0 or not self.api_breaker.allow():
+            return None
+        status = None
+        try:
+            # Collects first only if the network budget is at risk
+            with self.memory.phase("network"):
+                headers = get_auth_headers()
+                t0 = perf_trace.begin()
+                if data is None:
+                    response = requests.get(f"{API_BASE_URL}{path}", headers=headers, timeout=timeout)
+                else:
+                    headers["Content-Type"] = "application/json; charset=utf8"
+                    response = requests.post(
+                        f"{API_BASE_URL}{path}",
+                        headers=headers,
+                        data=json.dumps(data),
+                        timeout=timeout
+                    )
+                try:
+                    status = response.status_code
+                    result = response.json() if status < 500 and status != 429 else None
+                finally:
+                    # Clean up response object to free memory
+                    response.close()
+                self.memory.sample("network")
+                perf_trace.end(name, t0)
+        except Exception as e:
+            print(f"Error requesting {path}: {e}")
+            self.api_breaker.failure(e)
+            return None
+        if result is None:
+            print(f"Error requesting {path}: HTTP {status}")
+            self.api_breaker.failure(f"HTTP {status}")
+            return None
+        code = result.get("statusCode") if isinstance(result, dict) else None
+        if status >= 400 or code == 190:
+            print(f"Error requesting {path}: HTTP {status}, statusCode {code}")
+            self.api_breaker.failure(f"HTTP {status}, statusCode {code}")
+            return result
+        self.api_breaker.success()
+        return result
+
+    def get_devices(self, deadline=None):
         if self.pseudo_mode:
             return self.generate_pseudo_data()
-            
+        devices = self.fetch_devices(deadline)
+        if devices is None:
+            return False
+        self.set_devices(devices)
+        return True
+
+    def fetch_devices(self, deadline=None):
+        """Request the device list without touching the lists being rendered
+
+        Returns:
+            tuple: (meters, controls, event_devices, device_entries) for
+            set_devices, or None if the request failed
+        """
         try:
-            # Force garbage collection before API call
-            import gc
-            gc.collect()
-            
-            headers = get_auth_headers()
-            response = requests.get(
-                f"{API_BASE_URL}/devices",
-                headers=headers
-            )
-            data = response.json()
-            # Clean up response object to free memory
-            response.close()
+            timeout = deadline.timeout(API_TIMEOUT) if deadline is not None else API_TIMEOUT
+            data = self.api_request("/devices", "http GET devices", timeout)
+            if data is None:
+                return None
             
             if data.get("statusCode") == 100:
-                self.devices = data["body"]["deviceList"]
-                
-                # Filter devices that contain "Meter" or "WoIOSensor" in their type
-                self.meters = [d for d in self.devices if 
-                             any(t in str(d.get("deviceType", "")) 
-                                 for t in ["Meter", "WoIOSensor"])]
-                # Clear devices list to free memory
-                self.devices = []
-                
-                # Force garbage collection
-                gc.collect()
-                return True
-            return False
+                devices = data["body"]["deviceList"]
+                return (
+                    # Devices that contain "Meter" or "WoIOSensor" in their type
+                    [d for d in devices if
+                     any(t in str(d.get("deviceType", ""))
+                         for t in ["Meter", "WoIOSensor"])],
+                    [d for d in devices if d.get("deviceType") in CONTROL_DEVICE_TYPES],
+                    # Motion/contact sensors only report through webhook events
+                    [d for d in devices if d.get("deviceType") in EVENT_DEVICE_TYPES],
+                    # Only (id, name, type) is kept for the device list
+                    [self.device_entry(d) for d in devices],
+                )
+            return None
         except Exception as e:
             print(f"Error getting devices: {e}")
-            return False
-        finally:
-            # Force garbage collection
-            gc.collect()
+            return None
+
+    def set_devices(self, devices):
+        """Replace the device lists with a fetch_devices result (UI core only)"""
+        self.meters, self.controls, self.event_devices, self.device_entries = devices
 
-    def get_meter_status(self, device_id):
+    def get_meter_status(self, device_id, deadline=None):
         try:
-            # Force garbage collection before API call
-            import gc
-            gc.collect()
-            
-            headers = get_auth_headers()
-            response = requests.get(
-                f"{API_BASE_URL}/devices/{device_id}/status",
-                headers=headers
-            )
-            data = response.json()
-            # Clean up response object to free memory
-            response.close()
+            timeout = deadline.timeout(API_TIMEOUT) if deadline is not None else API_TIMEOUT
+            data = self.api_request(f"/devices/{device_id}/status", "http GET status", timeout)
+            if data is None:
+                return None
             
             if data.get("statusCode") == 100:
                 return data["body"]
@@ -370,27 +973,49 @@ class SwitchBotDisplay:
         except Exception as e:
             print(f"Error getting meter status: {e}")
             return None
-        finally:
-            # Force garbage collection
-            gc.collect()
 
-    def control_device(self, device_id, command):
-        try:
-            url = f"{API_BASE_URL}/devices/{device_id}/commands"
-            data = {
-                "command": command,
-                "parameter": "default",
-                "commandType": "command"
-            }
-            response = requests.post(
-                url, 
-                headers=get_auth_headers(), 
-                data=json.dumps(data)
-            )
-            return response.json()["statusCode"] == 100
-        except Exception as e:
-            print(f"Error controlling device: {e}")
-            return False
+    def post_api(self, path, data, name):
+        """POST to the API with a timeout, always closing the response
+
+        Returns:
+            bool: True if accepted, False if rejected, None on network errors
+            or while the API circuit is open
+        """
+        if self.pseudo_mode:
+            return True
+        result = self.api_request(path, name, COMMAND_TIMEOUT, data)
+        if result is None:
+            return None  # Retried by the command queue (max_retries times, retry_ms apart)
+        return result.get("statusCode") == 100
+
+    def control_device(self, device_id, command, parameter="default"):
+        data = {
+            "command": command,
+            "parameter": parameter,
+            "commandType": "command"
+        }
+        return self.post_api(f"/devices/{device_id}/commands", data, "http POST commands")
+
+    def execute_scene(self, scene_id):
+        """Run a scene: several device actions in one request"""
+        return self.post_api(f"/scenes/{scene_id}/execute", {}, "http POST scene")
+
+    def device_entry(self, device):
+        """Return (device_id, name, device_type) of a device for the device list
+
+        Names the LCD font cannot show (non-ASCII) fall back to the type and
+        the end of the device ID.
+        """
+        device_id = device.get("deviceId", "")
+        device_name = device.get("deviceName", "")
+        device_type = device.get("deviceType", "Unknown")
+        name = DEVICE_NAMES.get(device_name)
+        if name is None:
+            if device_name and all(ord(c) < 128 for c in device_name):
+                name = device_name
+            else:
+                name = f"{device_type} {device_id[-4:]}"
+        return (device_id, name, device_type)
 
     def get_device_display_name(self, device):
         # Get device name and type
@@ -400,74 +1025,234 @@ class SwitchBotDisplay:
         # Return translated name if available, otherwise return device type
         return DEVICE_NAMES.get(device_name, device_type)
 
+    def fetch_samples(self, current_time):
+        """Poll the device list and every meter (network only, no state changes)
+
+        The whole cycle has API_POLL_DEADLINE seconds; meters not reached in
+        time, or skipped by the open circuit, keep their previous values.
+        Safe to call from the worker core: the caller applies the device
+        lists with set_devices on the UI core.
+
+        Returns:
+            tuple: (devices, samples): the fetch_devices result and
+            [(device_id, data_point), ...], or None if the device list or
+            every meter failed
+        """
+        deadline = Deadline(API_POLL_DEADLINE)
+        devices = self.fetch_devices(deadline)
+        if devices is None:
+            return None
+        meters = devices[0]
+        samples = []
+        for meter in meters:
+            if deadline.expired() or self.api_breaker.is_open():
+                print("Poll cut short; remaining meters keep their values")
+                break
+            device_id = meter.get("deviceId")
+            status = self.get_meter_status(device_id, deadline)
+            
+            if status:
+                co2 = status.get("CO2") if meter.get("deviceType") == "MeterPro(CO2)" else None
+                
+                # Create new data point
+                data_point = {
+                    'timestamp': current_time,
+                    'temperature': status.get("temperature"),
+                    'humidity': status.get("humidity"),
+                    'co2': co2
+                }
+                samples.append((device_id, data_point))
+        if meters and not samples:
+            return None
+        return devices, samples
+
+    def ingest_sample(self, device_id, data_point, hourly_due, evaluated=False):
+        """Append one sample to the history of a device
+
+        Args:
+            evaluated (bool): The alert rules already saw this reading
+                (a pushed value re-stamped for this tick)
+        """
+        current_time = data_point['timestamp']
+        co2 = data_point.get('co2')
+        
+        # Initialize device data if not exists
+        if device_id not in self.meter_history:
+            self.meter_history[device_id] = {'5min_data': [], 'hourly_data': []}
+        
+        # Add 5-minute data
+        self.meter_history[device_id]['5min_data'].append(data_point)
+        self.get_history_log(device_id).append(data_point)
+        
+        # Check if it's time for hourly update
+        if hourly_due:
+            # Calculate hourly average from 5-minute data (at most MAX_5MIN_SAMPLES)
+            five_min_data = self.meter_history[device_id]['5min_data']
+            temp = self.average(five_min_data, 'temperature')
+            humidity = self.average(five_min_data, 'humidity')
+            if temp is not None and humidity is not None:
+                hourly_avg = {
+                    'timestamp': current_time,
+                    'temperature': temp,
+                    'humidity': humidity,
+                    'co2': self.average(five_min_data, 'co2') if co2 is not None else None
+                }
+                self.meter_history[device_id]['hourly_data'].append(hourly_avg)
+        
+        # Cleanup old data
+        self.cleanup_old_data(device_id)
+        
+        # Evaluate alert rules incrementally on the new sample; a re-stamped
+        # pushed reading would look like a rate of 0/h and clear rate alerts
+        if not evaluated:
+            self.alerts.ingest(self.get_device_name(device_id), data_point)
+
+    @staticmethod
+    def average(data_points, field):
+        """Return the mean of a field, ignoring missing values, or None"""
+        values = [d[field] for d in data_points if d.get(field) is not None]
+        return sum(values) / len(values) if values else None
+
+    def get_history_log(self, device_id):
+        log = self.history_logs.get(device_id)
+        if log is None:
+            max_records = HISTORY_LOG_DAYS * 24 * HOURLY_INTERVAL // UPDATE_INTERVAL
+            log = HistoryLog(HISTORY_LOG_FILE.format(device_id), max_records)
+            self.history_logs[device_id] = log
+        return log
+
+    def get_device_name(self, device_id):
+        """Return the display name (DEVICE_NAMES) of a meter"""
+        for meter in self.meters:
+            if meter.get("deviceId") == device_id:
+                return DEVICE_NAMES.get(meter.get("deviceName", ""), meter.get("deviceType", ""))
+        return None
+
+    def format_alert(self, rule, value):
+        unit = ALERT_UNITS.get(rule['field'], "")
+        return f"{rule['name']}: {value:.1f}{unit}" if unit == "C" else f"{rule['name']}: {value:.0f}{unit}"
+
+    def on_alert_fire(self, rule, value, quiet):
+        text = self.format_alert(rule, value)
+        print(f"Alert: {text}")
+        if not quiet:
+            self.alert_led.start(on_ms=100, off_ms=400)
+            self.idle.wake()  # Show the banner
+            if self.notifier is not None:
+                self.notifier.notify(f"Alert: {text}")
+
+    def on_alert_clear(self, rule, value, quiet):
+        text = self.format_alert(rule, value)
+        print(f"Alert cleared: {text}")
+        if not self.alerts.active():
+            self.alert_led.stop()
+        if not quiet and self.notifier is not None:
+            self.notifier.notify(f"Cleared: {text}")
+
+    def release_quiet_alerts(self, current_time):
+        """Report the alerts that started or ended during quiet hours once they are over"""
+        held = self.alerts.release_held(current_time)
+        if not held:
+            return
+        if self.alerts.active():
+            self.alert_led.start(on_ms=100, off_ms=400)
+        if self.notifier is not None:
+            for fired, rule, value in held:
+                prefix = "Alert" if fired else "Cleared"
+                self.notifier.notify(f"{prefix} (quiet hours): {self.format_alert(rule, value)}")
+
+    def draw_alert_banner(self):
+        """Draw the active alerts between the room grid and the bottom bar"""
+        x, y, w, h = ALERT_BANNER_RECT
+        active = self.alerts.active()
+        if not active:
+            self.lcd.fill_rectangle(x, y, w, h, BACKGROUND_COLOR)
+            return
+        text = " / ".join(self.format_alert(rule, value) for rule, value in active)
+        draw_button(self.lcd, ALERT_BANNER_RECT, ALERT_COLOR, text[:w // 8], WHITE_COLOR)
+
+    def apply_samples(self, samples, current_time, pushed=False):
+        """Ingest the samples of one poll cycle
+
+        Args:
+            pushed (bool): Samples come from live_samples; their readings were
+                evaluated by the alert rules when they arrived
+        """
+        hourly_due = current_time - self.last_hourly_update >= HOURLY_INTERVAL
+        for device_id, data_point in samples:
+            self.ingest_sample(device_id, data_point, hourly_due, pushed)
+        
+        # Update hourly timestamp if needed
+        if hourly_due:
+            self.last_hourly_update = current_time
+        self.release_quiet_alerts(current_time)
+        
+        self.last_update = current_time
+        self.need_refresh = True
+        self.stale = False
+        
+        # Share the new readings with follower panels on the LAN
+        if self.fanout_role == "leader" and self.fanout is not None:
+            self.fanout.publish(self, current_time)
+
     def update_meter_history(self):
-        current_time = time.time()
-        if current_time - self.last_update < self.update_interval:
+        current_time = clock.time()
+        # Cached values are refreshed as soon as the network is up
+        if not self.stale and current_time - self.last_update < self.update_interval:
+            return False
+        if not self.wifi_ready() or not self.polling_allowed():
+            return False
+        if self.poll_retry is not None and time.ticks_diff(self.poll_retry, time.ticks_ms()) > 0:
             return False
         
         if self.pseudo_mode:
             success = self.generate_pseudo_data()
-        else:
-            success = self.get_devices()
             if success:
-                for meter in self.meters:
-                    device_id = meter.get("deviceId")
-                    status = self.get_meter_status(device_id)
-                    
-                    if status:
-                        temp = status.get("temperature")
-                        humidity = status.get("humidity")
-                        co2 = status.get("CO2") if meter.get("deviceType") == "MeterPro(CO2)" else None
-                        
-                        # Create new data point
-                        data_point = {
-                            'timestamp': current_time,
-                            'temperature': temp,
-                            'humidity': humidity,
-                            'co2': co2
-                        }
-                        
-                        # Initialize device data if not exists
-                        if device_id not in self.meter_history:
-                            self.meter_history[device_id] = {'5min_data': [], 'hourly_data': []}
-                        
-                        # Add 5-minute data
-                        self.meter_history[device_id]['5min_data'].append(data_point)
-                        
-                        # Check if it's time for hourly update
-                        if current_time - self.last_hourly_update >= HOURLY_INTERVAL:
-                            # Calculate hourly average from 5-minute data
-                            five_min_data = self.meter_history[device_id]['5min_data']
-                            if five_min_data:
-                                hourly_avg = {
-                                    'timestamp': current_time,
-                                    'temperature': sum(d['temperature'] for d in five_min_data) / len(five_min_data),
-                                    'humidity': sum(d['humidity'] for d in five_min_data) / len(five_min_data),
-                                    'co2': sum(d['co2'] for d in five_min_data) / len(five_min_data) if co2 is not None else None
-                                }
-                                self.meter_history[device_id]['hourly_data'].append(hourly_avg)
-                        
-                        # Cleanup old data
-                        self.cleanup_old_data(device_id)
-                    
-                    # Force garbage collection after each meter
-                    import gc
-                    gc.collect()
-                
-                # Update hourly timestamp if needed
-                if current_time - self.last_hourly_update >= HOURLY_INTERVAL:
-                    self.last_hourly_update = current_time
-                
-                # Save data to file
-                self.save_data()
+                self.last_update = current_time
+                self.need_refresh = True
+                self.stale = False
+            return success
         
-        if success:
-            self.last_update = current_time
-            self.need_refresh = True
-        return success
+        # While webhook/BLE readings keep the values fresh, ticks record the
+        # pushed values and the API is only polled every RECONCILE_INTERVAL
+        pushed = self.push_active(current_time)
+        if pushed:
+            samples = self.live_samples(current_time)
+        else:
+            result = self.fetch_samples(current_time)
+            if result is None:
+                # Bad credentials or rejected requests must not be retried every pass
+                self.poll_retry = time.ticks_add(time.ticks_ms(), FAILED_POLL_RETRY * 1000)
+                return self.poll_failed()
+            devices, samples = result
+            self.set_devices(devices)
+            self.last_reconcile = current_time
+        self.poll_retry = None
+        self.apply_samples(samples, current_time, pushed)
+        
+        # Save data to file
+        self.save_data()
+        self.save_screen_cache()
+        return True
+
+    def poll_failed(self):
+        """Mark the values on screen stale once a failed poll has opened the API circuit
+
+        During an outage only the breaker's probes are sent, so the values
+        would not be refreshed for a while.
+
+        Returns:
+            bool: True if the screen needs a redraw
+        """
+        if self.api_breaker.is_open() and not self.stale:
+            self.stale = True
+            return True
+        return False
 
     def draw_initial_screen(self):
         """Draw the complete screen including static elements"""
+        # Record the whole dashboard and send it as double-buffered strips
+        self.lcd.begin_frame()
         if not self.initialized:
             # Only clear the display on first draw
             self.lcd.clear_display(BACKGROUND_COLOR)
@@ -475,6 +1260,7 @@ class SwitchBotDisplay:
             
         # Draw refresh button at the bottom
         draw_button(self.lcd, REFRESH_BUTTON, BUTTON_COLOR, "Refresh", TEXT_COLOR)
+        draw_button(self.lcd, DEVICE_LIST_BUTTON, BUTTON_COLOR, "Devices", TEXT_COLOR)
                 
         # Draw room buttons
         for room_name, (x, y) in ROOM_BUTTONS.items():
@@ -485,6 +1271,10 @@ class SwitchBotDisplay:
             name_y = y + 10
             text_x = x + (BUTTON_WIDTH - len(room_name) * 8) // 2
             self.lcd.draw_text(text_x, name_y, room_name, TEXT_COLOR, BUTTON_COLOR)
+            icon = ROOM_ICONS.get(room_name)
+            if icon:
+                # Drawn from flash after the frame, on top of the button
+                self.lcd.blit_asset(icon, x + ROOM_ICON_OFFSET, y + ROOM_ICON_OFFSET)
             
             # Find meters in this room
             room_devices = DEVICE_PLACES.get(room_name, [])
@@ -494,48 +1284,213 @@ class SwitchBotDisplay:
             for device_name in room_devices:
                 for meter in self.meters:
                     if DEVICE_NAMES.get(meter.get("deviceName", "")) == device_name:
-                        device_id = meter.get("deviceId")
-                        if device_id in self.meter_history:
-                            device_data = self.meter_history[device_id]
-                            five_min_data = device_data.get('5min_data', [])
-                            if five_min_data:
-                                latest = five_min_data[-1]
-                                temp = latest['temperature']
-                                humidity = latest['humidity']
-                                co2 = latest.get('co2')
-                                meter_values.append((temp, humidity, co2))
+                        latest = self.get_latest_values(meter.get("deviceId"))
+                        if latest:
+                            meter_values.append(latest)
+            
+            # Cached values are greyed out until the first refresh
+            temp_color = STALE_COLOR if self.stale else TEMPERATURE_COLOR
+            humid_color = STALE_COLOR if self.stale else HUMIDITY_COLOR
+            co2_color = STALE_COLOR if self.stale else CO2_COLOR
             
             # Display meter values if available
             if meter_values:
                 y_offset = 35  # Start values lower in the button
                 for temp, humidity, co2 in meter_values:
                     # Temperature
-                    temp_text = f"{temp:.1f}C"
-                    temp_x = x + (BUTTON_WIDTH - len(temp_text) * 8) // 2
-                    self.lcd.draw_text(temp_x, y + y_offset, temp_text,
-                                     TEMPERATURE_COLOR, BUTTON_COLOR)
+                    temp_text = format_value(temp, "{:.1f}", "C")
+                    self.lcd.draw_centered_text(x, y + y_offset, BUTTON_WIDTH, self.value_font.height,
+                                                temp_text, temp_color, BUTTON_COLOR, self.value_font)
                     
                     # Humidity
-                    humid_text = f"{humidity:.0f}%"
+                    humid_text = format_value(humidity, "{:.0f}", "%")
                     humid_x = x + (BUTTON_WIDTH - len(humid_text) * 8) // 2
                     self.lcd.draw_text(humid_x, y + y_offset + 20, humid_text,
-                                     HUMIDITY_COLOR, BUTTON_COLOR)
+                                     humid_color, BUTTON_COLOR)
                     
                     # CO2 if available
                     if co2 is not None:
                         co2_text = f"{co2:.0f}ppm"
                         co2_x = x + (BUTTON_WIDTH - len(co2_text) * 8) // 2
                         self.lcd.draw_text(co2_x, y + y_offset + 40, co2_text,
-                                         CO2_COLOR, BUTTON_COLOR)
+                                         co2_color, BUTTON_COLOR)
                     y_offset += 70  # Increase offset for next meter if any
+            
+            # Motion/contact state from webhook events at the bottom of the button
+            event_text = self.get_room_event(room_devices)
+            if event_text:
+                event_x = x + (BUTTON_WIDTH - len(event_text) * 8) // 2
+                self.lcd.draw_text(event_x, y + BUTTON_HEIGHT - 16, event_text,
+                                 ALERT_COLOR, BUTTON_COLOR)
 
         
         # Draw last update time
         self.draw_last_update_time()
+        self.draw_wifi_status()
+        self.draw_alert_banner()
+        self.lcd.end_frame()
+
+    def get_room_event(self, room_devices):
+        """Return the latest motion/contact text of a room, or None"""
+        latest = None
+        for device in self.event_devices:
+            name = DEVICE_NAMES.get(device.get("deviceName", ""))
+            event = self.device_events.get(device.get("deviceId"))
+            if name in room_devices and event and (latest is None or event[1] > latest[1]):
+                latest = event
+        if latest is None:
+            return None
+        t = clock.localtime(int(latest[1]))
+        return "{} {:02d}:{:02d}".format(latest[0], t[3], t[4])
+
+    def room_controls(self, room_name):
+        """Return the controllable devices of a room"""
+        room_devices = DEVICE_PLACES.get(room_name, [])
+        return [d for d in self.controls
+                if DEVICE_NAMES.get(d.get("deviceName", "")) in room_devices][:CONTROL_ROWS]
+
+    def control_button(self, index):
+        return (SCREEN_WIDTH - 130, CONTROL_ROW_Y + index * CONTROL_ROW_HEIGHT, 120, CONTROL_ROW_HEIGHT - 10)
+
+    def scene_button(self, index):
+        return (10 + index * 155, CONTROL_ROW_Y + CONTROL_ROWS * CONTROL_ROW_HEIGHT + 10, 145, 30)
+
+    def draw_control_screen(self, room_name):
+        """Draw the ON/OFF buttons of a room's devices and the scene buttons"""
+        self.showing_controls = room_name
+        self.lcd.begin_frame()
+        self.lcd.clear_display(BACKGROUND_COLOR)
+        draw_button(self.lcd, (10, 10, SCREEN_WIDTH - 20, 30), BUTTON_COLOR, room_name, TEXT_COLOR)
+        for index, device in enumerate(self.room_controls(room_name)):
+            _, y, _, h = self.control_button(index)
+            name = DEVICE_NAMES.get(device.get("deviceName", ""), device.get("deviceType", ""))
+            self.lcd.draw_text(20, y + (h - 8) // 2, name, TEXT_COLOR, BACKGROUND_COLOR)
+            self.draw_control_row(index, device)
+        for index, (label, _, _) in enumerate(SCENE_BUTTONS[:3]):
+            draw_button(self.lcd, self.scene_button(index), BUTTON_COLOR, label, TEXT_COLOR)
+        draw_button(self.lcd, (10, SCREEN_HEIGHT - 30, 60, 20), BUTTON_COLOR, "Back", TEXT_COLOR)
+        self.draw_last_update_time()
+        self.draw_wifi_status()
+        self.lcd.end_frame()
+
+    def draw_control_row(self, index, device):
+        """Draw one ON/OFF button; highlighted while its command is pending"""
+        device_id = device.get("deviceId")
+        state = self.commands.state(device_id)
+        label = "ON" if state == "on" else "OFF" if state == "off" else "--"
+        color = BUTTON_ACTIVE_COLOR if self.commands.busy(device_id) else BUTTON_COLOR
+        draw_button(self.lcd, self.control_button(index), color, label, TEXT_COLOR)
+
+    def redraw_control_rows(self):
+        for index, device in enumerate(self.room_controls(self.showing_controls)):
+            self.draw_control_row(index, device)
+
+    def show_device_list(self):
+        """Draw the device list screen; only the visible rows are rendered"""
+        self.showing_device_list = True
+        self.lcd.clear_display(BACKGROUND_COLOR)
+        if self.device_list is None:
+            self.device_list = DeviceList(self.lcd, DEVICE_LIST_RECT, DEVICE_ROW_HEIGHT,
+                                          self.render_device_row, BACKGROUND_COLOR)
+        self.device_list.set_count(len(self.device_entries))
+        self.draw_device_list_header()
+        draw_button(self.lcd, (10, SCREEN_HEIGHT - 30, 60, 20), BUTTON_COLOR, "Back", TEXT_COLOR)
+        self.draw_last_update_time()
+        self.draw_wifi_status()
+        self.device_list.draw()
+
+    def close_device_list(self):
+        self.showing_device_list = False
+        if self.device_list is not None:
+            self.device_list.close()
+
+    def draw_device_list_header(self):
+        """Draw the title bar with the range of rows on screen"""
+        device_list = self.device_list
+        count = len(self.device_entries)
+        first, last = device_list.visible(device_list.offset, device_list.offset + device_list.height)
+        text = f"Devices {first + 1}-{last} of {count}" if count else "No devices"
+        draw_button(self.lcd, (10, 10, SCREEN_WIDTH - 20, 30), BUTTON_COLOR, text, TEXT_COLOR)
+
+    def render_device_row(self, index, width, height):
+        """Return the display-list ops of one device list row, relative to the row"""
+        device_id, name, device_type = self.device_entries[index]
+        text_y = (height - 8) // 2
+        ops = [
+            ('r', 0, height - 1, width, 1, BUTTON_COLOR),  # Separator
+            ('t', 8, text_y, name[:28], TEXT_COLOR, BACKGROUND_COLOR),
+        ]
+        status, color = self.device_status(device_id, device_type)
+        if status:
+            ops.append(('t', width - 8 - len(status) * 8, text_y, status, color, BACKGROUND_COLOR))
+        return ops
+
+    def device_status(self, device_id, device_type):
+        """Return (text, color) summarizing a device for the device list"""
+        latest = self.get_latest_values(device_id)
+        if latest is not None:
+            temp, humidity, co2 = latest
+            text = f"{format_value(temp, '{:.1f}', 'C')} {format_value(humidity, '{:.0f}', '%')}"
+            if co2 is not None:
+                text += f" {co2:.0f}ppm"
+            return text, STALE_COLOR if self.stale else TEMPERATURE_COLOR
+        if device_type in CONTROL_DEVICE_TYPES:
+            state = self.commands.state(device_id)
+            label = "ON" if state == "on" else "OFF" if state == "off" else "--"
+            return label + (" ..." if self.commands.busy(device_id) else ""), TEXT_COLOR
+        event = self.device_events.get(device_id)
+        if event is not None and event[0]:
+            return event[0], ALERT_COLOR
+        return device_type, STALE_COLOR
+
+    def handle_device_list_touch(self):
+        """Scroll the device list by dragging; a tap on a row opens or toggles the device
+
+        Returns:
+            bool: True if the touch is on the list (other taps go to handle_touch)
+        """
+        device_list = self.device_list
+        points = self.lcd.get_touch_points()
+        on_list = device_list.dragging() or (points and device_list.contains(*points[0]))
+        offset = device_list.offset
+        index = device_list.handle_touch(points)
+        if device_list.offset != offset:
+            self.draw_device_list_header()
+        if index is not None:
+            device_id, name, device_type = self.device_entries[index]
+            if device_id in self.meter_history:
+                # The graph's Back button returns to the list
+                self.device_list.close()
+                self.open_graph(device_id, name)
+            elif device_type in CONTROL_DEVICE_TYPES:
+                self.commands.toggle(device_id)
+                device_list.redraw(index)
+        return bool(on_list)
+
+    def open_graph(self, device_id, device_name):
+        self.showing_graph = True
+        self.current_device_id = device_id
+        self.current_device_name = device_name
+        self.set_graph_preset('5min')  # Reset to the last hour
+        self.draw_graph(self.meter_history[device_id], device_name, self.current_view_mode, device_id)
+
+    def on_command_result(self, target, ok):
+        if not ok:
+            print(f"Command failed: {target[0]} {target[1]}")
+        self.commands_changed = True
+
+    def draw_wifi_status(self):
+        """Draw the link state (RSSI, 'offline' or 'no API') next to the refresh button"""
+        # The graph view uses this spot for its view mode button
+        if self.wifi is None or getattr(self, 'showing_graph', False):
+            return
+        self.wifi_status_text = self.link_status_text()
+        x, y = WIFI_STATUS_POS
+        self.lcd.draw_text(x, y, f"{self.wifi_status_text:7s}", TEXT_COLOR, BACKGROUND_COLOR)
 
     def draw_last_update_time(self):
         """Draw the last update time in the bottom right corner"""
-        update_time = time.localtime(self.last_update)
+        update_time = clock.localtime(self.last_update)
         # Format: YYYY/MM/DD HH:MM:SS
         time_str = "{:04d}/{:02d}/{:02d} {:02d}:{:02d}:{:02d}".format(
             update_time[0],  # Year
@@ -545,51 +1500,89 @@ class SwitchBotDisplay:
             update_time[4],  # Minute
             update_time[5]   # Second
         )
+        # Mark cached (not yet refreshed) data with an asterisk
+        time_str += "*" if self.stale else " "
         # Draw with a small background rectangle to ensure clean display
         self.lcd.draw_text(SCREEN_WIDTH - 160, SCREEN_HEIGHT - 20, time_str, TEXT_COLOR, BACKGROUND_COLOR)
 
+    def draw_perf_overlay(self):
+        """Draw the render time/latency overlay if it is enabled"""
+        x, y, _, _ = PERF_OVERLAY_RECT
+        perf_trace.draw_overlay(self.lcd, x, y, WHITE_COLOR, TEXT_COLOR)
+
+    def toggle_perf_overlay(self):
+        """Show or hide the render time/latency overlay"""
+        if perf_trace.toggle_overlay():
+            self.draw_perf_overlay()
+        else:
+            x, y, w, h = PERF_OVERLAY_RECT
+            self.lcd.fill_rectangle(x, y, w, h, BACKGROUND_COLOR)
+
     def update_meter_display(self):
         """Update only the meter values without redrawing buttons"""
         # Redraw the entire screen as we need to update all room buttons
         self.draw_initial_screen()
 
-    def draw_graph(self, device_data, title, view_mode='5min'):
-        """Draw a graph of temperature, humidity, and CO2 history
-        
+    def draw_graph(self, device_data, title, view_mode='5min', device_id=None):
+        """Draw the graph screen of a meter
+
+        Only the plot is repainted while panning and zooming (``draw_plot``);
+        the window itself is set by ``set_graph_preset`` and the gestures.
+
         Args:
             device_data (dict): Dictionary containing '5min_data' and 'hourly_data'
             title (str): Title to display
-            view_mode (str): Either '5min' or 'hourly'
+            view_mode (str): Preset shown, either '5min' or 'hourly'; the toggle
+                button offers the other one
+            device_id (str): Meter whose history log backs the graph
         """
         # Clear the screen with background color
         self.lcd.clear_display(BACKGROUND_COLOR)
         
-        # Get the appropriate data based on view mode
-        history_data = device_data.get(f'{view_mode}_data', [])
+        self.draw_graph_title(device_data, title)
+        self.load_pyramid(device_id, device_data)
         
-        # Filter data to show only the desired time range
-        current_time = time.time()
-        if view_mode == '5min':
-            time_range = HOURLY_INTERVAL  # 1 hour
-        else:
-            time_range = HOURLY_INTERVAL * 24  # 24 hours
-            
-        history_data = [
-            d for d in history_data
-            if current_time - d['timestamp'] <= time_range
-        ]
+        # Draw legend
+        legend_y = GRAPH_Y + GRAPH_HEIGHT + 20
+        # Temperature
+        self.lcd.fill_rectangle(GRAPH_X, legend_y, 20, 2, TEMPERATURE_COLOR)
+        self.lcd.draw_text(GRAPH_X + 30, legend_y - 3, "Temp", TEMPERATURE_COLOR, BACKGROUND_COLOR)
+        # Humidity
+        self.lcd.fill_rectangle(GRAPH_X + 100, legend_y, 20, 2, HUMIDITY_COLOR)
+        self.lcd.draw_text(GRAPH_X + 130, legend_y - 3, "Humidity", HUMIDITY_COLOR, BACKGROUND_COLOR)
+        # CO2
+        coarsest = self.graph_pyramid.levels[-1]
+        if any(value != NONE for value in coarsest.series[2]):
+            self.lcd.fill_rectangle(GRAPH_X + 220, legend_y, 20, 2, CO2_COLOR) 
+            self.lcd.draw_text(GRAPH_X + 250, legend_y - 3, "CO2", CO2_COLOR, BACKGROUND_COLOR)
+        
+        # Draw back button
+        draw_button(self.lcd, (10, SCREEN_HEIGHT - 30, 60, 20), BUTTON_COLOR, "Back", TEXT_COLOR)
+        
+        # Draw view mode toggle button
+        toggle_text = "24h" if view_mode == '5min' else "1h"
+        draw_button(self.lcd, (80, SCREEN_HEIGHT - 30, 60, 20), BUTTON_COLOR, toggle_text, TEXT_COLOR)
+        
+        self.draw_plot()
+        
+        # Draw last update time
+        self.draw_last_update_time()
+
+    def draw_graph_title(self, device_data, title):
+        """Draw the title bar with the latest values of the meter"""
+        history_data = []
+        if isinstance(device_data, dict):
+            history_data = device_data.get('5min_data') or device_data.get('hourly_data') or []
         
         # Get current values from the latest data point
         if history_data:
             latest = history_data[-1]
-            current_temp = latest['temperature']
-            current_humidity = latest['humidity']
             current_co2 = latest.get('co2')
             # Create title with current values
+            value_text = "{}: {} {}".format(title, format_value(latest.get('temperature'), "{:.1f}", "C"),
+                                            format_value(latest.get('humidity'), "{:.0f}", "%"))
             if current_co2 is not None:
-                value_text = f"{title}: {current_temp:.1f}C {current_humidity:.0f}% {current_co2:.0f}ppm"
-            else:
-                value_text = f"{title}: {current_temp:.1f}C {current_humidity:.0f}%"
+                value_text += f" {current_co2:.0f}ppm"
         else:
             value_text = title
         
@@ -602,232 +1595,253 @@ class SwitchBotDisplay:
         text_x = title_x + (title_w - len(value_text) * 8) // 2
         text_y = title_y + (title_h - 8) // 2
         self.lcd.draw_text(text_x, text_y, value_text, TEXT_COLOR, BUTTON_COLOR)
-        
-        # Graph area dimensions
-        GRAPH_X = 50
-        GRAPH_Y = 60
-        GRAPH_WIDTH = SCREEN_WIDTH - 120
-        GRAPH_HEIGHT = 180
+
+    def load_pyramid(self, device_id, device_data):
+        """Build the data pyramid of a meter, or append its new samples to it
+
+        The history log supplies the samples; the in-memory hourly averages
+        cover the time before the log was started.
+        """
+        if not isinstance(device_data, dict):
+            device_data = {}
+        five_min_data = device_data.get('5min_data', [])
+        if self.graph_pyramid is not None and device_id == self.graph_key:
+            # New samples update the last bucket of every level in place
+            for data_point in five_min_data:
+                self.graph_pyramid.append(DataPyramid.pack(data_point))
+            return
+        self.graph_pyramid = None
+        log = self.get_history_log(device_id) if device_id is not None else None
+        self.graph_pyramid = DataPyramid.load(log, device_data.get('hourly_data', []), five_min_data)
+        self.graph_key = device_id
+
+    def set_graph_preset(self, view_mode):
+        """Show the last hour ('5min') or the last day ('hourly'), following new samples"""
+        self.current_view_mode = view_mode
+        self.graph_span = HOURLY_INTERVAL if view_mode == '5min' else HOURLY_INTERVAL * 24
+        self.graph_end = None
+
+    def set_graph_window(self, end, span):
+        """Clamp and apply a pan/zoom window
+
+        Returns:
+            bool: True if the window moved or changed by at least a pixel
+        """
+        now = clock.time()
+        extent = self.graph_pyramid.extent() if self.graph_pyramid is not None else None
+        oldest = extent[0] if extent else now
+        # Zoom out to the whole history, or at least a day
+        span = max(MIN_GRAPH_SPAN, min(span, max(now - oldest, HOURLY_INTERVAL * 24)))
+        end = min(max(end, oldest + span), now)
+        current_end = self.graph_end if self.graph_end is not None else now
+        pixel = span / GRAPH_WIDTH
+        if abs(end - current_end) < pixel and abs(span - self.graph_span) < pixel:
+            return False
+        self.graph_span = span
+        # Panned back to the newest sample: keep following new data
+        self.graph_end = None if now - end < pixel else end
+        return True
+
+    def draw_plot(self):
+        """Repaint the plot area, its value labels and time ticks
+
+        The finest pyramid level with at most GRAPH_MAX_POINTS samples in the
+        window is drawn, so a frame costs the same whatever the zoom. The
+        title, legend and buttons are not recorded.
+        """
+        lcd = self.lcd
+        span = self.graph_span
+        end = self.graph_end if self.graph_end is not None else clock.time()
+        start = end - span
+        lcd.begin_frame()
+        lcd.fill_rectangle(0, GRAPH_Y - 16, SCREEN_WIDTH, GRAPH_HEIGHT + 30, BACKGROUND_COLOR)
         
         # Draw graph background
-        self.lcd.fill_rectangle(GRAPH_X, GRAPH_Y, GRAPH_WIDTH, GRAPH_HEIGHT, WHITE_COLOR)
+        lcd.fill_rectangle(GRAPH_X, GRAPH_Y, GRAPH_WIDTH, GRAPH_HEIGHT, WHITE_COLOR)
         
         # Draw axes
-        self.lcd.fill_rectangle(GRAPH_X, GRAPH_Y, 2, GRAPH_HEIGHT, TEXT_COLOR)  # Y axis
-        self.lcd.fill_rectangle(GRAPH_X, GRAPH_Y + GRAPH_HEIGHT - 2, GRAPH_WIDTH, 2, TEXT_COLOR)  # X axis
+        lcd.fill_rectangle(GRAPH_X, GRAPH_Y, 2, GRAPH_HEIGHT, TEXT_COLOR)  # Y axis
+        lcd.fill_rectangle(GRAPH_X, GRAPH_Y + GRAPH_HEIGHT - 2, GRAPH_WIDTH, 2, TEXT_COLOR)  # X axis
         
-        if not history_data:
-            draw_button(self.lcd, (GRAPH_X, GRAPH_Y + GRAPH_HEIGHT//2 - 15, GRAPH_WIDTH, 30),
+        pyramid = self.graph_pyramid
+        level = None
+        if pyramid is not None and pyramid.extent() is not None:
+            level, lo, hi = pyramid.select(start, end, GRAPH_MAX_POINTS)
+        if level is None or level.bisect(start) >= level.bisect(end, right=True):
+            draw_button(lcd, (GRAPH_X, GRAPH_Y + GRAPH_HEIGHT//2 - 15, GRAPH_WIDTH, 30),
                        BACKGROUND_COLOR, "No data available", TEXT_COLOR)
+            self.draw_time_ticks(start, end)
+            lcd.end_frame()
             return
         
-        # Draw time ticks on x-axis
-        if view_mode == '5min':
-            # Draw ticks every 10 minutes for 1-hour view
-            tick_interval = 10  # minutes
-            num_ticks = 6  # 0, 10, 20, 30, 40, 50, 60 minutes
-        else:
-            # Draw ticks every 4 hours for 24-hour view
-            tick_interval = 4  # hours
-            num_ticks = 6  # 0, 4, 8, 12, 16, 20, 24 hours
+        self.draw_time_ticks(start, end)
         
-        for i in range(num_ticks + 1):
-            minutes_ago = i * tick_interval * (60 if view_mode == 'hourly' else 1)
-            x = GRAPH_X + GRAPH_WIDTH - (minutes_ago * GRAPH_WIDTH // time_range)
-            # Draw tick mark
-            self.lcd.fill_rectangle(x, GRAPH_Y + GRAPH_HEIGHT - 5, 1, 5, TEXT_COLOR)
-            # Draw time label
-            tick_time = time.localtime(current_time - minutes_ago * 60)
-            time_str = "{:02d}:{:02d}".format(tick_time[3], tick_time[4])
-            self.lcd.draw_text(x - 20, GRAPH_Y + GRAPH_HEIGHT + 5, time_str, TEXT_COLOR, BACKGROUND_COLOR)
-        
-        # Get min/max values for scaling
-        temps = [data['temperature'] for data in history_data if data['temperature'] is not None]
-        humids = [data['humidity'] for data in history_data if data['humidity'] is not None]
-        co2s = [data['co2'] for data in history_data if data.get('co2') is not None]
-        
-        if not temps or not humids:
-            return
-            
-        temp_min, temp_max = min(temps), max(temps)
-        humid_min, humid_max = min(humids), max(humids)
-        
-        # Add some padding to min/max and ensure non-zero range
-        temp_range = max(1, temp_max - temp_min)
-        humid_range = max(1, humid_max - humid_min)
-        
-        # Adjust min/max with padding
-        temp_padding = temp_range * 0.1
-        humid_padding = humid_range * 0.1
-        temp_min -= temp_padding
-        temp_max += temp_padding
-        humid_min -= humid_padding
-        humid_max += humid_padding
-        
-        # CO2 scaling if available
-        if co2s:
-            co2_min, co2_max = min(co2s), max(co2s)
-            co2_range = max(1, co2_max - co2_min)
-            co2_padding = co2_range * 0.1
-            co2_min -= co2_padding
-            co2_max += co2_padding
-
-        # Draw data points and connect them with lines
-        for i in range(len(history_data)):
-            # Calculate x position based on timestamp
-            data = history_data[i]
-            time_diff = current_time - data['timestamp']
-            x = GRAPH_X + GRAPH_WIDTH - int(time_diff * GRAPH_WIDTH / time_range)
+        markers = hi - lo <= GRAPH_MARKER_POINTS
+        k = pyramid.levels.index(level)
+        ranges = []
+        for field, color in enumerate((TEMPERATURE_COLOR, HUMIDITY_COLOR, CO2_COLOR)):
+            values = level.series[field]
+            # True min/max of every sample under the drawn buckets, not of
+            # their averages, so zooming out keeps peaks and troughs on scale
+            stats = pyramid.span_stats(field, k, lo, hi)
+            if stats is None:
+                ranges.append(None)
+                continue
             
-            # Temperature
-            if data['temperature'] is not None:
-                if temp_max == temp_min:
-                    y = GRAPH_Y + GRAPH_HEIGHT // 2
-                else:
-                    y = GRAPH_Y + GRAPH_HEIGHT - int((data['temperature'] - temp_min) * GRAPH_HEIGHT / (temp_max - temp_min))
-                self.lcd.fill_rectangle(x-1, y-1, 3, 3, TEMPERATURE_COLOR)
-                
-                # Draw line to next point if exists
-                if i < len(history_data) - 1:
-                    next_data = history_data[i + 1]
-                    next_time_diff = current_time - next_data['timestamp']
-                    next_x = GRAPH_X + GRAPH_WIDTH - int(next_time_diff * GRAPH_WIDTH / time_range)
-                    if next_data['temperature'] is not None:
-                        if temp_max == temp_min:
-                            next_y = GRAPH_Y + GRAPH_HEIGHT // 2
-                        else:
-                            next_y = GRAPH_Y + GRAPH_HEIGHT - int((next_data['temperature'] - temp_min) * GRAPH_HEIGHT / (temp_max - temp_min))
-                        # Draw diagonal line
-                        dx = abs(next_x - x)
-                        dy = abs(next_y - y)
-                        if dx > dy:
-                            steps = dx
-                        else:
-                            steps = dy
-                        if steps > 0:
-                            x_inc = (next_x - x) / steps
-                            y_inc = (next_y - y) / steps
-                            curr_x = x
-                            curr_y = y
-                            for _ in range(int(steps)):
-                                self.lcd.fill_rectangle(int(curr_x), int(curr_y), 2, 2, TEMPERATURE_COLOR)
-                                curr_x += x_inc
-                                curr_y += y_inc
+            # Add some padding to min/max and ensure non-zero range
+            scale = SCALES[field]
+            value_min, value_max = stats[0], stats[1]
+            padding = max(1, value_max - value_min) * 0.1
+            value_min -= padding
+            value_max += padding
+            ranges.append((value_min, value_max))
             
-            # Humidity
-            if data['humidity'] is not None:
-                if humid_max == humid_min:
-                    y = GRAPH_Y + GRAPH_HEIGHT // 2
-                else:
-                    y = GRAPH_Y + GRAPH_HEIGHT - int((data['humidity'] - humid_min) * GRAPH_HEIGHT / (humid_max - humid_min))
-                self.lcd.fill_rectangle(x-1, y-1, 3, 3, HUMIDITY_COLOR)
-                
-                # Draw line to next point if exists
-                if i < len(history_data) - 1:
-                    next_data = history_data[i + 1]
-                    next_time_diff = current_time - next_data['timestamp']
-                    next_x = GRAPH_X + GRAPH_WIDTH - int(next_time_diff * GRAPH_WIDTH / time_range)
-                    if next_data['humidity'] is not None:
-                        if humid_max == humid_min:
-                            next_y = GRAPH_Y + GRAPH_HEIGHT // 2
-                        else:
-                            next_y = GRAPH_Y + GRAPH_HEIGHT - int((next_data['humidity'] - humid_min) * GRAPH_HEIGHT / (humid_max - humid_min))
-                        # Draw diagonal line
-                        dx = abs(next_x - x)
-                        dy = abs(next_y - y)
-                        if dx > dy:
-                            steps = dx
-                        else:
-                            steps = dy
-                        if steps > 0:
-                            x_inc = (next_x - x) / steps
-                            y_inc = (next_y - y) / steps
-                            curr_x = x
-                            curr_y = y
-                            for _ in range(int(steps)):
-                                self.lcd.fill_rectangle(int(curr_x), int(curr_y), 2, 2, HUMIDITY_COLOR)
-                                curr_x += x_inc
-                                curr_y += y_inc
-            
-            # CO2
-            if data.get('co2') is not None:
-                if co2_max == co2_min:
-                    y = GRAPH_Y + GRAPH_HEIGHT // 2
-                else:
-                    y = GRAPH_Y + GRAPH_HEIGHT - int((data['co2'] - co2_min) * GRAPH_HEIGHT / (co2_max - co2_min))
-                self.lcd.fill_rectangle(x-1, y-1, 3, 3, CO2_COLOR)
-                
-                # Draw line to next point if exists
-                if i < len(history_data) - 1:
-                    next_data = history_data[i + 1]
-                    next_time_diff = current_time - next_data['timestamp']
-                    next_x = GRAPH_X + GRAPH_WIDTH - int(next_time_diff * GRAPH_WIDTH / time_range)
-                    if next_data.get('co2') is not None:
-                        if co2_max == co2_min:
-                            next_y = GRAPH_Y + GRAPH_HEIGHT // 2
-                        else:
-                            next_y = GRAPH_Y + GRAPH_HEIGHT - int((next_data['co2'] - co2_min) * GRAPH_HEIGHT / (co2_max - co2_min))
-                        # Draw diagonal line
-                        dx = abs(next_x - x)
-                        dy = abs(next_y - y)
-                        if dx > dy:
-                            steps = dx
-                        else:
-                            steps = dy
-                        if steps > 0:
-                            x_inc = (next_x - x) / steps
-                            y_inc = (next_y - y) / steps
-                            curr_x = x
-                            curr_y = y
-                            for _ in range(int(steps)):
-                                self.lcd.fill_rectangle(int(curr_x), int(curr_y), 2, 2, CO2_COLOR)
-                                curr_x += x_inc
-                                curr_y += y_inc
-        
-        # Draw legend
-        legend_y = GRAPH_Y + GRAPH_HEIGHT + 20
-        # Temperature
-        self.lcd.fill_rectangle(GRAPH_X, legend_y, 20, 2, TEMPERATURE_COLOR)
-        self.lcd.draw_text(GRAPH_X + 30, legend_y - 3, "Temp", TEMPERATURE_COLOR, BACKGROUND_COLOR)
-        # Humidity
-        self.lcd.fill_rectangle(GRAPH_X + 100, legend_y, 20, 2, HUMIDITY_COLOR)
-        self.lcd.draw_text(GRAPH_X + 130, legend_y - 3, "Humidity", HUMIDITY_COLOR, BACKGROUND_COLOR)
-        # CO2
-        if co2s:
-            self.lcd.fill_rectangle(GRAPH_X + 220, legend_y, 20, 2, CO2_COLOR) 
-            self.lcd.draw_text(GRAPH_X + 250, legend_y - 3, "CO2", CO2_COLOR, BACKGROUND_COLOR)
+            # One polyline per run of samples; missing values break the line
+            y_scale = GRAPH_HEIGHT / ((value_max - value_min) * scale)
+            y_base = GRAPH_Y + GRAPH_HEIGHT + value_min * scale * y_scale
+            x_scale = (GRAPH_WIDTH - 2) / span
+            xs = []
+            ys = []
+            for i in range(lo, hi + 1):
+                if i == hi or values[i] == NONE:
+                    self.plot_series(xs, ys, color, markers)
+                    xs = []
+                    ys = []
+                    continue
+                xs.append(GRAPH_X + int((level.times[i] - start) * x_scale))
+                ys.append(int(y_base - values[i] * y_scale))
         
         # Draw min/max values
-        self.lcd.draw_text(5, GRAPH_Y - 4, f"{temp_max:.1f}C", TEMPERATURE_COLOR, BACKGROUND_COLOR)
-        self.lcd.draw_text(5, GRAPH_Y + GRAPH_HEIGHT - 8, f"{temp_min:.1f}C", TEMPERATURE_COLOR, BACKGROUND_COLOR)
-        self.lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y - 4, f"{humid_max:.0f}%", HUMIDITY_COLOR, BACKGROUND_COLOR) 
-        self.lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y + GRAPH_HEIGHT - 8, f"{humid_min:.0f}%", HUMIDITY_COLOR, BACKGROUND_COLOR)
+        temps, humids, co2s = ranges
+        if temps:
+            lcd.draw_text(5, GRAPH_Y - 4, f"{temps[1]:.1f}C", TEMPERATURE_COLOR, BACKGROUND_COLOR)
+            lcd.draw_text(5, GRAPH_Y + GRAPH_HEIGHT - 8, f"{temps[0]:.1f}C", TEMPERATURE_COLOR, BACKGROUND_COLOR)
+        if humids:
+            lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y - 4, f"{humids[1]:.0f}%", HUMIDITY_COLOR, BACKGROUND_COLOR) 
+            lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y + GRAPH_HEIGHT - 8, f"{humids[0]:.0f}%", HUMIDITY_COLOR, BACKGROUND_COLOR)
         if co2s:
-            self.lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y - 16, f"{co2_max:.0f}ppm", CO2_COLOR, BACKGROUND_COLOR) 
-            self.lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y + GRAPH_HEIGHT - 20, f"{co2_min:.0f}ppm", CO2_COLOR, BACKGROUND_COLOR)
-        
-        # Draw back button
-        draw_button(self.lcd, (10, SCREEN_HEIGHT - 30, 60, 20), BUTTON_COLOR, "Back", TEXT_COLOR)
-        
-        # Draw view mode toggle button
-        toggle_text = "24h" if view_mode == '5min' else "1h"
-        draw_button(self.lcd, (80, SCREEN_HEIGHT - 30, 60, 20), BUTTON_COLOR, toggle_text, TEXT_COLOR)
-        
-        # Draw last update time
+            lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y - 16, f"{co2s[1]:.0f}ppm", CO2_COLOR, BACKGROUND_COLOR) 
+            lcd.draw_text(GRAPH_X + GRAPH_WIDTH + 5, GRAPH_Y + GRAPH_HEIGHT - 20, f"{co2s[0]:.0f}ppm", CO2_COLOR, BACKGROUND_COLOR)
+        lcd.end_frame()
+
+    def plot_series(self, xs, ys, color, markers):
+        """Draw one run of samples, clipped to the plot at both ends"""
+        left = GRAPH_X
+        right = GRAPH_X + GRAPH_WIDTH - 2
+        if markers:
+            for x, y in zip(xs, ys):
+                if left <= x <= right:
+                    self.lcd.fill_rectangle(x - 1, y - 1, 3, 3, color)
+        # Only the samples just outside the window can lie beyond the edges
+        if xs and xs[0] < left:
+            if len(xs) > 1 and xs[1] > left:
+                ys[0] += (ys[1] - ys[0]) * (left - xs[0]) // (xs[1] - xs[0])
+                xs[0] = left
+            else:
+                del xs[0], ys[0]
+        if xs and xs[-1] > right:
+            if len(xs) > 1 and xs[-2] < right:
+                ys[-1] = ys[-2] + (ys[-1] - ys[-2]) * (right - xs[-2]) // (xs[-1] - xs[-2])
+                xs[-1] = right
+            else:
+                del xs[-1], ys[-1]
+        self.lcd.draw_polyline(xs, ys, color)
+
+    def draw_time_ticks(self, start, end):
+        """Draw time ticks on the x-axis at round times, at most 6 of them"""
+        span = end - start
+        for step in GRAPH_TICK_STEPS:
+            if span // step <= 6:
+                break
+        tick = (int(start) // step + 1) * step
+        while tick <= end:
+            x = GRAPH_X + int((tick - start) * (GRAPH_WIDTH - 2) / span)
+            # Draw tick mark
+            self.lcd.fill_rectangle(x, GRAPH_Y + GRAPH_HEIGHT - 5, 1, 5, TEXT_COLOR)
+            # Draw time label (dates once the ticks are a day apart)
+            tick_time = clock.localtime(tick)
+            if step < 86400:
+                time_str = "{:02d}:{:02d}".format(tick_time[3], tick_time[4])
+            else:
+                time_str = "{}/{}".format(tick_time[1], tick_time[2])
+            self.lcd.draw_text(x - len(time_str) * 4, GRAPH_Y + GRAPH_HEIGHT + 5, time_str, TEXT_COLOR, BACKGROUND_COLOR)
+            tick += step
+
+    def refresh_graph(self):
+        """Show new samples on the graph screen without redrawing the buttons"""
+        device_data = self.meter_history.get(self.current_device_id, {})
+        self.draw_graph_title(device_data, self.current_device_name)
+        self.load_pyramid(self.current_device_id, device_data)
+        self.draw_plot()
         self.draw_last_update_time()
 
+    def handle_graph_gesture(self):
+        """Pan the graph with one finger, zoom it with two
+
+        Returns:
+            bool: True while a gesture is in progress (taps are ignored then)
+        """
+        points = self.lcd.get_touch_points()
+        if not points:
+            if self.gesture is None:
+                return False
+            self.gesture = None
+            return True
+        if self.gesture is None:
+            x, y = points[0]
+            if not (GRAPH_X <= x < GRAPH_X + GRAPH_WIDTH and GRAPH_Y <= y < GRAPH_Y + GRAPH_HEIGHT):
+                return False
+        # The time under the fingers' midpoint stays under it
+        anchor = sum(x for x, _ in points) / len(points)
+        distance = 0
+        if len(points) > 1:
+            dx = points[0][0] - points[1][0]
+            dy = points[0][1] - points[1][1]
+            distance = max(20, (dx * dx + dy * dy) ** 0.5)
+        if self.gesture is None or self.gesture[0] != len(points):
+            # Start again from the current window when a finger is added or lifted
+            end = self.graph_end if self.graph_end is not None else clock.time()
+            self.gesture = (len(points), anchor, distance, end, self.graph_span)
+            return True
+        fingers, start_anchor, start_distance, start_end, start_span = self.gesture
+        span = start_span * start_distance / distance if fingers > 1 else start_span
+        anchor_time = start_end - start_span * (GRAPH_X + GRAPH_WIDTH - start_anchor) / GRAPH_WIDTH
+        end = anchor_time + span * (GRAPH_X + GRAPH_WIDTH - anchor) / GRAPH_WIDTH
+        if self.set_graph_window(end, span):
+            self.draw_plot()
+        return True
+
     def handle_touch(self):
         for x, y in self.lcd.get_touch_xy():
+            # Check last update time area (toggles the performance overlay)
+            bx, by, bw, bh = LAST_UPDATE_AREA
+            if (bx <= x < bx + bw) and (by <= y < by + bh):
+                self.toggle_perf_overlay()
+                time.sleep_ms(100)
+                self.lcd.clear_touch()
+                return
+
+            # Check if we're in a room's control screen
+            if self.showing_controls:
+                if self.handle_control_touch(x, y):
+                    time.sleep_ms(100)
+                    self.lcd.clear_touch()
+                    return
+                continue
+
             # Check if we're in graph view
             if hasattr(self, 'showing_graph') and self.showing_graph:
                 # Check back button
                 bx, by, bw, bh = (10, SCREEN_HEIGHT - 30, 60, 20)
                 if (bx <= x < bx + bw) and (by <= y < by + bh):
                     self.showing_graph = False
-                    # Clear the screen before redrawing
-                    self.lcd.clear_display(BACKGROUND_COLOR)
-                    self.initialized = False  # Force complete redraw
-                    self.draw_initial_screen()
+                    self.graph_pyramid = None  # Release the arrays
+                    if self.showing_device_list:
+                        self.show_device_list()
+                    else:
+                        # Clears the screen as part of the redraw
+                        self.initialized = False  # Force complete redraw
+                        self.draw_initial_screen()
                     time.sleep_ms(100)
                     self.lcd.clear_touch()
                     return
@@ -835,17 +1849,38 @@ class SwitchBotDisplay:
                 # Check view mode toggle button
                 bx, by, bw, bh = (80, SCREEN_HEIGHT - 30, 60, 20)
                 if (bx <= x < bx + bw) and (by <= y < by + bh):
-                    # Toggle view mode
-                    self.current_view_mode = 'hourly' if self.current_view_mode == '5min' else '5min'
+                    # Toggle view mode (resets any pan/zoom)
+                    self.set_graph_preset('hourly' if self.current_view_mode == '5min' else '5min')
                     # Redraw graph with new view mode
                     self.draw_graph(self.meter_history[self.current_device_id], 
                                   self.current_device_name,
-                                  self.current_view_mode)
+                                  self.current_view_mode,
+                                  self.current_device_id)
                     time.sleep_ms(100)
                     self.lcd.clear_touch()
                     return
                 continue
             
+            # Check if we're in the device list (rows are handled by handle_device_list_touch)
+            if self.showing_device_list:
+                bx, by, bw, bh = (10, SCREEN_HEIGHT - 30, 60, 20)
+                if (bx <= x < bx + bw) and (by <= y < by + bh):
+                    self.close_device_list()
+                    self.initialized = False  # Force complete redraw
+                    self.draw_initial_screen()
+                    time.sleep_ms(100)
+                    self.lcd.clear_touch()
+                    return
+                continue
+            
+            # Check device list button
+            bx, by, bw, bh = DEVICE_LIST_BUTTON
+            if (bx <= x < bx + bw) and (by <= y < by + bh):
+                self.show_device_list()
+                time.sleep_ms(100)
+                self.lcd.clear_touch()
+                return
+            
             # Check refresh button
             bx, by, bw, bh = REFRESH_BUTTON
             if (bx <= x < bx + bw) and (by <= y < by + bh):
@@ -853,7 +1888,10 @@ class SwitchBotDisplay:
                 draw_button(self.lcd, REFRESH_BUTTON, BUTTON_ACTIVE_COLOR, "Refresh", TEXT_COLOR)
                 self.led.on()  # Turn on LED
                 
-                if self.get_devices():
+                if self.worker is not None:
+                    # The second core polls; new values arrive through the queue
+                    self.worker.refresh_requested = True
+                elif self.get_devices():
                     self.update_meter_display()  # Only update the values
                 
                 # Return to original color and turn off LED
@@ -873,44 +1911,190 @@ class SwitchBotDisplay:
                             if DEVICE_NAMES.get(meter.get("deviceName", "")) == device_name:
                                 device_id = meter.get("deviceId")
                                 if device_id in self.meter_history:
-                                    self.showing_graph = True
-                                    self.current_device_id = device_id
-                                    self.current_device_name = device_name
-                                    self.current_view_mode = '5min'  # Reset to 5-minute view
-                                    self.draw_graph(self.meter_history[device_id], device_name, self.current_view_mode)
+                                    self.open_graph(device_id, device_name)
+                    # Rooms without meter history open their device controls
+                    if not getattr(self, 'showing_graph', False) and self.room_controls(room_name):
+                        self.draw_control_screen(room_name)
                     time.sleep_ms(100)
                     self.lcd.clear_touch()
                     return
                     break
 
-    def run(self):
-        if self.get_devices():
-            # Initial data collection and complete draw
-            self.update_meter_history()
+    def handle_control_touch(self, x, y):
+        """Handle a tap on the control screen; returns True if it hit a button"""
+        bx, by, bw, bh = (10, SCREEN_HEIGHT - 30, 60, 20)
+        if (bx <= x < bx + bw) and (by <= y < by + bh):
+            self.showing_controls = None
+            self.initialized = False  # Force complete redraw
             self.draw_initial_screen()
+            return True
+        for index, device in enumerate(self.room_controls(self.showing_controls)):
+            bx, by, bw, bh = self.control_button(index)
+            if (bx <= x < bx + bw) and (by <= y < by + bh):
+                # The expected state is drawn now; the request is sent later
+                self.commands.toggle(device.get("deviceId"))
+                self.draw_control_row(index, device)
+                return True
+        for index, (label, scene_id, effects) in enumerate(SCENE_BUTTONS[:3]):
+            bx, by, bw, bh = self.scene_button(index)
+            if (bx <= x < bx + bw) and (by <= y < by + bh):
+                device_ids = {d.get("deviceName", ""): d.get("deviceId") for d in self.controls}
+                names = {DEVICE_NAMES.get(name, name): device_id for name, device_id in device_ids.items()}
+                self.commands.run_scene(scene_id, {
+                    names[name]: command for name, command in effects.items() if name in names
+                })
+                self.redraw_control_rows()
+                return True
+        return False
+
+    def next_wakeup_ms(self):
+        """Return how long the loop may sleep before something is due"""
+        if self.gesture is not None or self.commands.pending or self.commands.in_flight is not None:
+            return IDLE_BUSY_MS
+        if self.device_list is not None and self.device_list.dragging():
+            return IDLE_BUSY_MS
+        wait = IDLE_MAX_SLEEP_MS
+        if (self.http_server is not None or self.ble_scanner is not None or self.worker is not None
+                or self.fanout_role == "follower" or not self.wifi_ready()):
+            wait = IDLE_NETWORK_MS
+        if self.worker is None and self.wifi_ready():
+            retry = self.api_breaker.retry_ms()
+            if retry is not None:
+                wait = min(wait, retry)  # Nothing is sent before the next probe
+            elif self.poll_retry is not None:
+                wait = min(wait, time.ticks_diff(self.poll_retry, time.ticks_ms()))
+            elif self.stale:
+                return IDLE_BUSY_MS
+            else:
+                wait = min(wait, (self.last_update + self.update_interval - clock.time()) * 1000)
+        now = time.ticks_ms()
+        if self.wifi is not None and self.wifi_ready():
+            wait = min(wait, time.ticks_diff(clock.next_sync, now))
+        if self.alert_led.running:
+            wait = min(wait, time.ticks_diff(self.alert_led.next_change, now))
+        if self.worker is None and self.notifier is not None and self.notifier.due is not None:
+            wait = min(wait, time.ticks_diff(self.notifier.due, now))
+        return max(0, int(wait))
+
+    def run(self):
+        # The cached dashboard is already on screen; the first poll runs
+        # in the loop as soon as WiFi is up and replaces the stale values
+        # Keep track of current device and view mode
+        self.current_device_id = None
+        self.current_device_name = None
+        self.current_view_mode = '5min'  # Default to 5-minute view
+        # Reopen the screen shown before a restart
+        self.resume_view()
+        
+        if self.worker is not None:
+            self.worker.start()
+        
+        # Reset the board if the loop stops making progress
+        if WATCHDOG_TIMEOUT:
+            self.watchdog = Watchdog(WATCHDOG_TIMEOUT)
+        
+        while True:
+            if self.watchdog is not None:
+                self.watchdog.feed()
+            
+            # A touch on the dark screen only turns it back on
+            if self.idle.poll():
+                self.waking = True
+            
+            # Keep the WiFi link up; polling pauses while it is down
+            self.poll_wifi()
+            
+            # NTP sync at start-up and every NTP_INTERVAL seconds
+            self.poll_clock()
             
-            # Keep track of current device and view mode
-            self.current_device_id = None
-            self.current_device_name = None
-            self.current_view_mode = '5min'  # Default to 5-minute view
+            # Leader heartbeat, or snapshots from the leader on a follower
+            updated = self.poll_fanout()
             
-            while True:
-                # Update data if needed
-                if self.update_meter_history():
-                    if hasattr(self, 'showing_graph') and self.showing_graph and self.current_device_id:
-                        # Redraw graph with updated data
-                        self.draw_graph(self.meter_history[self.current_device_id],
-                                      self.current_device_name,
-                                      self.current_view_mode)
+            # Update data if needed (in dual-core mode, apply the worker's samples)
+            if self.worker is not None:
+                updated = self.worker.process_messages() or updated
+            else:
+                updated = self.update_meter_history() or updated
+            
+            # Decode BLE advertisements buffered by the scan IRQ
+            if self.ble_scanner is not None:
+                self.ble_scanner.poll()
+            
+            # Readings and events pushed (webhook/BLE) since the last frame
+            if self.pushed:
+                self.pushed = False
+                updated = True
+            if updated:
+                t0 = perf_trace.frame_begin()
+                with self.memory.phase("render"):
+                    if self.showing_controls:
+                        self.draw_last_update_time()
+                    elif hasattr(self, 'showing_graph') and self.showing_graph and self.current_device_id:
+                        # Repaint the plot with updated data, keeping the window
+                        self.refresh_graph()
+                    elif self.showing_device_list:
+                        # Rows show the latest values; only visible ones are redrawn
+                        self.device_list.invalidate()
+                        self.device_list.draw()
+                        self.draw_last_update_time()
                     else:
                         self.update_meter_display()
-                
-                # Handle touch events
-                self.handle_touch()
-                
-                time.sleep_ms(10)
+                perf_trace.frame(t0)
+                self.draw_perf_overlay()
+            
+            # Handle touch events; a drag or pinch on the graph pans/zooms it
+            # (timed as a frame if it redraws anything)
+            t0 = perf_trace.frame_begin()
+            if self.waking:
+                # Ignore the touch that woke the screen until the finger is lifted
+                self.waking = bool(self.lcd.get_touch_points())
+                self.lcd.clear_touch()
+            else:
+                if getattr(self, 'showing_graph', False):
+                    gesture = self.handle_graph_gesture()
+                else:
+                    gesture = self.showing_device_list and self.handle_device_list_touch()
+                if gesture:
+                    self.lcd.clear_touch()  # The IRQ records the drag as taps
+                else:
+                    self.handle_touch()
+            
+            # Send due commands; redraw the buttons when a response arrives
+            self.commands.poll()
+            if self.commands_changed:
+                self.commands_changed = False
+                if self.showing_controls:
+                    self.redraw_control_rows()
+                elif self.showing_device_list and not getattr(self, 'showing_graph', False):
+                    self.device_list.invalidate()
+                    self.device_list.draw()
+            if perf_trace.frame(t0):
+                self.draw_perf_overlay()
+            
+            # Blink the LED while an alert is active
+            self.alert_led.poll()
+            
+            # Serve metrics/history requests a chunk at a time
+            if self.http_server is not None:
+                self.http_server.poll()
+            
+            # Start the post of queued notifications on the second core when
+            # due (in dual-core mode the worker sends them)
+            if self.notifier is not None and self.worker is None and self.wifi_ready():
+                self.notifier.poll()
+            
+            # Runtime state for a warm restart (atomic, only when it changed)
+            self.save_checkpoint()
+            
+            # Sleep until the next deadline; a touch ends it early
+            self.idle.sleep(self.next_wakeup_ms())
 
 if __name__ == "__main__":
     # Use pseudo_mode=True for testing without actual API calls
-    display = SwitchBotDisplay(pseudo_mode=False)
-    display.run() 
\ No newline at end of file
+    # Use dual_core=True to poll and save on the second core
+    display = SwitchBotDisplay(pseudo_mode=False, dual_core=False)
+    try:
+        display.run()
+    except Exception as e:
+        # Includes MemoryError; restart and resume from the checkpoint
+        display.crash(e) 
\ No newline at end of file
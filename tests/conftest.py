@@ -0,0 +1,19 @@
+"""Host (CPython) setup for the tests
+
+The modules under test are written for MicroPython; this puts the
+repository on the import path and adds the ``time.ticks_*`` functions
+they use.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+    time.ticks_us = lambda: int(time.monotonic() * 1_000_000)
+    time.ticks_add = lambda ticks, delta: ticks + delta
+    time.ticks_diff = lambda end, start: end - start
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
@@ -0,0 +1,30 @@
+import random
+
+import pytest
+
+from asset_tool import PALETTE, RAW, RLE, decode, encode, to_pixels, to_rgb888
+
+
+@pytest.mark.parametrize("name, width, height, colors, transparent", [
+    ("flat", 16, 16, 1, False),
+    ("icon", 24, 20, 6, True),
+    ("noise", 33, 7, 65536, False),
+    ("long runs", 300, 3, 2, True),
+])
+def test_round_trip(name, width, height, colors, transparent):
+    rng = random.Random(1)
+    palette = [rng.randrange(0x10000) for _ in range(min(colors, 1000))]
+    rgba = []
+    for y in range(height):
+        for x in range(width):
+            color = palette[(x // 7 + y) % len(palette)] if colors <= 6 else rng.choice(palette)
+            r, g, b = to_rgb888(color)
+            alpha = 0 if transparent and (x + y) % 5 == 0 else 255
+            rgba.append((r, g, b, alpha))
+    pixels, key = to_pixels(rgba)
+    expected = [None if a < 128 else p for p, (_, _, _, a) in zip(pixels, rgba)]
+    for encoding in (RAW, RLE, PALETTE):
+        if encoding == PALETTE and len(set(pixels)) > 256:
+            continue
+        data = encode(width, height, pixels, encoding, key)
+        assert decode(data) == (width, height, key, expected), encoding
@@ -0,0 +1,12 @@
+import pytest
+
+from ble_meter import SAMPLE_PACKETS, decode
+
+
+@pytest.mark.parametrize("address, adv_data, expected", SAMPLE_PACKETS)
+def test_recorded_packets(address, adv_data, expected):
+    reading = decode(adv_data)
+    assert reading is not None
+    for key, value in expected.items():
+        assert reading[key] == value
+    assert reading["mac"] is None or reading["mac"] == address
@@ -0,0 +1,85 @@
+import argparse
+import socket
+import threading
+import time
+
+import pytest
+
+import mock_switchbot
+from clock import Clock
+
+
+@pytest.fixture
+def sim(monkeypatch):
+    """A server 30 s ahead of the RTC and a crystal running 300 ppm slow"""
+    ticks = [0]
+    monkeypatch.setattr(time, "ticks_ms", lambda: ticks[0])
+    steps = []
+    clock = Clock("simulated", set_rtc=False, on_step=lambda *args: steps.append(args))
+    server = [clock.now_ms() + 30_000]
+
+    def advance(ms, slow_ppm=300):
+        server[0] += ms
+        ticks[0] += ms - ms * slow_ppm // 1_000_000
+
+    clock.query = lambda: (server[0], ticks[0], 10)
+    return clock, steps, server, advance
+
+
+def test_failed_sync_is_retried(sim):
+    clock = sim[0]
+
+    def unreachable():
+        raise OSError("simulated timeout")
+
+    clock.query = unreachable
+    assert not clock.sync()
+    assert not clock.synced
+    assert clock.failures == 1
+
+
+def test_first_sync_steps_once(sim):
+    clock, steps, _, advance = sim
+    stamped = clock.time()  # A sample taken before the first sync
+    advance(5000)
+    assert clock.sync() and clock.synced
+    assert len(steps) == 1 and steps[0][2] == 30
+    assert clock.correct(stamped) == stamped + 30
+    assert clock.correct(clock.time()) == clock.time()
+
+
+def test_drift_converges(sim):
+    clock, steps, server, advance = sim
+    clock.sync()
+    errors = []
+    for _ in range(8):
+        advance(3600_000)
+        errors.append(server[0] - clock.now_ms())
+        clock.sync()
+    assert abs(errors[-1]) < 100
+    assert 250 <= clock.drift_ppm <= 350
+    assert len(steps) == 1  # No step after the first sync
+
+
+@pytest.fixture
+def ntp_server():
+    """The mock_switchbot.py NTP stand-in, 3 s ahead, on a free local port"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    args = argparse.Namespace(offset=3.0, drift_ppm=0.0, latency=0.0, drop_rate=0.0)
+    stop = threading.Event()
+    thread = threading.Thread(target=mock_switchbot.serve_ntp, args=(sock, args, stop))
+    thread.start()
+    try:
+        yield sock.getsockname()[1]
+    finally:
+        stop.set()
+        thread.join()
+        sock.close()
+
+
+def test_sync_with_ntp_stand_in(ntp_server):
+    clock = Clock(f"127.0.0.1:{ntp_server}", set_rtc=False, timeout_ms=500)
+    assert clock.sync()  # The socket is bound before the server thread starts
+    assert clock.synced
+    assert abs(clock.last_offset_ms - 3000) < 1100  # The RTC has whole seconds
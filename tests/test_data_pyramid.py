@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from data_pyramid import NONE, SCALES, DataPyramid, HistoryLog, PyramidLevel
+
+
+def make_records(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        (1000 + i * 300,
+         NONE if rng.random() < 0.1 else rng.randint(-100, 300),
+         rng.randint(0, 900),
+         NONE)
+        for i in range(count)
+    ]
+
+
+def build(records):
+    level0 = PyramidLevel(len(records))
+    for i, record in enumerate(records):
+        DataPyramid.store(level0, i, record)
+    return DataPyramid(level0)
+
+
+def expected_stats(records, field, t0, t1):
+    values = [r[field + 1] for r in records if t0 <= r[0] <= t1 and r[field + 1] != NONE]
+    if not values:
+        return None
+    scale = SCALES[field]
+    return min(values) / scale, max(values) / scale, sum(values) / len(values) / scale
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_stats_match_a_scan(incremental):
+    records = make_records(1000)
+    if incremental:
+        pyramid = DataPyramid(PyramidLevel(0))
+        for record in records:
+            pyramid.append(record)
+    else:
+        pyramid = build(records)
+    rng = random.Random(2)
+    for _ in range(300):
+        t0 = rng.randint(0, 320_000)
+        t1 = t0 + rng.randint(0, 320_000)
+        for field in range(3):
+            expected = expected_stats(records, field, t0, t1)
+            stats = pyramid.stats(field, t0, t1)
+            if expected is None:
+                assert stats is None
+            else:
+                assert stats == pytest.approx(expected)
+
+
+def test_append_matches_a_rebuild():
+    records = make_records(700)
+    pyramid = build(records[:100])
+    for record in records[100:]:
+        pyramid.append(record)
+    rebuilt = build(records)
+    assert len(pyramid.levels) == len(rebuilt.levels)
+    for level, other in zip(pyramid.levels, rebuilt.levels):
+        assert list(level.times) == list(other.times)
+        assert [list(s) for s in level.series] == [list(s) for s in other.series]
+
+
+def test_span_stats_bound_the_drawn_means():
+    pyramid = build(make_records(1000))
+    for k, level in enumerate(pyramid.levels):
+        low, high, _ = pyramid.span_stats(1, k, 0, len(level))
+        for value in level.series[1]:
+            assert low <= value / SCALES[1] <= high
+
+
+def test_coarse_levels_keep_peaks():
+    records = [(1000 + i * 300, 200, 500, NONE) for i in range(256)]
+    records[100] = (records[100][0], 350, 500, NONE)
+    pyramid = build(records)
+    top = pyramid.levels[-1]
+    assert max(top.series[0]) < 350  # The averages flatten the peak
+    assert pyramid.span_stats(0, len(pyramid.levels) - 1, 0, len(top))[1] == 35.0
+
+
+def test_evict_then_query():
+    records = make_records(1000)
+    pyramid = build(records)
+    unit = pyramid.factor ** (len(pyramid.levels) - 1)
+    cutoff = records[300][0]
+    pyramid.evict(cutoff)
+    first = pyramid.extent()[0]
+    kept = [r for r in records if r[0] >= first]
+    assert first <= cutoff
+    assert len(records) - len(kept) == 300 // unit * unit
+    rebuilt = build(kept)
+    assert len(pyramid.levels) == len(rebuilt.levels)
+    for level, other in zip(pyramid.levels, rebuilt.levels):
+        assert list(level.times) == list(other.times)
+        assert [list(s) for s in level.series] == [list(s) for s in other.series]
+    for field in range(3):
+        assert pyramid.stats(field, 0, 10**9) == pytest.approx(expected_stats(kept, field, 0, 10**9))
+    # Appending keeps working on the shifted buckets
+    for record in make_records(1200)[1000:]:
+        pyramid.append(record)
+        kept.append(record)
+    assert pyramid.stats(1, 0, 10**9) == pytest.approx(expected_stats(kept, 1, 0, 10**9))
+
+
+def test_evict_everything_but_the_newest():
+    records = make_records(200)
+    pyramid = build(records)
+    pyramid.evict(records[-1][0])
+    assert len(pyramid.levels[0]) < 200
+    assert len(pyramid.levels) == len(build(records[-len(pyramid.levels[0]):]).levels)
+
+
+def test_log_first_follows_trim(tmp_path):
+    log = HistoryLog(str(tmp_path / "history.bin"), max_records=8)
+    assert log.first() is None
+    for i in range(10):
+        log.append({'timestamp': 1000 + i, 'temperature': 20.0, 'humidity': 50.0})
+    assert log.first() == 1000
+    log.append({'timestamp': 1010, 'temperature': 20.0, 'humidity': 50.0})  # Trims to 8
+    assert log.first() == 1003
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from dual_core import PollWorker
+
+
+class FakeClock:
+    def time(self):
+        return 1000
+
+
+class FakeDisplay:
+    """Records which core changes the state the UI core renders from"""
+
+    update_interval = 300
+    notifier = None
+
+    def __init__(self):
+        self.meters = []
+        self.last_reconcile = 0
+        self.calls = []
+        self.ui_thread = threading.get_ident()
+
+    def wifi_ready(self):
+        return True
+
+    def polling_allowed(self):
+        return True
+
+    def push_active(self, now):
+        return False
+
+    def fetch_samples(self, now):
+        meters = [{"deviceId": "M1"}]
+        devices = (meters, [], [], [("M1", "Meter", "Meter")])
+        return devices, [("M1", {"timestamp": now, "temperature": 21.5})]
+
+    def set_devices(self, devices):
+        self.calls.append(("devices", threading.get_ident()))
+        self.meters = devices[0]
+
+    def apply_samples(self, samples, timestamp, pushed=False):
+        self.calls.append(("samples", threading.get_ident()))
+
+    def save_data(self):
+        pass
+
+    def save_screen_cache(self):
+        pass
+
+
+def test_device_lists_are_applied_on_the_ui_core():
+    display = FakeDisplay()
+    worker = PollWorker(display, FakeClock(), retry_s=60)
+    worker.start()
+    try:
+        for _ in range(100):
+            if worker.queue.count >= 2:
+                break
+            time.sleep(0.01)
+        assert display.meters == []  # Untouched by the worker
+        assert worker.process_messages()
+    finally:
+        worker.stop()
+    assert [kind for kind, _ in display.calls] == ["devices", "samples"]
+    assert all(thread == display.ui_thread for _, thread in display.calls)
+    assert display.meters == [{"deviceId": "M1"}]
+    assert display.last_reconcile == 1000
+    # The next poll is scheduled in ticks, a full interval away
+    assert time.ticks_diff(worker.next_poll, time.ticks_ms()) > 250_000
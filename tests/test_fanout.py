@@ -0,0 +1,86 @@
+import pytest
+
+import fanout
+from fanout import FanoutFollower, FanoutLeader, MAX_PACKET
+
+
+class Display:
+    def __init__(self, values):
+        self.meters = [
+            {"deviceId": "C0FFEE%06d" % i, "deviceName": "Meter %d" % i, "deviceType": "Meter"}
+            for i in range(len(values))
+        ]
+        self.values = values
+
+    def get_latest_values(self, device_id):
+        return self.values[int(device_id[6:])]
+
+
+class Inbox:
+    """Stands in for the follower's socket"""
+
+    def __init__(self, packets):
+        self.packets = list(packets)
+
+    def recv(self, size):
+        if not self.packets:
+            raise OSError("EAGAIN")
+        packet = self.packets.pop(0)
+        assert len(packet) <= size
+        return packet
+
+
+@pytest.fixture
+def leader():
+    leader = FanoutLeader()
+    leader.sent = []
+    leader.send = leader.sent.append
+    yield leader
+    leader.sock.close()
+
+
+@pytest.fixture
+def follower(monkeypatch):
+    # No multicast socket: packets are handed over through Inbox
+    monkeypatch.setattr(fanout.FanoutFollower, "__init__", lambda self: None)
+    follower = FanoutFollower()
+    follower.silence_s = 120
+    follower.last_seq = None
+    follower.last_heard = None
+    follower.last_snapshot_time = None
+    follower.partial = {}
+    follower.received = 0
+    follower.dropped = 0
+    return follower
+
+
+def receive(follower, packets):
+    follower.sock = Inbox(packets)
+    return follower.poll()
+
+
+def test_missing_fields_round_trip(leader, follower):
+    values = [(21.5, 40, None), (None, 55, 800), (-3.2, None, None), (None, None, None)]
+    leader.publish(Display(values), 1000)
+    meters, samples, timestamp = receive(follower, leader.sent)
+    assert timestamp == 1000
+    assert [m["deviceId"] for m in meters] == ["C0FFEE%06d" % i for i in range(len(values))]
+    assert [(d["temperature"], d["humidity"], d["co2"]) for _, d in samples] == values
+
+
+def test_large_snapshot_is_split(leader, follower):
+    values = [(20.0 + i / 10, 40 + i % 50, 400 + i) for i in range(300)]
+    display = Display(values)
+    for meter in display.meters:
+        meter["deviceName"] = "Meter with a long name " * 4
+    leader.publish(display, 2000)
+    assert all(len(packet) <= MAX_PACKET for packet in leader.sent)
+    assert len(leader.sent) > 2
+    # A lost part holds the snapshot back until the heartbeat repeats it
+    meters, samples, _ = receive(follower, leader.sent[:-1])
+    assert len(meters) == 300 and samples is None
+    leader.sent.clear()
+    leader.send_snapshot()
+    meters, samples, timestamp = receive(follower, leader.sent[-1:])
+    assert timestamp == 2000
+    assert [d["co2"] for _, d in samples] == [400 + i for i in range(300)]
@@ -0,0 +1,58 @@
+import pytest
+
+from webhook import WebhookReceiver, hmac_sha256, ubinascii
+
+BODY = b'{"context": {}}'
+
+
+def sign(secret, timestamp, body=BODY):
+    digest = hmac_sha256(secret.encode(), timestamp.encode() + b"." + body)
+    return ubinascii.b2a_base64(digest).strip().decode()
+
+
+def headers(timestamp, secret="secret"):
+    return {"x-timestamp": timestamp, "x-signature": sign(secret, timestamp)}
+
+
+class SyncedClock:
+    synced = True
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def receiver():
+    return WebhookReceiver("secret", lambda *args: None, lambda *args: None)
+
+
+def test_hmac_rfc4231_case_2():
+    digest = hmac_sha256(b"Jefe", b"what do ya want for nothing?")
+    assert ubinascii.hexlify(digest) == b"5bdcc146bf60754e6a042426089575c75a003f089d2739839dec58b964ec3843"
+
+
+def test_valid_and_replayed(receiver):
+    assert receiver.verify(headers("1000"), BODY)
+    assert not receiver.verify(headers("1000"), BODY)
+    assert receiver.verify(headers("1003"), BODY)
+
+
+def test_forged_and_malformed(receiver):
+    assert not receiver.verify(headers("1001", secret="other"), BODY)
+    assert not receiver.verify(headers("1002"), BODY + b" ")
+    assert not receiver.verify(headers("-1"), BODY)
+    assert not receiver.verify({}, BODY)
+
+
+def test_freshness_against_synced_clock():
+    clock = SyncedClock(1_700_000_000)
+    receiver = WebhookReceiver("secret", lambda *args: None, lambda *args: None, clock=clock)
+    assert receiver.verify(headers("1700000100000"), BODY)
+    assert not receiver.verify(headers("1700000400000"), BODY)  # 400 s ahead
+    receiver.last_timestamp = 0  # As after a restart without a checkpoint
+    assert not receiver.verify(headers("1699999000000"), BODY)  # Captured 1000 s ago
+    clock.synced = False  # Unsynced clocks are not trusted for freshness
+    assert receiver.verify(headers("1699999000000"), BODY)
@@ -0,0 +1,157 @@
+"""Receiver for SwitchBot webhook events relayed on the LAN
+
+SwitchBot posts ``changeReport`` events to a public URL; a relay on the LAN
+(``mock_switchbot.py webhook`` can act as one) forwards them to the Pico and
+signs each request:
+
+    X-Timestamp: <unix milliseconds>, strictly increasing (replays are rejected)
+    X-Signature: base64(HMAC-SHA256(secret, timestamp + "." + body))
+
+With a synchronized ``clock``, timestamps more than ``max_skew_s`` away from
+it are rejected as well, so a captured request cannot be replayed after a
+restart has reset the high-water mark; the application should also keep
+``last_timestamp`` across restarts (the display stores it in its checkpoint).
+
+Meter events become samples, motion and contact events become short status
+texts. Both are handed to callbacks so the display can render them at once.
+
+Usage:
+    receiver = WebhookReceiver(SECRET, on_sample, on_event)
+    receiver.register(http_server)
+"""
+
+import json
+import time
+
+try:
+    import ubinascii
+    import uhashlib
+except ImportError:  # CPython, for the host tests
+    import binascii as ubinascii
+    import hashlib as uhashlib
+
+WEBHOOK_PATH = "/webhook"
+
+
+def hmac_sha256(key, message):
+    """Return the HMAC-SHA256 digest of ``message`` (bytes) with ``key`` (bytes)"""
+    block_size = 64
+    if len(key) > block_size:
+        key = uhashlib.sha256(key).digest()
+    key = key + bytes(block_size - len(key))
+    inner = uhashlib.sha256(bytes([b ^ 0x36 for b in key]))
+    inner.update(message)
+    outer = uhashlib.sha256(bytes([b ^ 0x5C for b in key]))
+    outer.update(inner.digest())
+    return outer.digest()
+
+
+def device_id_from_mac(mac):
+    """'C0:FF:EE:00:00:01' -> 'C0FFEE000001' (the deviceId used by the API)"""
+    return mac.replace(":", "").replace("-", "").upper()
+
+
+def event_text(context):
+    """Return the status text of a motion/contact event, or None when it is idle"""
+    open_state = context.get("openState")
+    if open_state is not None:
+        if open_state == "open":
+            return "Open"
+        if open_state == "timeOutNotClose":
+            return "Left open"
+        return None
+    if context.get("detectionState") == "DETECTED":
+        return "Motion"
+    return None
+
+
+class WebhookReceiver:
+    def __init__(self, secret, on_sample, on_event, clock=None, max_skew_s=300):
+        """
+        Args:
+            secret (str): Secret shared with the relay
+            on_sample (callable): on_sample(device_id, data_point) for meter readings
+            on_event (callable): on_event(device_id, text or None, timestamp) for
+                motion/contact sensors; None means the sensor went idle
+            clock (Clock): Time source for the timestamps (default: the RTC);
+                once it is synced, requests are also checked for freshness
+            max_skew_s (int): Accept X-Timestamp this far from the clock
+        """
+        self.secret = secret.encode()
+        self.on_sample = on_sample
+        self.on_event = on_event
+        self.clock = clock if clock is not None else time
+        self.synced_clock = clock  # The RTC may be unset; only a Clock is trusted
+        self.max_skew_s = max_skew_s
+        self.last_timestamp = 0
+        self.last_received = None  # clock.time() of the last accepted event
+        self.received = 0
+        self.rejected = 0
+
+    def register(self, server, path=WEBHOOK_PATH):
+        server.route("POST", path, self.handle)
+
+    def verify(self, headers, body):
+        timestamp = headers.get("x-timestamp", "")
+        signature = headers.get("x-signature", "")
+        if not timestamp.isdigit() or int(timestamp) <= self.last_timestamp:
+            return False
+        clock = self.synced_clock
+        if clock is not None and clock.synced and abs(int(timestamp) // 1000 - clock.time()) > self.max_skew_s:
+            return False
+        digest = hmac_sha256(self.secret, timestamp.encode() + b"." + body)
+        expected = ubinascii.b2a_base64(digest).strip()
+        received = signature.encode()
+        # Compare every byte so the time taken does not reveal the prefix
+        diff = len(expected) ^ len(received)
+        for a, b in zip(expected, received):
+            diff |= a ^ b
+        if diff:
+            return False
+        self.last_timestamp = int(timestamp)
+        return True
+
+    def handle(self, request):
+        if not self.verify(request.headers, request.body):
+            self.rejected += 1
+            return 401, "text/plain", "Unauthorized"
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            self.rejected += 1
+            return 400, "text/plain", "Bad JSON"
+        self.received += 1
+        self.last_received = self.clock.time()
+        self.dispatch(payload.get("context") or {})
+        return 200, "application/json", '{"statusCode": 100}'
+
+    def dispatch(self, context):
+        mac = context.get("deviceMac")
+        if not mac:
+            return
+        device_id = device_id_from_mac(mac)
+        # Stamped on arrival with the application clock: the relay's times are
+        # not synchronized with it, and samples taken before the first NTP sync
+        # fall in its step window and are corrected with the rest
+        now = self.clock.time()
+        if "temperature" in context:
+            co2 = context.get("CO2", context.get("co2"))
+            self.on_sample(device_id, {
+                'timestamp': now,
+                'temperature': context.get("temperature"),
+                'humidity': context.get("humidity"),
+                'co2': co2,
+            })
+        elif "openState" in context or "detectionState" in context:
+            self.on_event(device_id, event_text(context), now)
+
+    def active(self, window_s):
+        """Return True if an event was accepted within the last ``window_s`` seconds"""
+        return self.last_received is not None and self.clock.time() - self.last_received < window_s
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            'last_received': self.last_received,
+        }
@@ -1,13 +1,21 @@
+import json
 import network
 import time
+import ubinascii
 
+# Last good access point (BSSID/channel) and DHCP lease, for fast reconnects
+WIFI_CACHE_FILE = "wifi_cache.json"
 
-def connect_wifi(ssid, password):
-    """Connect to WiFi with the given SSID and password.
+
+def connect_wifi(ssid, password, timeout_ms=10_000):
+    """Connect to WiFi with the given SSID and password, blocking until done.
+    
+    Uses ``WifiSupervisor``, so the cached access point is tried first.
     
     Args:
         ssid (str): WiFi SSID
         password (str): WiFi password
+        timeout_ms (int): Give up after this long
         
     Returns:
         network.WLAN: The WLAN interface object
@@ -15,22 +23,226 @@ def connect_wifi(ssid, password):
     Raises:
         RuntimeError: If connection fails
     """
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    if not wlan.isconnected():
-        print('Connecting to WiFi...')
-        wlan.connect(ssid, password)
-        # Wait for connection with timeout
-        max_wait = 10
-        while max_wait > 0:
-            if wlan.status() < 0 or wlan.status() >= 3:
-                break
-            max_wait -= 1
-            print('Waiting for connection...')
-            time.sleep(1)
-            
-        if wlan.status() != 3:
+    supervisor = WifiSupervisor(ssid, password, connect_timeout_ms=timeout_ms)
+    start = time.ticks_ms()
+    print('Connecting to WiFi...')
+    while not supervisor.poll():
+        if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
             raise RuntimeError('Network connection failed')
-    print('Connected to WiFi')
-    print('IP:', wlan.ifconfig()[0])
-    return wlan 
\ No newline at end of file
+        time.sleep_ms(100)
+    return supervisor.wlan
+
+
+class WifiSupervisor:
+    """Non-blocking WiFi connection supervisor.
+
+    Call ``poll()`` regularly from the main loop. It never sleeps: it checks
+    the link, starts (re)connection attempts with exponential backoff, and
+    samples the RSSI. The BSSID and channel of the last good access point are
+    cached in flash and passed to ``connect`` so a reconnect can skip the
+    scan, and optionally the last DHCP lease is reused as a static
+    configuration to skip DHCP. If an attempt with cached values fails, the
+    next one scans and uses DHCP.
+
+    States: 'connecting', 'connected', 'backoff'.
+    """
+
+    def __init__(
+        self,
+        ssid,
+        password,
+        static_ip=None,
+        connect_timeout_ms=10_000,
+        backoff_min_ms=500,
+        backoff_max_ms=60_000,
+        rssi_interval_ms=10_000,
+    ):
+        """
+        Args:
+            ssid (str): WiFi SSID
+            password (str): WiFi password
+            static_ip (tuple or str): (ip, subnet, gateway, dns) to skip DHCP,
+                'cached' to reuse the last DHCP lease, or None for DHCP
+            connect_timeout_ms (int): Give up on an attempt after this long
+            backoff_min_ms (int): First retry delay
+            backoff_max_ms (int): Maximum retry delay
+            rssi_interval_ms (int): How often to sample the RSSI while connected
+        """
+        self.ssid = ssid
+        self.password = password
+        self.static_ip = static_ip
+        self.connect_timeout_ms = connect_timeout_ms
+        self.backoff_min_ms = backoff_min_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.rssi_interval_ms = rssi_interval_ms
+
+        self.wlan = network.WLAN(network.STA_IF)
+        self.wlan.active(True)
+        self.state = 'backoff'
+        self.deadline = time.ticks_ms()
+        self.backoff_ms = backoff_min_ms
+        self.attempt_start = 0
+        self.used_cache = False  # The attempt joined the cached access point
+        self.used_lease = False  # The attempt applied the cached DHCP lease
+        self.rssi = None
+        self.next_rssi = 0
+        self.connected_since = None
+        self.disconnected_at = time.ticks_ms()
+        self.reconnects = 0
+        self.last_connect_ms = None
+        self.cache = self.load_cache()
+
+    @property
+    def connected(self):
+        return self.state == 'connected'
+
+    def load_cache(self):
+        try:
+            with open(WIFI_CACHE_FILE, 'r') as f:
+                cache = json.load(f)
+            if cache.get('ssid') == self.ssid:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def save_cache(self):
+        cache = {'ssid': self.ssid, 'ifconfig': list(self.wlan.ifconfig())}
+        for key in ('bssid', 'channel'):
+            try:
+                value = self.wlan.config(key)
+            except (ValueError, OSError):
+                continue
+            if isinstance(value, bytes):
+                value = ubinascii.hexlify(value).decode()
+            cache[key] = value
+        if cache == self.cache:
+            return
+        self.cache = cache
+        try:
+            with open(WIFI_CACHE_FILE, 'w') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"Error saving WiFi cache: {e}")
+
+    def start_attempt(self):
+        """Start one non-blocking connection attempt"""
+        wlan = self.wlan
+        wlan.active(True)
+        static_ip = self.static_ip
+        self.used_lease = False
+        if static_ip == 'cached':
+            static_ip = self.cache.get('ifconfig')
+            self.used_lease = bool(static_ip)
+        try:
+            if static_ip:
+                wlan.ifconfig(tuple(static_ip))
+            elif self.static_ip == 'cached':
+                wlan.ifconfig('dhcp')  # Drop a lease applied by an earlier attempt
+        except (OSError, TypeError, ValueError) as e:
+            print(f"WiFi ifconfig error: {e}")
+        hints = {}
+        bssid = self.cache.get('bssid')
+        if bssid:
+            hints['bssid'] = ubinascii.unhexlify(bssid)
+            if self.cache.get('channel'):
+                hints['channel'] = self.cache['channel']
+        self.used_cache = bool(hints)
+        try:
+            try:
+                wlan.connect(self.ssid, self.password, **hints)
+            except TypeError:
+                if not hints:
+                    raise
+                # This port does not take bssid/channel; scan as usual
+                wlan.connect(self.ssid, self.password)
+        except (OSError, TypeError) as e:
+            print(f"WiFi connect error: {e}")
+            self.fail_attempt()
+            return
+        self.state = 'connecting'
+        self.attempt_start = time.ticks_ms()
+
+    def fail_attempt(self):
+        """Schedule the next attempt with exponential backoff"""
+        if self.used_cache or self.used_lease:
+            # The cached access point or lease may be stale; scan and use
+            # DHCP on the next attempt, which starts right away
+            if self.used_cache:
+                self.cache.pop('bssid', None)
+                self.cache.pop('channel', None)
+            if self.used_lease:
+                self.cache.pop('ifconfig', None)
+            self.used_cache = False
+            self.used_lease = False
+            delay = 0
+        else:
+            delay = self.backoff_ms
+            self.backoff_ms = min(self.backoff_ms * 2, self.backoff_max_ms)
+        try:
+            self.wlan.disconnect()
+        except OSError:
+            pass
+        self.state = 'backoff'
+        self.deadline = time.ticks_add(time.ticks_ms(), delay)
+
+    def poll(self):
+        """Advance the state machine; returns True while connected"""
+        now = time.ticks_ms()
+        if self.state == 'connected':
+            if not self.wlan.isconnected():
+                print('WiFi link lost')
+                self.state = 'backoff'
+                self.deadline = now
+                self.connected_since = None
+                self.disconnected_at = now
+                self.rssi = None
+            elif time.ticks_diff(now, self.next_rssi) >= 0:
+                self.sample_rssi()
+                self.next_rssi = time.ticks_add(now, self.rssi_interval_ms)
+        elif self.state == 'connecting':
+            status = self.wlan.status()
+            if self.wlan.isconnected():
+                self.on_connected(now)
+            elif status < 0 or time.ticks_diff(now, self.attempt_start) > self.connect_timeout_ms:
+                print(f'WiFi connection attempt failed (status {status})')
+                self.fail_attempt()
+        elif time.ticks_diff(now, self.deadline) >= 0:
+            self.start_attempt()
+        return self.state == 'connected'
+
+    def on_connected(self, now):
+        self.state = 'connected'
+        self.connected_since = now
+        self.last_connect_ms = time.ticks_diff(now, self.disconnected_at)
+        self.backoff_ms = self.backoff_min_ms
+        self.reconnects += 1
+        self.sample_rssi()
+        self.next_rssi = time.ticks_add(now, self.rssi_interval_ms)
+        self.save_cache()
+        print(f'Connected to WiFi in {self.last_connect_ms} ms, IP: {self.wlan.ifconfig()[0]}')
+
+    def sample_rssi(self):
+        try:
+            self.rssi = self.wlan.status('rssi')
+        except (ValueError, OSError):
+            self.rssi = None
+
+    def status_text(self):
+        """Short link description for the screen, e.g. '-61dBm' or 'offline'"""
+        if self.state != 'connected':
+            return 'offline'
+        if self.rssi is None:
+            return 'online'
+        return f'{self.rssi}dBm'
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'rssi': self.rssi,
+            'reconnects': self.reconnects,
+            'last_connect_ms': self.last_connect_ms,
+            'backoff_ms': self.backoff_ms,
+            'cached_bssid': self.cache.get('bssid'),
+            'channel': self.cache.get('channel'),
+        }